@@ -44,9 +44,32 @@ class Settings(BaseSettings):
     postgres_password: Optional[str] = None
     postgres_host: str = 'database'
     postgres_pool_size: int = 5
+    postgres_max_overflow: int = 1
+    postgres_pool_timeout: float = 30.0
+    postgres_pool_recycle: int = 1800
+    # Checks every connection on checkout, one extra round trip each
+    postgres_pool_pre_ping: bool = True
+    # Pool of the report reads, 0 shares the write pool
+    postgres_read_pool_size: int = 5
+    postgres_read_max_overflow: int = 5
+    # Replica to read reports from, defaults to the primary
+    postgres_read_uri: Optional[str] = None
     verbose_db: bool = False
 
     max_batch_size: int = 2000
+    upload_chunk_size: int = 1024 * 1024
+    # 0 uses one parser process per CPU core
+    parser_workers: int = 0
+    upload_job_workers: int = 2
+    upload_job_retention: int = 1000
+    # Defaults to a folder in the system temporary directory
+    upload_spool_dir: Optional[str] = None
+    # Resumable uploads are loaded once this many bytes are pending
+    upload_segment_size: int = 8 * 1024 * 1024
+    # 0 disables the report cache
+    report_cache_size: int = 128
+    report_cache_ttl: float = 300.0
+    dimension_cache_ttl: float = 60.0
 
     @computed_field
     @property
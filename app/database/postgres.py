@@ -1,56 +1,180 @@
-from asyncio import current_task
+import time
+from typing import Callable, Dict, List
 
+from sqlalchemy import AsyncAdaptedQueuePool, event
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncEngine,
     AsyncSession,
-    async_scoped_session,
     async_sessionmaker,  # type: ignore
     create_async_engine,
 )
 
 from app.config import Settings
 
+# Called with the name of the pool and the seconds a checkout waited
+pool_wait_observers: List[Callable[[str, float], None]] = []
+# Called with the SQL operation and the seconds a statement took
+query_observers: List[Callable[[str, float], None]] = []
+
+
+def observe_query(statement: str, seconds: float) -> None:
+    """Report a statement to every registered `query_observers`."""
+    words = statement.split(None, 1)
+    operation = words[0].upper() if words else 'UNKNOWN'
+    for observer in query_observers:
+        observer(operation, seconds)
+
+
+def _query_started(conn, cursor, statement, parameters, context, many):
+    conn.info['query_started'] = time.perf_counter()
+
+
+def _query_finished(conn, cursor, statement, parameters, context, many):
+    started = conn.info.pop('query_started', None)
+    if started is not None:
+        observe_query(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Time every statement `engine` executes with `observe_query`.
+
+    COPY goes straight to the asyncpg connection and skips these events,
+    so `app.services.db_service.DBService` times it by itself.
+    """
+    sync_engine = engine.sync_engine
+    if not event.contains(
+        sync_engine, 'before_cursor_execute', _query_started
+    ):
+        event.listen(sync_engine, 'before_cursor_execute', _query_started)
+        event.listen(sync_engine, 'after_cursor_execute', _query_finished)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool reporting how long checkouts wait for a connection,
+    including the time to open one when the pool still has room.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            for observer in pool_wait_observers:
+                observer(self.logging_name, waited)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': self.size(),
+            'checked_out': self.checkedout(),
+            'idle': self.checkedin(),
+            # Negative while the pool has not opened `size` connections yet
+            'overflow': max(0, self.overflow()),
+        }
+
 
 class PostgresSessionManager:
-    """ """
+    """
+    Engines and session makers of the application.
+
+    Uploads write through `engine`. Reports read through `read_engine`, a
+    pool of its own so long uploads holding write connections cannot
+    starve them, which can point at a replica with `postgres_read_uri`.
+    Read connections are read-only. With `postgres_read_pool_size` 0 the
+    reads share the write engine.
+    """
 
     def __init__(self):
         settings = Settings()
+        self.settings = settings
         self._connection_url = str(settings.postgres_uri)
+        self._read_url = settings.postgres_read_uri or self._connection_url
         self._verbose_db = settings.verbose_db
         self.pool_size = settings.postgres_pool_size
         self.engine: AsyncEngine | None = None
+        self.read_engine: AsyncEngine | None = None
         self.connection: AsyncConnection | None = None
         self.session_maker = None
-        self.session = None
+        self.read_session_maker = None
         self.init_db()
 
-    def init_db(self):
+    def create_engine(
+        self,
+        name: str,
+        url: str,
+        pool_size: int,
+        max_overflow: int,
+        server_settings: Dict[str, str] | None = None,
+    ) -> AsyncEngine:
+        settings = self.settings
         async_engine = create_async_engine(
-            url=self._connection_url,
+            url=url,
             echo=self._verbose_db,
             echo_pool=self._verbose_db,
-            pool_size=self.pool_size,
-            max_overflow=1,
-            pool_timeout=30,
-            pool_recycle=1800,
+            poolclass=TimedQueuePool,
+            pool_logging_name=name,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.postgres_pool_timeout,
+            pool_recycle=settings.postgres_pool_recycle,
+            pool_pre_ping=settings.postgres_pool_pre_ping,
             connect_args={
-                'server_settings': {'application_name': 'retigazer'},
+                'server_settings': {
+                    'application_name': 'retigazer',
+                    **(server_settings or {}),
+                },
             },
-            pool_pre_ping=True,
         )
-        self.engine = async_engine
-        self.session_maker = async_sessionmaker(
-            async_engine, class_=AsyncSession, expire_on_commit=False
+        instrument_engine(async_engine)
+        return async_engine
+
+    def init_db(self):
+        settings = self.settings
+        self.engine = self.create_engine(
+            'write',
+            self._connection_url,
+            self.pool_size,
+            settings.postgres_max_overflow,
         )
+        if settings.postgres_read_pool_size > 0:
+            self.read_engine = self.create_engine(
+                'read',
+                self._read_url,
+                settings.postgres_read_pool_size,
+                settings.postgres_read_max_overflow,
+                {
+                    'application_name': 'retigazer-read',
+                    'default_transaction_read_only': 'on',
+                },
+            )
+        else:
+            self.read_engine = self.engine
 
-        self.session = async_scoped_session(
-            self.session_maker, scopefunc=current_task
+        self.session_maker = async_sessionmaker(
+            self.engine, class_=AsyncSession, expire_on_commit=False
+        )
+        self.read_session_maker = async_sessionmaker(
+            self.read_engine, class_=AsyncSession, expire_on_commit=False
         )
 
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """Connections of every pool by state, keyed by pool name."""
+        pools = [engine.sync_engine.pool for engine in self.engines()]
+        return {pool.logging_name: pool.stats() for pool in pools}
+
+    def engines(self) -> List[AsyncEngine]:
+        engines = [self.engine, self.read_engine]
+        return [
+            engine
+            for index, engine in enumerate(engines)
+            if engine is not None and engine not in engines[:index]
+        ]
+
     async def close(self):
         if self.connection:
             await self.connection.close()
-        if self.engine:
-            await self.engine.dispose()
+        for engine in self.engines():
+            await engine.dispose()
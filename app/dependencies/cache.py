@@ -0,0 +1,22 @@
+from app.config import Settings
+from app.models.base import Departments, Jobs
+from app.services.dimension_cache import DimensionCache
+from app.services.report_cache import ReportCache
+
+settings = Settings()
+
+report_cache = ReportCache(
+    maxsize=settings.report_cache_size, ttl=settings.report_cache_ttl
+)
+
+dimension_cache = DimensionCache(
+    [Departments, Jobs], ttl=settings.dimension_cache_ttl
+)
+
+
+def get_report_cache() -> ReportCache:
+    return report_cache
+
+
+def get_dimension_cache() -> DimensionCache:
+    return dimension_cache
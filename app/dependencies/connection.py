@@ -1,4 +1,4 @@
-from typing import AsyncIterator
+from typing import AsyncIterator, Callable
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -8,5 +8,24 @@ postgres_manager = PostgresSessionManager()
 
 
 async def get_db() -> AsyncIterator[AsyncSession]:
-    async with postgres_manager.session() as session:
+    """
+    Session of the write pool for one request. Only routes that declare
+    it get one, and it checks out a connection on its first statement.
+    """
+    async with postgres_manager.session_maker() as session:
         yield session
+
+
+async def get_read_db() -> AsyncIterator[AsyncSession]:
+    """Read-only session from the pool of the reports."""
+    async with postgres_manager.read_session_maker() as session:
+        yield session
+
+
+def get_read_session_factory() -> Callable[[], AsyncSession]:
+    """
+    Read pool sessions for work that outlives the request dependencies,
+    like streamed responses, which are written after `get_read_db` has
+    closed its session.
+    """
+    return postgres_manager.read_session_maker
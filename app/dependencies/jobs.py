@@ -0,0 +1,55 @@
+from typing import Type
+
+from sqlmodel import SQLModel
+
+from app.config import Settings
+from app.dependencies.cache import dimension_cache, report_cache
+from app.dependencies.connection import postgres_manager
+from app.dependencies.metrics import metrics
+from app.services.batch_service import BATCH_ENTITIES
+from app.services.ingest_service import IngestProgress
+from app.services.job_service import UploadJobManager
+from app.services.resumable_service import ResumableUploadManager
+
+settings = Settings()
+
+
+def upload_finished(
+    model_class: Type[SQLModel], progress: IngestProgress
+) -> None:
+    report_cache.invalidate()
+    dimension_cache.invalidate(model_class)
+    metrics.record_upload(
+        model_class.__tablename__,
+        progress.rows_parsed,
+        progress.rows_inserted,
+        progress.rows_rejected,
+    )
+
+
+job_manager = UploadJobManager(
+    postgres_manager.session_maker,
+    workers=settings.upload_job_workers,
+    spool_dir=settings.upload_spool_dir,
+    retention=settings.upload_job_retention,
+    chunk_size=settings.upload_chunk_size,
+    on_finished=upload_finished,
+    dimensions=dimension_cache,
+)
+
+upload_sessions = ResumableUploadManager(
+    postgres_manager.session_maker,
+    BATCH_ENTITIES,
+    spool_dir=settings.upload_spool_dir,
+    segment_size=settings.upload_segment_size,
+    on_finished=upload_finished,
+    dimensions=dimension_cache,
+)
+
+
+def get_job_manager() -> UploadJobManager:
+    return job_manager
+
+
+def get_upload_sessions() -> ResumableUploadManager:
+    return upload_sessions
@@ -0,0 +1,12 @@
+from app.database.postgres import pool_wait_observers, query_observers
+from app.dependencies.connection import postgres_manager
+from app.services.metrics import AppMetrics
+
+metrics = AppMetrics()
+query_observers.append(metrics.observe_query)
+pool_wait_observers.append(metrics.observe_pool_wait)
+metrics.watch_pools(postgres_manager.pool_stats)
+
+
+def get_metrics() -> AppMetrics:
+    return metrics
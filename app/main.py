@@ -2,14 +2,19 @@ import logging
 from functools import lru_cache
 from http import HTTPStatus
 
-from fastapi import Depends, FastAPI
+from fastapi import FastAPI
 from fastapi.concurrency import asynccontextmanager
 
 from app.config import Settings
-from app.dependencies.connection import get_db
+from app.dependencies.connection import postgres_manager
+from app.dependencies.jobs import job_manager, upload_sessions
+from app.dependencies.metrics import metrics
+from app.middleware import MetricsMiddleware
 from app.models.responses import Message
+from app.routes.metrics import router as metrics_router
 from app.routes.reports import router as report_router
 from app.routes.upload import router as upload_router
+from app.services.parser_pool import shutdown_parser_pool
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +28,10 @@ async def lifespan(app: FastAPI):
     # startup
     yield
     # shutdown
+    await job_manager.shutdown()
+    await upload_sessions.shutdown()
+    shutdown_parser_pool()
+    await postgres_manager.close()
 
 
 @lru_cache
@@ -36,7 +45,6 @@ app = FastAPI(
     version=settings.api_version,
     lifespan=lifespan,
     debug=settings.environment != 'production',
-    dependencies=[Depends(get_db)],
 )
 
 
@@ -47,3 +55,5 @@ def read_root():
 
 app.include_router(upload_router)
 app.include_router(report_router)
+app.include_router(metrics_router)
+app.add_middleware(MetricsMiddleware, metrics=metrics)
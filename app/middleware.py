@@ -0,0 +1,46 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.metrics import AppMetrics
+
+
+class MetricsMiddleware:
+    """
+    Time every HTTP request by method, route and status code.
+
+    A plain ASGI middleware rather than `BaseHTTPMiddleware`, so the time
+    of streamed responses runs until their last chunk is sent. Routes are
+    labelled with their path template, and requests no route matched with
+    'unmatched', to keep the number of series bounded.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: AppMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router adds the matched route to the scope
+            route = scope.get('route')
+            self.metrics.observe_request(
+                scope['method'],
+                getattr(route, 'path', 'unmatched'),
+                status_code,
+                time.perf_counter() - started,
+            )
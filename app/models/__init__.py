@@ -1 +1,4 @@
 from .base import Departments, HiredEmployees, Jobs  # noqa: F401
+from .partitions import HiredEmployeeIds, partition_key  # noqa: F401
+from .stats import DepartmentHiringStats, QuarterlyHiringStats  # noqa: F401
+from .uploads import UploadSession, UploadSessionError  # noqa: F401
@@ -1,7 +1,8 @@
-from datetime import datetime
+import datetime as dt
 from typing import List, Optional
 
 from pydantic import field_validator
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -30,8 +31,25 @@ class Departments(BaseModel, SQLModel, table=True):
 
 
 class HiredEmployees(BaseModel, SQLModel, table=True):
+    # Leading datetime column serves the date range filters of the reports,
+    # the other two make the per department/job counts index-only scans.
+    # Rows live in yearly partitions, see app.models.partitions, so the
+    # partition key joins the id in the primary key.
+    __table_args__ = (
+        Index(
+            'ix_hiredemployees_datetime_department_id_job_id',
+            'datetime',
+            'department_id',
+            'job_id',
+        ),
+        {
+            'postgresql_partition_by': 'RANGE (datetime)',
+            'info': {'partition_key': 'datetime'},
+        },
+    )
+
     name: str
-    datetime: datetime
+    datetime: dt.datetime = Field(primary_key=True)
     department_id: int = Field(foreign_key='departments.id')
     job_id: int = Field(foreign_key='jobs.id')
 
@@ -42,11 +60,10 @@ class HiredEmployees(BaseModel, SQLModel, table=True):
 
     @field_validator('datetime')
     def parse_datetime(cls, value):
-        if isinstance(value, datetime):
+        if isinstance(value, dt.datetime):
             return value.replace(tzinfo=None)
         try:
-            dt = datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
-            return dt
+            return dt.datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
         except (ValueError, TypeError) as err:
             raise ValueError(
                 'Invalid datetime format. Expected: YYYY-MM-DDThh:mm:ssZ'
@@ -0,0 +1,150 @@
+from typing import Optional
+
+from sqlalchemy import DDL, Table, event
+from sqlmodel import Field, SQLModel
+
+from app.models.base import HiredEmployees
+
+
+class HiredEmployeeIds(SQLModel, table=True):
+    """
+    Every id stored in `hiredemployees`, whose rows the unique id trigger
+    locks. Ids of deleted employees are left behind, which is harmless.
+    """
+
+    __tablename__ = 'hiredemployees_ids'
+
+    id: int = Field(
+        primary_key=True, sa_column_kwargs={'autoincrement': False}
+    )
+
+
+# Creates the missing yearly partitions of a table partitioned by RANGE on
+# a timestamp column. A partition is created detached, the rows of its year
+# are moved out of the default partition and only then is it attached:
+# unlike CREATE TABLE ... PARTITION OF, ATTACH does not lock out readers of
+# the parent. It does lock the default partition until the transaction
+# ends, so callers run it in a transaction of its own. Concurrent callers
+# creating the same year wait for each other on the table name and the
+# loser skips it.
+ENSURE_YEARLY_PARTITIONS_DDL = """
+CREATE OR REPLACE FUNCTION ensure_yearly_partitions(
+    parent text, key text, years int[]
+)
+RETURNS int LANGUAGE plpgsql AS $$
+DECLARE
+    year int;
+    partition text;
+    lower timestamp;
+    upper timestamp;
+    created int := 0;
+BEGIN
+    FOREACH year IN ARRAY coalesce(years, '{}') LOOP
+        partition := format('%s_y%s', parent, year);
+        CONTINUE WHEN to_regclass(quote_ident(partition)) IS NOT NULL;
+        lower := make_timestamp(year, 1, 1, 0, 0, 0);
+        upper := make_timestamp(year + 1, 1, 1, 0, 0, 0);
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS '
+                'INCLUDING CONSTRAINTS)',
+                partition, parent
+            );
+        EXCEPTION WHEN duplicate_table THEN
+            CONTINUE;
+        END;
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE %I >= $1 AND %I < $2 '
+            'RETURNING *) INSERT INTO %I SELECT * FROM moved',
+            parent || '_default', key, key, partition
+        ) USING lower, upper;
+        EXECUTE format(
+            'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            parent, partition, lower, upper
+        );
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+# Primary keys of partitioned tables must include the partition key, so
+# (id, datetime) no longer stops an id from coming back with another hire
+# date. This check does, probing the id of every new row in the primary
+# key index of each partition; hash joins would read whole partitions.
+# Rows of transactions not committed yet are invisible to it, so the row of
+# every new id in hiredemployees_ids is first locked until the end of the
+# transaction, in id order to avoid deadlocks: a concurrent writer of the
+# same id waits for the commit and then sees its rows, as each query of the
+# function takes a new snapshot under READ COMMITTED. Row locks live in the
+# rows themselves, so a transaction can write any number of ids.
+HIRED_EMPLOYEES_UNIQUE_ID_FUNCTION = """
+CREATE OR REPLACE FUNCTION hiredemployees_unique_id()
+RETURNS trigger LANGUAGE plpgsql
+SET enable_hashjoin = off SET enable_mergejoin = off AS $$
+DECLARE
+    duplicate int;
+BEGIN
+    INSERT INTO hiredemployees_ids (id)
+    SELECT DISTINCT id FROM new_rows ORDER BY id
+    ON CONFLICT (id) DO NOTHING;
+    PERFORM FROM hiredemployees_ids
+    WHERE id IN (SELECT id FROM new_rows)
+    ORDER BY id
+    FOR UPDATE;
+    SELECT n.id INTO duplicate
+    FROM new_rows n
+    JOIN hiredemployees h ON h.id = n.id AND h.datetime <> n.datetime
+    LIMIT 1;
+    IF FOUND THEN
+        RAISE EXCEPTION
+            'duplicate key value violates unique constraint "%"',
+            'hiredemployees_id_key'
+            USING ERRCODE = 'unique_violation',
+                DETAIL = format('Key (id)=(%s) already exists.', duplicate);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+HIRED_EMPLOYEES_UNIQUE_ID_DDL = [
+    HIRED_EMPLOYEES_UNIQUE_ID_FUNCTION,
+    """
+CREATE OR REPLACE TRIGGER unique_id_insert
+AFTER INSERT ON hiredemployees
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_unique_id()
+""",
+    """
+CREATE OR REPLACE TRIGGER unique_id_update
+AFTER UPDATE ON hiredemployees
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_unique_id()
+""",
+]
+
+HIRED_EMPLOYEES_PARTITIONS_DDL = [
+    ENSURE_YEARLY_PARTITIONS_DDL,
+    # Rows of years without a partition yet, until one is created for them
+    """
+CREATE TABLE IF NOT EXISTS hiredemployees_default
+PARTITION OF hiredemployees DEFAULT
+""",
+    *HIRED_EMPLOYEES_UNIQUE_ID_DDL,
+]
+
+
+def partition_key(target: Table) -> Optional[str]:
+    """Column `target` is range partitioned by year on, if any."""
+    return target.info.get('partition_key')
+
+
+# DDL statements are %-formatted with the table name
+for statement in HIRED_EMPLOYEES_PARTITIONS_DDL:
+    event.listen(
+        HiredEmployees.__table__,
+        'after_create',
+        DDL(statement.replace('%', '%%')),
+    )
@@ -0,0 +1,109 @@
+from datetime import date, datetime, time
+from typing import Literal, Optional, Tuple
+
+from pydantic import model_validator
+from sqlmodel import Field, SQLModel
+
+LoadMethod = Literal['orm', 'copy', 'staging']
+TransactionMode = Literal['chunk', 'file']
+ConflictMode = Literal['error', 'ignore', 'update']
+ReportFormat = Literal['json', 'csv', 'ndjson', 'parquet', 'arrow']
+UploadEntity = Literal['departments', 'jobs', 'employees']
+
+
+class IngestOptions(SQLModel):
+    has_headers: bool = Field(
+        default=False, description='Skip the first line of the file'
+    )
+    parallel: bool = Field(
+        default=False,
+        description=(
+            'Validate the file in shards across a pool of worker processes'
+        ),
+    )
+    method: LoadMethod = Field(
+        default='orm',
+        description=(
+            'How rows are written: batched INSERT statements, PostgreSQL '
+            'COPY FROM STDIN, or COPY of the raw values into a staging '
+            'table where types and foreign keys are checked in SQL'
+        ),
+    )
+    on_conflict: ConflictMode = Field(
+        default='error',
+        description=(
+            'What to do with rows whose id already exists: fail the upload '
+            "('error'), keep the stored row ('ignore') or overwrite it "
+            "when any value changed ('update')"
+        ),
+    )
+
+
+class UploadOptions(IngestOptions):
+    streaming: bool = Field(
+        default=False,
+        description='Read the file in chunks and commit batch by batch',
+    )
+    background: bool = Field(
+        default=False,
+        description=(
+            'Spool the file to disk and process it in a background job, '
+            'returning the job right away'
+        ),
+    )
+    transaction: TransactionMode = Field(
+        default='file',
+        description=(
+            "Commit after every batch ('chunk') or once for the whole "
+            "file ('file')"
+        ),
+    )
+
+
+class UploadSessionOptions(IngestOptions):
+    entity: UploadEntity = Field(description='Table the CSV file loads')
+
+
+class ReportParams(SQLModel):
+    year: Optional[int] = Field(
+        default=None, ge=1, le=9998, description='Calendar year to report on'
+    )
+    start: Optional[date] = Field(
+        default=None, description='First day of the period, inclusive'
+    )
+    end: Optional[date] = Field(
+        default=None, description='Last day of the period, exclusive'
+    )
+    format: ReportFormat = Field(default='json', description='Response format')
+    stream: bool = Field(
+        default=False,
+        description='Stream rows from a server-side cursor instead of '
+        'building the report in memory. Streamed reports are not cached',
+    )
+
+    @model_validator(mode='after')
+    def check_period(self) -> 'ReportParams':
+        has_range = self.start is not None or self.end is not None
+        if self.year is not None and has_range:
+            raise ValueError('Use either year or start/end, not both')
+        if self.year is None and not has_range:
+            raise ValueError('Provide a year or a start/end range')
+        if self.start and self.end and self.start >= self.end:
+            raise ValueError('start must be before end')
+        return self
+
+    def bounds(self) -> Tuple[datetime, datetime]:
+        """Half-open [start, end) datetime range covered by the report."""
+        if self.year is not None:
+            return datetime(self.year, 1, 1), datetime(self.year + 1, 1, 1)
+        start = datetime.combine(self.start or date.min, time.min)
+        end = (
+            datetime.combine(self.end, time.min) if self.end else datetime.max
+        )
+        return start, end
+
+    @property
+    def label(self) -> str:
+        if self.year is not None:
+            return str(self.year)
+        return f'{self.start or "start"}_{self.end or "end"}'
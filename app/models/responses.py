@@ -1,7 +1,11 @@
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional
 
 from sqlmodel import SQLModel
 
+JobStatus = Literal['queued', 'running', 'succeeded', 'failed']
+UploadSessionStatus = Literal['receiving', 'completing', 'succeeded', 'failed']
+
 
 class Message(SQLModel):
     message: str
@@ -18,6 +22,48 @@ class UploadResponse(SQLModel):
     errors: List[ErrorDetail] = []
 
 
+class FileUploadResponse(UploadResponse):
+    file: str
+
+
+class BatchUploadResponse(SQLModel):
+    message: str
+    total_records: int
+    files: List[FileUploadResponse] = []
+
+
+class UploadJob(SQLModel):
+    id: str
+    entity: str
+    status: JobStatus = 'queued'
+    rows_parsed: int = 0
+    rows_inserted: int = 0
+    rows_rejected: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[UploadResponse] = None
+    error: Optional[str] = None
+
+
+class ResumableUpload(SQLModel):
+    id: str
+    entity: str
+    status: UploadSessionStatus = 'receiving'
+    # Bytes received so far, the offset of the next chunk
+    received: int = 0
+    size: Optional[int] = None
+    # Bytes and records whose rows are committed
+    committed_offset: int = 0
+    committed_rows: int = 0
+    rows_inserted: int = 0
+    rows_rejected: int = 0
+    created_at: datetime
+    updated_at: datetime
+    result: Optional[UploadResponse] = None
+    error: Optional[str] = None
+
+
 class QuarterlyHires(SQLModel):
     department: str
     job: str
@@ -0,0 +1,162 @@
+from sqlalchemy import DDL, event
+from sqlmodel import Field, SQLModel
+
+
+class QuarterlyHiringStats(SQLModel, table=True):
+    """
+    Hires per department, job, year and quarter.
+
+    Maintained by statement-level triggers on `hiredemployees`, so every
+    write path (ORM flush, batched INSERT, COPY) keeps it up to date
+    incrementally from the rows it touched.
+    """
+
+    department_id: int = Field(primary_key=True)
+    job_id: int = Field(primary_key=True)
+    year: int = Field(primary_key=True, index=True)
+    quarter: int = Field(primary_key=True)
+    hires: int = 0
+
+
+QUARTERLY_HIRING_STATS_DDL = [
+    """
+CREATE OR REPLACE FUNCTION hiredemployees_quarterly_stats()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE quarterlyhiringstats;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO quarterlyhiringstats AS s
+            (department_id, job_id, year, quarter, hires)
+        SELECT
+            department_id,
+            job_id,
+            EXTRACT(year FROM datetime)::int,
+            EXTRACT(quarter FROM datetime)::int,
+            -COUNT(*)
+        FROM old_rows
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (department_id, job_id, year, quarter)
+        DO UPDATE SET hires = s.hires + EXCLUDED.hires;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO quarterlyhiringstats AS s
+            (department_id, job_id, year, quarter, hires)
+        SELECT
+            department_id,
+            job_id,
+            EXTRACT(year FROM datetime)::int,
+            EXTRACT(quarter FROM datetime)::int,
+            COUNT(*)
+        FROM new_rows
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (department_id, job_id, year, quarter)
+        DO UPDATE SET hires = s.hires + EXCLUDED.hires;
+    END IF;
+
+    RETURN NULL;
+END
+$$
+""",
+    """
+CREATE OR REPLACE TRIGGER quarterly_stats_insert
+AFTER INSERT ON hiredemployees
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_quarterly_stats()
+""",
+    """
+CREATE OR REPLACE TRIGGER quarterly_stats_update
+AFTER UPDATE ON hiredemployees
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_quarterly_stats()
+""",
+    """
+CREATE OR REPLACE TRIGGER quarterly_stats_delete
+AFTER DELETE ON hiredemployees
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_quarterly_stats()
+""",
+    """
+CREATE OR REPLACE TRIGGER quarterly_stats_truncate
+AFTER TRUNCATE ON hiredemployees
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_quarterly_stats()
+""",
+]
+
+
+class DepartmentHiringStats(SQLModel, table=True):
+    """
+    Hires per year and department, kept up to date by triggers like
+    `QuarterlyHiringStats`. The year leads the primary key, so the hires
+    of every department in a year are one index range scan.
+    """
+
+    year: int = Field(primary_key=True)
+    department_id: int = Field(primary_key=True)
+    hires: int = 0
+
+
+DEPARTMENT_HIRING_STATS_DDL = [
+    """
+CREATE OR REPLACE FUNCTION hiredemployees_department_stats()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE departmenthiringstats;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO departmenthiringstats AS s (year, department_id, hires)
+        SELECT EXTRACT(year FROM datetime)::int, department_id, -COUNT(*)
+        FROM old_rows
+        GROUP BY 1, 2
+        ON CONFLICT (year, department_id)
+        DO UPDATE SET hires = s.hires + EXCLUDED.hires;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO departmenthiringstats AS s (year, department_id, hires)
+        SELECT EXTRACT(year FROM datetime)::int, department_id, COUNT(*)
+        FROM new_rows
+        GROUP BY 1, 2
+        ON CONFLICT (year, department_id)
+        DO UPDATE SET hires = s.hires + EXCLUDED.hires;
+    END IF;
+
+    RETURN NULL;
+END
+$$
+""",
+    """
+CREATE OR REPLACE TRIGGER department_stats_insert
+AFTER INSERT ON hiredemployees
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_department_stats()
+""",
+    """
+CREATE OR REPLACE TRIGGER department_stats_update
+AFTER UPDATE ON hiredemployees
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_department_stats()
+""",
+    """
+CREATE OR REPLACE TRIGGER department_stats_delete
+AFTER DELETE ON hiredemployees
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_department_stats()
+""",
+    """
+CREATE OR REPLACE TRIGGER department_stats_truncate
+AFTER TRUNCATE ON hiredemployees
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_department_stats()
+""",
+]
+
+# The triggers need both tables, so they run after the whole metadata
+for statement in QUARTERLY_HIRING_STATS_DDL + DEPARTMENT_HIRING_STATS_DDL:
+    event.listen(SQLModel.metadata, 'after_create', DDL(statement))
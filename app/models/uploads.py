@@ -0,0 +1,41 @@
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy import JSON, BigInteger, DateTime
+from sqlmodel import Field, SQLModel
+
+
+class UploadSession(SQLModel, table=True):
+    """
+    Resumable upload and the checkpoint of its load.
+
+    The file is received in chunks spooled to local disk and loaded in
+    segments of complete records. `committed_offset` and `committed_rows`
+    are updated in the transaction that writes the rows of a segment, so
+    they always tell exactly where loading has to resume.
+    """
+
+    id: str = Field(primary_key=True)
+    entity: str
+    # IngestOptions of the upload
+    options: dict = Field(default_factory=dict, sa_type=JSON)
+    status: str = 'receiving'
+    # Total bytes of the file, known once the client completes the upload
+    size: Optional[int] = Field(default=None, sa_type=BigInteger)
+    committed_offset: int = Field(default=0, sa_type=BigInteger)
+    committed_rows: int = Field(default=0, sa_type=BigInteger)
+    rows_inserted: int = Field(default=0, sa_type=BigInteger)
+    rows_rejected: int = Field(default=0, sa_type=BigInteger)
+    error: Optional[str] = None
+    created_at: dt.datetime = Field(sa_type=DateTime(timezone=True))
+    updated_at: dt.datetime = Field(sa_type=DateTime(timezone=True))
+
+
+class UploadSessionError(SQLModel, table=True):
+    """Rows of a resumable upload rejected by committed segments."""
+
+    session_id: str = Field(
+        primary_key=True, foreign_key='uploadsession.id', ondelete='CASCADE'
+    )
+    row_number: int = Field(primary_key=True, sa_type=BigInteger)
+    message: str
@@ -0,0 +1,17 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+
+from app.dependencies.metrics import get_metrics
+from app.services.metrics import CONTENT_TYPE, AppMetrics
+
+router = APIRouter(tags=['metrics'])
+
+
+@router.get('/metrics', include_in_schema=False)
+async def get_prometheus_metrics(
+    metrics: Annotated[AppMetrics, Depends(get_metrics)],
+) -> Response:
+    """Metrics of this worker process in the Prometheus text format."""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
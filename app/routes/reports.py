@@ -1,67 +1,177 @@
-from typing import Annotated, List
+from typing import (
+    Annotated,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    Type,
+)
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from pydantic_core import to_json
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel
 
+from app.dependencies.cache import get_report_cache
 from app.dependencies.connection import (
-    get_db,
+    get_read_db,
+    get_read_session_factory,
 )
+from app.models.requests import ReportFormat, ReportParams
 from app.models.responses import DepartmentHires, QuarterlyHires
 from app.services.db_service import DBService
-from app.utils.parsers import generate_csv_response
+from app.services.report_cache import CachedReport, ReportCache
+from app.services.report_service import ReportService
+from app.utils.columnar import (
+    COLUMNAR_FORMATS,
+    columnar_available,
+    generate_columnar,
+)
+from app.utils.parsers import (
+    MEDIA_TYPES,
+    generate_csv_response,
+    generate_ndjson,
+    generate_streaming_response,
+)
 
 router = APIRouter(prefix='/reports', tags=['reports'])
 
 
-@router.get('/quarterly-hiring-2021', response_model=List[QuarterlyHires])
-async def get_quarterly_hiring_2021(
-    session: Annotated[AsyncSession, Depends(get_db)],
-    format: str = Query(
-        'json', enum=['json', 'csv'], description='Response format'
-    ),
-) -> List[QuarterlyHires]:
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in (
+        tag.strip().removeprefix('W/') for tag in if_none_match.split(',')
+    )
+
+
+def render_report(
+    results: List[dict],
+    params: ReportParams,
+    filename: str,
+    model: Type[SQLModel],
+) -> CachedReport:
     """
-    Get a report of employees hired in 2021 by quarter, department and job
+    Serialize report rows in the requested format. The rows already have
+    the fields and types of `model`, straight from the query, so they are
+    written as they are without validating each one against it.
+    """
+    if params.format == 'csv':
+        response = generate_csv_response(results, filename)
+        return CachedReport(
+            body=response.body,
+            media_type='text/csv',
+            headers={
+                'Content-Disposition': response.headers['content-disposition']
+            },
+        )
+    if params.format == 'ndjson':
+        return CachedReport(
+            body=generate_ndjson(results),
+            media_type='application/x-ndjson',
+            headers={'Content-Disposition': f'attachment;filename={filename}'},
+        )
+    if params.format in COLUMNAR_FORMATS:
+        return CachedReport(
+            body=generate_columnar(results, params.format, model),
+            media_type=MEDIA_TYPES[params.format],
+            headers={'Content-Disposition': f'attachment;filename={filename}'},
+        )
+    return CachedReport(body=to_json(results), media_type='application/json')
+
+
+async def send_report(
+    request: Request,
+    session: AsyncSession,
+    sessions: Callable[[], AsyncSession],
+    cache: ReportCache,
+    name: str,
+    params: ReportParams,
+    model: Type[SQLModel],
+    fetch: Callable[[ReportService], Awaitable[List[dict]]],
+    stream: Callable[[ReportService], AsyncIterator[List[dict]]],
+) -> Response:
+    """
+    Serve a report from `cache`, building it with `fetch` on a miss.
+
+    Every cached response carries an ETag of its body; a request whose
+    If-None-Match matches it gets an empty 304 instead.
+
+    With `params.stream` the rows are written as they come out of `stream`
+    instead. The response body is sent after the request dependencies are
+    closed, so the rows are read with a session of their own.
+
+    Raises:
+        HTTPException: 501 for Parquet and Arrow without pyarrow installed
+    """
+    if params.format in COLUMNAR_FORMATS and not columnar_available():
+        raise HTTPException(
+            status_code=501,
+            detail=f'{params.format} reports need the pyarrow package',
+        )
+    filename = f'{name}_{params.label}.{params.format}'
+
+    if params.stream:
+
+        async def chunks() -> AsyncIterator[List[dict]]:
+            async with sessions() as stream_session:
+                report_service = ReportService(DBService(stream_session))
+                async for rows in stream(report_service):
+                    yield rows
+
+        return generate_streaming_response(
+            chunks(), params.format, filename, model
+        )
+
+    async def build() -> CachedReport:
+        results = await fetch(ReportService(DBService(session)))
+        return render_report(results, params, filename, model)
+
+    report = await cache.get_or_create((name, params.model_dump_json()), build)
+    headers = {
+        **report.headers,
+        'ETag': report.etag,
+        'Cache-Control': 'no-cache',
+    }
+    if etag_matches(request.headers.get('if-none-match'), report.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=report.body, media_type=report.media_type, headers=headers
+    )
+
+
+@router.get('/quarterly-hiring', response_model=List[QuarterlyHires])
+async def get_quarterly_hiring(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_read_db)],
+    sessions: Annotated[
+        Callable[[], AsyncSession], Depends(get_read_session_factory)
+    ],
+    cache: Annotated[ReportCache, Depends(get_report_cache)],
+    params: Annotated[ReportParams, Query()],
+) -> Response:
+    """
+    Get a report of employees hired by quarter, department and job, for a
+    year or a [start, end) date range
     """
     try:
-        db_service = DBService(session)
-        query = """
-        WITH DATA AS (
-            SELECT
-                d.name AS department,
-                j.name AS job,
-                datetime
-            FROM
-                hiredemployees e
-            INNER JOIN
-                departments d ON department_id = d.id
-            INNER JOIN
-                jobs j ON department_id = j.id
-            WHERE
-                e.datetime IS NOT NULL
-                AND EXTRACT(year FROM e.datetime) = 2021
+        return await send_report(
+            request,
+            session,
+            sessions,
+            cache,
+            'quarterly_hiring',
+            params,
+            QuarterlyHires,
+            fetch=lambda reports: reports.quarterly_hiring(params),
+            stream=lambda reports: reports.stream_quarterly_hiring(params),
         )
-        SELECT
-            department,
-            job,
-            SUM(CASE WHEN EXTRACT(quarter FROM datetime) = 1 THEN 1 ELSE 0 END) as q1,
-            SUM(CASE WHEN EXTRACT(quarter FROM datetime) = 2 THEN 1 ELSE 0 END) as q2,
-            SUM(CASE WHEN EXTRACT(quarter FROM datetime) = 3 THEN 1 ELSE 0 END) as q3,
-            SUM(CASE WHEN EXTRACT(quarter FROM datetime) = 4 THEN 1 ELSE 0 END) as q4
-        FROM DATA
-        GROUP BY
-            department,
-            job
-        ORDER BY
-            department,
-            job
-        """  # noqa: E501
-        results = await db_service.execute_select(query)
-
-        if format == 'csv':
-            return generate_csv_response(results, 'quarterly_hiring_2021.csv')
-        return results
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -69,57 +179,89 @@ async def get_quarterly_hiring_2021(
         ) from e
 
 
-@router.get(
-    '/departments-above-mean-2021', response_model=List[DepartmentHires]
-)
-async def get_departments_above_mean_2021(
-    session: Annotated[AsyncSession, Depends(get_db)],
-    format: str = Query(
-        'json', enum=['json', 'csv'], description='Response format'
-    ),
-) -> List[DepartmentHires]:
+@router.get('/quarterly-hiring-2021', response_model=List[QuarterlyHires])
+async def get_quarterly_hiring_2021(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_read_db)],
+    sessions: Annotated[
+        Callable[[], AsyncSession], Depends(get_read_session_factory)
+    ],
+    cache: Annotated[ReportCache, Depends(get_report_cache)],
+    format: Annotated[
+        ReportFormat, Query(description='Response format')
+    ] = 'json',
+) -> Response:
     """
-    Get departments that hired more employees than the mean in 2021
+    Get a report of employees hired in 2021 by quarter, department and job
+    """
+    return await get_quarterly_hiring(
+        request,
+        session,
+        sessions,
+        cache,
+        ReportParams(year=2021, format=format),
+    )
+
+
+@router.get('/departments-above-mean', response_model=List[DepartmentHires])
+async def get_departments_above_mean(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_read_db)],
+    sessions: Annotated[
+        Callable[[], AsyncSession], Depends(get_read_session_factory)
+    ],
+    cache: Annotated[ReportCache, Depends(get_report_cache)],
+    params: Annotated[ReportParams, Query()],
+) -> Response:
+    """
+    Get departments that hired more employees than the mean, for a year or
+    a [start, end) date range
     """
     try:
-        db_service = DBService(session)
-        query = """
-        WITH department_hires AS (
-            SELECT
-                d.id,
-                d.name,
-                COUNT(*) as hired_count
-            FROM
-                hiredemployees e
-            INNER JOIN
-                departments d ON d.id = e.department_id
-            WHERE
-                EXTRACT(year FROM e.datetime) = 2021
-            GROUP BY
-                d.id, d.name
+        return await send_report(
+            request,
+            session,
+            sessions,
+            cache,
+            'departments_above_mean',
+            params,
+            DepartmentHires,
+            fetch=lambda reports: reports.departments_above_mean(params),
+            stream=lambda reports: reports.stream_departments_above_mean(
+                params
+            ),
         )
-        SELECT
-            id,
-            name,
-            hired_count as hired_employees
-        FROM
-            department_hires
-        WHERE
-            hired_count > (SELECT AVG(hired_count) as mean_hired
-            FROM department_hires)
-        ORDER BY
-            hired_count DESC
-        """
-        results = await db_service.execute_select(query)
-
-        if format == 'csv':
-            return generate_csv_response(
-                results, 'departments_above_mean_2021.csv'
-            )
-        return results
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f'Error generating departments above mean report: {str(e)}',
         ) from e
+
+
+@router.get(
+    '/departments-above-mean-2021', response_model=List[DepartmentHires]
+)
+async def get_departments_above_mean_2021(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_read_db)],
+    sessions: Annotated[
+        Callable[[], AsyncSession], Depends(get_read_session_factory)
+    ],
+    cache: Annotated[ReportCache, Depends(get_report_cache)],
+    format: Annotated[
+        ReportFormat, Query(description='Response format')
+    ] = 'json',
+) -> Response:
+    """
+    Get departments that hired more employees than the mean in 2021
+    """
+    return await get_departments_above_mean(
+        request,
+        session,
+        sessions,
+        cache,
+        ReportParams(year=2021, format=format),
+    )
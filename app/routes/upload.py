@@ -1,135 +1,315 @@
 import io
 import logging
-from typing import Annotated
+from contextlib import ExitStack
+from functools import partial
+from typing import Annotated, List, NoReturn
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import Settings
+from app.dependencies.cache import get_dimension_cache, get_report_cache
 from app.dependencies.connection import get_db
+from app.dependencies.jobs import get_job_manager, get_upload_sessions
+from app.dependencies.metrics import metrics
 from app.models.base import Departments, HiredEmployees, Jobs
-from app.models.responses import ErrorDetail, UploadResponse
+from app.models.requests import (
+    IngestOptions,
+    UploadOptions,
+    UploadSessionOptions,
+)
+from app.models.responses import (
+    BatchUploadResponse,
+    FileUploadResponse,
+    ResumableUpload,
+    UploadJob,
+    UploadResponse,
+)
+from app.services.batch_service import (
+    BatchError,
+    BatchIngestService,
+    NoValidRecordsError,
+    collect_batch_files,
+)
+from app.services.columnar_service import (
+    ColumnarError,
+    FileFormat,
+    detect_upload,
+)
 from app.services.csv_service import CSVService
 from app.services.db_service import DBService
+from app.services.decompression import (
+    AsyncReadable,
+    Codec,
+    DecompressionError,
+    decompressed,
+)
+from app.services.dimension_cache import DimensionCache
+from app.services.ingest_service import IngestProgress, IngestService
+from app.services.job_service import UploadJobManager
+from app.services.report_cache import ReportCache
+from app.services.resumable_service import (
+    ResumableUploadManager,
+    UploadSessionConflict,
+)
+from app.utils.parsers import format_errors, generate_upload_response
 
 router = APIRouter(prefix='/upload', tags=['upload'])
 
 logger = logging.getLogger(__name__)
 settings = Settings()
 
+# Uploads that cannot be read at all, as opposed to invalid rows
+UNREADABLE_FILE_ERRORS = (
+    UnicodeDecodeError,
+    DecompressionError,
+    ColumnarError,
+)
+
+
+def raise_no_valid_records(
+    entity_name: str, validation_errors: list[tuple[int, str]]
+) -> NoReturn:
+    formatted_errors = format_errors(validation_errors)
+    logger.error(
+        f'CSV validation failed for {entity_name}: {formatted_errors}'
+    )
+    error_details = [
+        {'row': error.row, 'message': error.message}
+        for error in formatted_errors
+    ]
+    raise HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail={
+            'message': 'No valid records found',
+            'errors': error_details,
+        },
+    )
+
+
+def raise_database_error(entity_name: str, error: Exception) -> NoReturn:
+    logger.error(
+        f'Database error while uploading {entity_name}: {str(error)}',
+        exc_info=True,
+    )
+    raise HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f'Database error: {str(error)}',
+    ) from error
+
+
+def raise_unreadable_file(
+    entity_name: str,
+    error: UnicodeDecodeError | DecompressionError | ColumnarError,
+) -> NoReturn:
+    if isinstance(error, UnicodeDecodeError):
+        logger.error(
+            f'File encoding error for {entity_name}: {str(error)}',
+            exc_info=True,
+        )
+        detail = 'Invalid CSV file encoding. Please use UTF-8'
+    else:
+        logger.error(f'Unreadable {entity_name} file: {str(error)}')
+        detail = str(error)
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail=detail
+    ) from error
+
+
+def check_upload(
+    file: UploadFile, entity_name: str
+) -> tuple[FileFormat, Codec | None]:
+    """
+    Format and compression of an upload, see `detect_upload`.
+
+    Raises:
+        HTTPException: For files that are neither CSV, Parquet nor Arrow
+    """
+    upload_format, codec = None, None
+    if file and getattr(file, 'filename', ''):
+        upload_format, codec = detect_upload(file)
+    if upload_format is None:
+        logger.error(
+            f'Invalid file type for {entity_name}: {
+                getattr(file, "filename", "No filename")
+            }'
+        )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='File must be a CSV, Parquet or Arrow file',
+        )
+    return upload_format, codec
+
+
+async def buffered_upload(
+    file: AsyncReadable,
+    model_class: type,
+    options: UploadOptions,
+    db_service: DBService,
+    entity_name: str,
+    dimensions: DimensionCache | None = None,
+) -> IngestProgress:
+    """
+    Read and validate the whole file in memory, then insert it in chunks.
+    """
+    raw = options.method == 'staging'
+    known_ids = None
+    if dimensions is not None and not raw:
+        known_ids = await dimensions.known_ids(db_service, model_class)
+
+    contents = await file.read()
+    csv_file = io.StringIO(contents.decode('utf-8'))
+
+    records, validation_errors = CSVService.read_uploaded_rows(
+        csv_file,
+        model_class,
+        options.has_headers,
+        raw=raw,
+        known_ids=known_ids,
+        compact=True,
+    )
+    progress = IngestProgress(
+        rows_parsed=len(records) + len(validation_errors),
+        rows_rejected=len(validation_errors),
+        errors=validation_errors,
+    )
+    if not records:
+        return progress
 
-def format_error_message(error_msg: str) -> str:
-    """Extract field name, error and
-    input value from Pydantic validation message"""
     try:
-        lines = error_msg.split('\n')
-        field = lines[1].strip()
-        error = lines[2].strip()
+        inserted, rejected = await db_service.create_rows(
+            model_class,
+            records,
+            batch_size=settings.max_batch_size,
+            method=options.method,
+            transaction=options.transaction,
+            on_conflict=options.on_conflict,
+        )
+    except Exception as e:
+        raise_database_error(entity_name, e)
 
-        if 'input_value=' in error:
-            input_value = error.split('input_value=')[1].split(',')[0]
-            return f"{field}: got '{input_value}' - {error.split('] [')[0]}"
+    progress.rows_inserted = inserted
+    progress.rows_rejected += len(rejected)
+    progress.errors = sorted(validation_errors + rejected)
+    return progress
 
-        return f'{field}: {error}'
-    except:  # noqa: E722
-        return error_msg.split('\n')[0]
+
+async def stream_upload(
+    file: AsyncReadable,
+    model_class: type,
+    options: UploadOptions,
+    db_service: DBService,
+    entity_name: str,
+    dimensions: DimensionCache | None = None,
+    upload_format: FileFormat = 'csv',
+) -> IngestProgress:
+    """
+    Read the file in chunks, writing batches while the next one is parsed.
+    """
+    try:
+        progress = await IngestService(db_service, dimensions).ingest_stream(
+            file, model_class, options, file_format=upload_format
+        )
+    except UNREADABLE_FILE_ERRORS:
+        raise
+    except Exception as e:
+        raise_database_error(entity_name, e)
+
+    return progress
 
 
 async def process_upload(
     file: UploadFile,
     model_class: type,
-    has_headers: bool,
+    options: UploadOptions,
     db: AsyncSession,
     entity_name: str,
-) -> UploadResponse:
+    jobs: UploadJobManager | None = None,
+    cache: ReportCache | None = None,
+    dimensions: DimensionCache | None = None,
+) -> UploadResponse | JSONResponse:
     """
     Generic function to process CSV uploads for any model.
-    """
-    try:
-        # Safe filename check
-        if (
-            not file
-            or not getattr(file, 'filename', '')
-            or not file.filename.endswith('.csv')
-        ):
-            logger.error(
-                f'Invalid file type for {entity_name}: {
-                    getattr(file, "filename", "No filename")
-                }'
-            )
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail='File must be a CSV',
-            )
 
-        contents = await file.read()
-        csv_file = io.StringIO(contents.decode('utf-8'))
+    Files compressed with gzip, bz2 or zstd, named `*.csv.gz`, `*.csv.bz2`
+    or `*.csv.zst` or sent with a Content-Encoding header, are
+    decompressed as they are read. Parquet (`*.parquet`) and Arrow IPC
+    (`*.arrow`, `*.feather`) files are always streamed, their columns
+    matched by name.
 
-        records, validation_errors = CSVService.read_uploaded_csv(
-            csv_file, model_class, has_headers
-        )
+    With `options.background` the file is handed to `jobs` and a 202
+    response with the queued job is returned right away.
 
-        # Convert tuple errors to ErrorDetail objects
-        formatted_errors = [
-            ErrorDetail(row=row, message=format_error_message(error_msg))
-            for row, error_msg in validation_errors
-        ]
+    Files of any size are written in chunks of `max_batch_size`; with
+    `transaction='chunk'` each chunk is committed on its own, so rows
+    before a database error stay in the database.
 
-        if not records:
-            logger.error(
-                f'CSV validation failed for {entity_name}: {formatted_errors}'
+    Once the upload is over `cache` is invalidated, so the reports are
+    rebuilt from the new data. `dimensions` provides the department and
+    job ids employee rows are checked against, and forgets the ids of the
+    uploaded table.
+    """
+    try:
+        upload_format, codec = check_upload(file, entity_name)
+        if options.background and jobs is not None:
+            # Spooled compressed, decompressed by the job
+            job = await jobs.submit(
+                file, model_class, options, entity_name, codec, upload_format
             )
-            error_details = [
-                {'row': error.row, 'message': error.message}
-                for error in formatted_errors
-            ]
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail={
-                    'message': 'No valid records found',
-                    'errors': error_details,
-                },
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content=job.model_dump(mode='json'),
             )
 
+        db_service = DBService(db)
+        if upload_format != 'csv' or options.streaming or options.parallel:
+            upload = partial(stream_upload, upload_format=upload_format)
+        else:
+            upload = buffered_upload
         try:
-            db_service = DBService(db)
-            await db_service.create_batch(
-                records, batch_size=settings.max_batch_size
+            progress = await upload(
+                decompressed(file, codec, settings.upload_chunk_size),
+                model_class,
+                options,
+                db_service,
+                entity_name,
+                dimensions,
             )
-        except Exception as e:
-            logger.error(
-                f'Database error while uploading {entity_name}: {str(e)}',
-                exc_info=True,
-            )
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f'Database error: {str(e)}',
-            ) from e
+        finally:
+            # Chunk transactions may commit part of a file that then fails
+            if cache is not None:
+                cache.invalidate()
+            if dimensions is not None:
+                dimensions.invalidate(model_class)
 
-        # If we got here, we successfully inserted at least some records
-        success_message = (
-            f'Successfully uploaded {len(records)} {entity_name} records'
+        metrics.record_upload(
+            model_class.__tablename__,
+            progress.rows_parsed,
+            progress.rows_inserted,
+            progress.rows_rejected,
         )
-        if formatted_errors:
-            success_message += (
-                f' with {len(formatted_errors)} validation errors'
-            )
+        if not progress.rows_inserted:
+            raise_no_valid_records(entity_name, progress.errors)
 
-        logger.info(success_message)
-        return UploadResponse(
-            message=success_message,
-            total_records=len(records),
-            errors=formatted_errors,
+        # If we got here, we successfully inserted at least some records
+        response = generate_upload_response(
+            entity_name, progress.rows_inserted, progress.errors
         )
+        logger.info(response.message)
+        return response
 
-    except UnicodeDecodeError as e:
-        logger.error(
-            f'File encoding error for {entity_name}: {str(e)}', exc_info=True
-        )
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail='Invalid CSV file encoding. Please use UTF-8',
-        ) from e
+    except UNREADABLE_FILE_ERRORS as e:
+        raise_unreadable_file(entity_name, e)
     except HTTPException:
         raise
     except Exception as e:
@@ -142,35 +322,252 @@ async def process_upload(
         ) from e
 
 
-@router.post('/departments', response_model=UploadResponse)
+async def process_batch_upload(
+    uploads: List[UploadFile],
+    options: IngestOptions,
+    db: AsyncSession,
+    cache: ReportCache | None = None,
+    dimensions: DimensionCache | None = None,
+) -> BatchUploadResponse:
+    """
+    Load CSV files of several tables, plain or compressed like in
+    `process_upload`, or zip/tar archives of them, in foreign key order
+    and in a single transaction. A file without valid rows or a database
+    error rolls back the whole batch.
+    """
+    with ExitStack() as stack:
+        try:
+            files = collect_batch_files(uploads, stack)
+        except BatchError as e:
+            logger.error(f'Invalid batch upload: {str(e)}')
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+            ) from e
+        if not files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='No CSV files found in the upload',
+            )
+
+        dimension_models = (
+            list(dimensions.models.values()) if dimensions else []
+        )
+        try:
+            await BatchIngestService(DBService(db), dimension_models).ingest(
+                files, options
+            )
+        except NoValidRecordsError as e:
+            raise_no_valid_records(
+                e.batch_file.entity_name, e.batch_file.progress.errors
+            )
+        except UNREADABLE_FILE_ERRORS as e:
+            raise_unreadable_file('batch', e)
+        except Exception as e:
+            raise_database_error('batch', e)
+        finally:
+            if cache is not None:
+                cache.invalidate()
+            if dimensions is not None:
+                for batch_file in files:
+                    dimensions.invalidate(batch_file.model_class)
+
+    results = []
+    for batch_file in files:
+        progress = batch_file.progress
+        metrics.record_upload(
+            batch_file.model_class.__tablename__,
+            progress.rows_parsed,
+            progress.rows_inserted,
+            progress.rows_rejected,
+        )
+        response = generate_upload_response(
+            batch_file.entity_name, progress.rows_inserted, progress.errors
+        )
+        results.append(
+            FileUploadResponse(file=batch_file.name, **response.model_dump())
+        )
+    total_records = sum(result.total_records for result in results)
+    message = (
+        f'Successfully uploaded {total_records} records '
+        f'from {len(results)} files'
+    )
+    logger.info(message)
+    return BatchUploadResponse(
+        message=message, total_records=total_records, files=results
+    )
+
+
+@router.post('/departments', response_model=UploadResponse | UploadJob)
 async def upload_departments(
     db: Annotated[AsyncSession, Depends(get_db)],
+    jobs: Annotated[UploadJobManager, Depends(get_job_manager)],
+    cache: Annotated[ReportCache, Depends(get_report_cache)],
+    dimensions: Annotated[DimensionCache, Depends(get_dimension_cache)],
+    options: Annotated[UploadOptions, Query()],
     file: UploadFile = File(...),  # noqa: B008
-    has_headers: bool = False,
 ):
     """Upload departments from CSV file."""
     return await process_upload(
-        file, Departments, has_headers, db, 'Departments'
+        file, Departments, options, db, 'Departments', jobs, cache, dimensions
     )
 
 
-@router.post('/jobs', response_model=UploadResponse)
+@router.post('/jobs', response_model=UploadResponse | UploadJob)
 async def upload_jobs(
     db: Annotated[AsyncSession, Depends(get_db)],
+    jobs: Annotated[UploadJobManager, Depends(get_job_manager)],
+    cache: Annotated[ReportCache, Depends(get_report_cache)],
+    dimensions: Annotated[DimensionCache, Depends(get_dimension_cache)],
+    options: Annotated[UploadOptions, Query()],
     file: UploadFile = File(...),  # noqa: B008
-    has_headers: bool = False,
 ):
     """Upload jobs from CSV file."""
-    return await process_upload(file, Jobs, has_headers, db, 'Jobs')
+    return await process_upload(
+        file, Jobs, options, db, 'Jobs', jobs, cache, dimensions
+    )
 
 
-@router.post('/employees', response_model=UploadResponse)
+@router.post('/employees', response_model=UploadResponse | UploadJob)
 async def upload_employees(
     db: Annotated[AsyncSession, Depends(get_db)],
+    jobs: Annotated[UploadJobManager, Depends(get_job_manager)],
+    cache: Annotated[ReportCache, Depends(get_report_cache)],
+    dimensions: Annotated[DimensionCache, Depends(get_dimension_cache)],
+    options: Annotated[UploadOptions, Query()],
     file: UploadFile = File(...),  # noqa: B008
-    has_headers: bool = False,
 ):
     """Upload hired employees from CSV file."""
     return await process_upload(
-        file, HiredEmployees, has_headers, db, 'Employees'
+        file, HiredEmployees, options, db, 'Employees', jobs, cache, dimensions
     )
+
+
+@router.post('/batch', response_model=BatchUploadResponse)
+async def upload_batch(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    cache: Annotated[ReportCache, Depends(get_report_cache)],
+    dimensions: Annotated[DimensionCache, Depends(get_dimension_cache)],
+    options: Annotated[IngestOptions, Query()],
+    files: List[UploadFile] = File(...),  # noqa: B008
+):
+    """
+    Upload departments, jobs and hired employees in one transaction, from
+    CSV files named after their table or zip/tar archives of them.
+    """
+    return await process_batch_upload(files, options, db, cache, dimensions)
+
+
+@router.get('/jobs/{job_id}', response_model=UploadJob)
+async def get_upload_job(
+    job_id: str,
+    jobs: Annotated[UploadJobManager, Depends(get_job_manager)],
+):
+    """Get progress and result of a background upload job."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Upload job {job_id} not found',
+        )
+    return job
+
+
+def raise_session_not_found(session_id: str) -> NoReturn:
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f'Upload session {session_id} not found',
+    )
+
+
+@router.post(
+    '/sessions',
+    response_model=ResumableUpload,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_upload_session(
+    sessions: Annotated[ResumableUploadManager, Depends(get_upload_sessions)],
+    options: Annotated[UploadSessionOptions, Query()],
+):
+    """
+    Start a resumable upload of a CSV file, sent in chunks with
+    `PUT /upload/sessions/{id}` and loaded while they arrive.
+    """
+    return await sessions.create(
+        options.entity,
+        IngestOptions(**options.model_dump(exclude={'entity'})),
+    )
+
+
+@router.put('/sessions/{session_id}', response_model=ResumableUpload)
+async def upload_session_chunk(
+    session_id: str,
+    request: Request,
+    sessions: Annotated[ResumableUploadManager, Depends(get_upload_sessions)],
+    offset: int = Query(
+        ..., ge=0, description='Position of the chunk in the file'
+    ),
+):
+    """
+    Append the request body to the file of an upload session. `offset`
+    must be the `received` size of the session; after a dropped
+    connection, get the session and send the rest from there.
+    """
+    try:
+        upload = await sessions.append(session_id, offset, request.stream())
+    except UploadSessionConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=str(e)
+        ) from e
+    if upload is None:
+        raise_session_not_found(session_id)
+    return upload
+
+
+@router.post('/sessions/{session_id}/complete', response_model=ResumableUpload)
+async def complete_upload_session(
+    session_id: str,
+    sessions: Annotated[ResumableUploadManager, Depends(get_upload_sessions)],
+):
+    """
+    Load the rest of the file of an upload session and return its result.
+    A session that failed to load resumes from its checkpoint.
+    """
+    try:
+        upload = await sessions.complete(session_id)
+    except UploadSessionConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=str(e)
+        ) from e
+    if upload is None:
+        raise_session_not_found(session_id)
+    if upload.status == 'failed' and upload.result is not None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                'message': 'No valid records found',
+                'errors': [
+                    error.model_dump() for error in upload.result.errors
+                ],
+            },
+        )
+    if upload.status == 'failed':
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=(
+                f'Upload session failed after row {upload.committed_rows}: '
+                f'{upload.error}. Complete it again to resume from there'
+            ),
+        )
+    return upload
+
+
+@router.get('/sessions/{session_id}', response_model=ResumableUpload)
+async def get_upload_session(
+    session_id: str,
+    sessions: Annotated[ResumableUploadManager, Depends(get_upload_sessions)],
+):
+    """Get the received bytes and the load checkpoint of an upload session."""
+    upload = await sessions.get(session_id)
+    if upload is None:
+        raise_session_not_found(session_id)
+    return upload
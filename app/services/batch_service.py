@@ -0,0 +1,212 @@
+import tarfile
+import zipfile
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import Dict, List, Sequence, Tuple, Type
+
+from fastapi import UploadFile
+from sqlmodel import SQLModel
+
+from app.models.base import Departments, HiredEmployees, Jobs
+from app.models.requests import IngestOptions, UploadOptions
+from app.services.columnar_service import FileFormat, detect_upload
+from app.services.db_service import DBService
+from app.services.decompression import (
+    AsyncReadable,
+    DecompressionError,
+    decompressed,
+    strip_codec_suffix,
+)
+from app.services.dimension_cache import DimensionCache
+from app.services.ingest_service import IngestProgress, IngestService
+
+# CSV file names accepted in a batch, with the table they load and the
+# name used in messages
+BATCH_ENTITIES: Dict[str, Tuple[Type[SQLModel], str]] = {
+    'departments': (Departments, 'Departments'),
+    'jobs': (Jobs, 'Jobs'),
+    'hired_employees': (HiredEmployees, 'Employees'),
+    'hiredemployees': (HiredEmployees, 'Employees'),
+    'employees': (HiredEmployees, 'Employees'),
+}
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = (
+    '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz',
+)  # fmt: skip
+
+
+class BatchError(ValueError):
+    """The files of a batch cannot be loaded as sent."""
+
+
+class NoValidRecordsError(Exception):
+    def __init__(self, batch_file: 'BatchFile'):
+        super().__init__(f'No valid records found in {batch_file.name}')
+        self.batch_file = batch_file
+
+
+@dataclass
+class BatchFile:
+    name: str
+    model_class: Type[SQLModel]
+    entity_name: str
+    file: AsyncReadable
+    file_format: FileFormat = 'csv'
+    progress: IngestProgress = field(default_factory=IngestProgress)
+
+
+def is_data_file(name: str) -> bool:
+    """Skip the folders and metadata files archivers add, like __MACOSX."""
+    path = PurePosixPath(name)
+    return not any(part.startswith(('.', '__MACOSX')) for part in path.parts)
+
+
+def expand_upload(
+    upload: UploadFile, stack: ExitStack
+) -> List[Tuple[str, UploadFile]]:
+    """
+    (name, file) of every file of a zip or tar archive, or of the upload
+    itself. Archive members are read straight from the upload as they are
+    ingested, never extracted to disk; `stack` closes them.
+    """
+    name = upload.filename or ''
+    lowered = name.lower()
+    try:
+        if lowered.endswith(ZIP_SUFFIXES):
+            archive = stack.enter_context(zipfile.ZipFile(upload.file))
+            return [
+                (
+                    info.filename,
+                    UploadFile(
+                        file=stack.enter_context(archive.open(info)),
+                        filename=info.filename,
+                    ),
+                )
+                for info in archive.infolist()
+                if not info.is_dir() and is_data_file(info.filename)
+            ]
+        if lowered.endswith(TAR_SUFFIXES):
+            archive = stack.enter_context(
+                tarfile.open(fileobj=upload.file, mode='r:*')
+            )
+            return [
+                (
+                    member.name,
+                    UploadFile(
+                        file=archive.extractfile(member), filename=member.name
+                    ),
+                )
+                for member in archive.getmembers()
+                if member.isfile() and is_data_file(member.name)
+            ]
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise BatchError(f'Invalid archive {name}: {str(e)}') from e
+    return [(name, upload)]
+
+
+def collect_batch_files(
+    uploads: Sequence[UploadFile], stack: ExitStack
+) -> List[BatchFile]:
+    """
+    Files of a batch upload, in the order the tables depend on each other,
+    so departments and jobs are loaded before the employees referencing
+    them. Tables can come as CSV, also compressed like departments.csv.gz,
+    Parquet or Arrow files.
+
+    Raises:
+        BatchError: For files that do not name a table, or two files for
+            the same table
+    """
+    files: Dict[str, BatchFile] = {}
+    for upload in uploads:
+        for name, file in expand_upload(upload, stack):
+            try:
+                upload_format, codec = detect_upload(file)
+            except DecompressionError as e:
+                raise BatchError(f'{name}: {str(e)}') from e
+            path = PurePosixPath(strip_codec_suffix(name))
+            entity = BATCH_ENTITIES.get(path.stem.lower())
+            if upload_format is None or entity is None:
+                raise BatchError(
+                    f'Unexpected file {name}, expected '
+                    f'{", ".join(f"{n}.csv" for n in BATCH_ENTITIES)} '
+                    'or their .parquet or .arrow counterparts'
+                )
+            model_class, entity_name = entity
+            table_name = model_class.__tablename__
+            if table_name in files:
+                raise BatchError(
+                    f'Both {files[table_name].name} and {name} '
+                    f'load {table_name}'
+                )
+            files[table_name] = BatchFile(
+                name,
+                model_class,
+                entity_name,
+                decompressed(file, codec),
+                upload_format,
+            )
+
+    order = {
+        table.name: position
+        for position, table in enumerate(SQLModel.metadata.sorted_tables)
+    }
+    return sorted(
+        files.values(), key=lambda f: order[f.model_class.__tablename__]
+    )
+
+
+class BatchIngestService:
+    """
+    Loads the files of a batch one after the other through the pipelined
+    writer of a single session, in one transaction: either every file is
+    loaded or none is.
+    """
+
+    def __init__(
+        self,
+        db_service: DBService,
+        dimension_models: Sequence[Type[SQLModel]] = (),
+    ):
+        self.db_service = db_service
+        self.dimension_models = dimension_models
+
+    async def ingest(
+        self, files: Sequence[BatchFile], options: IngestOptions
+    ) -> None:
+        """
+        Ingest `files` in order, committing once after the last one.
+
+        Employee rows are checked against the departments and jobs of the
+        same batch, read back from the open transaction into a dimension
+        cache private to the batch, so the process-wide cache never holds
+        ids that could still be rolled back.
+
+        Raises:
+            NoValidRecordsError: For a file without any valid row, after
+                rolling the whole batch back
+        """
+        dimensions = DimensionCache(self.dimension_models)
+        ingest = IngestService(self.db_service, dimensions)
+        upload_options = UploadOptions(
+            **options.model_dump(), transaction='file'
+        )
+        session = self.db_service.session
+        try:
+            for batch_file in files:
+                await ingest.ingest_stream(
+                    batch_file.file,
+                    batch_file.model_class,
+                    upload_options,
+                    batch_file.progress,
+                    commit=False,
+                    file_format=batch_file.file_format,
+                )
+                if not batch_file.progress.rows_inserted:
+                    raise NoValidRecordsError(batch_file)
+                dimensions.invalidate(batch_file.model_class)
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
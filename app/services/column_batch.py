@@ -0,0 +1,211 @@
+import sys
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Iterator, List, Literal, Sequence
+
+from sqlalchemy import DateTime, Integer, String
+
+ColumnKind = Literal['int', 'datetime', 'str', 'object']
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+KINDS = {Integer: 'int', DateTime: 'datetime', String: 'str'}
+
+
+def get_kind(column) -> ColumnKind:
+    for column_type, kind in KINDS.items():
+        if isinstance(column.type, column_type):
+            return kind
+    return 'object'
+
+
+class StringColumn:
+    """Strings of a column stored end to end in one buffer."""
+
+    __slots__ = ('buffer', 'offsets')
+
+    def __init__(self, buffer: str, offsets: array):
+        self.buffer = buffer
+        # len(values) + 1 offsets, value i is buffer[offsets[i]:offsets[i+1]]
+        self.offsets = offsets
+
+    @classmethod
+    def from_values(cls, values: Sequence[str]) -> 'StringColumn':
+        offsets = array('q', [0])
+        offsets.extend(accumulate(map(len, values)))
+        return cls(''.join(values), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        buffer, offsets = self.buffer, self.offsets
+        return (buffer[offsets[i] : offsets[i + 1]] for i in range(len(self)))
+
+    def __getitem__(self, index: slice) -> 'StringColumn':
+        start, stop, _ = index.indices(len(self))
+        stop = max(start, stop)
+        begin, end = self.offsets[start], self.offsets[stop]
+        offsets = array(
+            'q', (o - begin for o in self.offsets[start : stop + 1])
+        )
+        return StringColumn(self.buffer[begin:end], offsets)
+
+    @property
+    def nbytes(self) -> int:
+        offsets = self.offsets.itemsize * len(self.offsets)
+        return sys.getsizeof(self.buffer) + offsets
+
+    @staticmethod
+    def concat(columns: Sequence['StringColumn']) -> 'StringColumn':
+        offsets = array('q', [0])
+        shift = 0
+        for column in columns:
+            offsets.extend(o + shift for o in column.offsets[1:])
+            shift += len(column.buffer)
+        return StringColumn(''.join(c.buffer for c in columns), offsets)
+
+
+def encode(kind: ColumnKind, values: Sequence):
+    """
+    Pack a column, falling back to a list for values the packed form
+    cannot hold, like None or integers out of the int64 range.
+    """
+    try:
+        if kind == 'int':
+            return 'int', array('q', values)
+        if kind == 'datetime':
+            return 'datetime', array(
+                'q', [(v - EPOCH) // MICROSECOND for v in values]
+            )
+        if kind == 'str':
+            return 'str', StringColumn.from_values(values)
+    except (OverflowError, TypeError):
+        pass
+    return 'object', list(values)
+
+
+def decode(kind: ColumnKind, column) -> Iterator:
+    if kind == 'datetime':
+        return (EPOCH + timedelta(microseconds=v) for v in column)
+    return iter(column)
+
+
+class ColumnBatch:
+    """
+    Compact, column-oriented batch of validated rows.
+
+    Integers are kept in `array('q')`, datetimes as int64 microseconds since
+    the epoch and strings of a column in a single buffer with offsets, so a
+    row costs a few dozen bytes instead of a tuple of boxed Python objects.
+    It also pickles to a handful of buffers on its way back from the parser
+    processes.
+
+    Slicing returns another batch and iterating yields the rows as tuples in
+    mapper column order, one at a time, so the loaders can consume a batch
+    like the list of tuples it replaces.
+    """
+
+    __slots__ = ('kinds', 'columns', 'length')
+
+    def __init__(self, kinds: List[ColumnKind], columns: list, length: int):
+        self.kinds = kinds
+        self.columns = columns
+        self.length = length
+
+    @classmethod
+    def from_columns(
+        cls, kinds: Sequence[ColumnKind], columns: Sequence[Sequence]
+    ) -> 'ColumnBatch':
+        """Build a batch from one sequence of Python values per column."""
+        encoded = [
+            encode(kind, values)
+            for kind, values in zip(kinds, columns, strict=True)
+        ]
+        length = len(columns[0]) if columns else 0
+        return cls(
+            [kind for kind, _ in encoded],
+            [column for _, column in encoded],
+            length,
+        )
+
+    @classmethod
+    def empty(cls, kinds: Sequence[ColumnKind]) -> 'ColumnBatch':
+        return cls.from_columns(kinds, [[] for _ in kinds])
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[tuple]:
+        return zip(
+            *(
+                decode(kind, column)
+                for kind, column in zip(self.kinds, self.columns, strict=True)
+            ),
+            strict=True,
+        )
+
+    def values(self, position: int) -> Iterator:
+        """Values of a single column, without building the row tuples."""
+        return decode(self.kinds[position], self.columns[position])
+
+    def __getitem__(self, index: slice) -> 'ColumnBatch':
+        if not isinstance(index, slice):
+            raise TypeError('ColumnBatch only supports slicing')
+        start, stop, _ = index.indices(self.length)
+        return ColumnBatch(
+            list(self.kinds),
+            [column[start:stop] for column in self.columns],
+            max(0, stop - start),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the stored values, without object headers."""
+        total = 0
+        for column in self.columns:
+            if isinstance(column, array):
+                total += column.itemsize * len(column)
+            elif isinstance(column, StringColumn):
+                total += column.nbytes
+            else:
+                total += 8 * len(column)
+        return total
+
+    @staticmethod
+    def concat(batches: Sequence['ColumnBatch']) -> 'ColumnBatch':
+        first = batches[0]
+        kinds, columns = [], []
+        for position, kind in enumerate(first.kinds):
+            parts = [batch.columns[position] for batch in batches]
+            if all(batch.kinds[position] == kind for batch in batches):
+                if kind == 'str':
+                    columns.append(StringColumn.concat(parts))
+                elif kind in {'int', 'datetime'}:
+                    merged = array('q')
+                    for part in parts:
+                        merged.extend(part)
+                    columns.append(merged)
+                else:
+                    columns.append([v for part in parts for v in part])
+                kinds.append(kind)
+            else:
+                # A batch fell back to objects, decode all of them
+                columns.append([
+                    v
+                    for batch in batches
+                    for v in decode(
+                        batch.kinds[position], batch.columns[position]
+                    )
+                ])
+                kinds.append('object')
+        return ColumnBatch(kinds, columns, sum(len(b) for b in batches))
+
+
+def concat_rows(parts: Sequence) -> Sequence:
+    """Concatenate batches, either all ColumnBatch or all lists of tuples."""
+    if parts and isinstance(parts[0], ColumnBatch):
+        return ColumnBatch.concat(parts)
+    return [row for part in parts for row in part]
@@ -0,0 +1,445 @@
+from array import array
+from functools import lru_cache
+from pathlib import PurePosixPath
+from typing import (
+    AsyncIterator,
+    BinaryIO,
+    Collection,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import SQLModel
+from sqlmodel import inspect as sqlmodel_inspect
+
+from app.services.column_batch import (
+    ColumnBatch,
+    ColumnKind,
+    StringColumn,
+    get_kind,
+)
+from app.services.decompression import (
+    Codec,
+    DecompressionError,
+    strip_codec_suffix,
+    upload_codec,
+)
+from app.services.row_validator import get_converter, missing_reference
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from pyarrow import ipc
+except ImportError:  # Optional, pip install globant[columnar]
+    pa = None
+
+FileFormat = Literal['csv', 'parquet', 'arrow']
+
+SUFFIXES: Dict[str, FileFormat] = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.arrows': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+}
+# Arrow IPC files start with it, streams with a schema message
+ARROW_FILE_MAGIC = b'ARROW1'
+MISSING_VALUE = 'Field required'
+INVALID_STRING = 'Input should be a valid string'
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+
+class ColumnarError(ValueError):
+    """A Parquet or Arrow file cannot be read."""
+
+
+def file_format(filename: str) -> Optional[FileFormat]:
+    """
+    Format of an upload from its name: Parquet, Arrow IPC or CSV, plain or
+    compressed. None for anything else.
+    """
+    columnar = SUFFIXES.get(PurePosixPath(filename).suffix.lower())
+    if columnar is not None:
+        return columnar
+    if strip_codec_suffix(filename).lower().endswith('.csv'):
+        return 'csv'
+    return None
+
+
+def detect_upload(
+    file: UploadFile,
+) -> Tuple[Optional[FileFormat], Optional[Codec]]:
+    """
+    Format and compression of an upload, from its name and headers. The
+    format is None for files that are neither CSV, Parquet nor Arrow.
+
+    Raises:
+        DecompressionError: For unsupported compressions, or compressed
+            Parquet and Arrow files
+    """
+    upload_format = file_format(file.filename or '')
+    if upload_format is None:
+        return None, None
+    codec = upload_codec(file)
+    if codec is not None and upload_format != 'csv':
+        raise DecompressionError(
+            f'{upload_format.capitalize()} files compress their columns, '
+            f'send them without {codec} compression'
+        )
+    return upload_format, codec
+
+
+def arrow_type(kind: ColumnKind) -> 'pa.DataType':
+    """
+    Arrow type the values of a column kind are converted to, strings for
+    columns of other types, which the CSV path keeps as they are read.
+    """
+    if kind == 'int':
+        return pa.int64()
+    if kind == 'datetime':
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def int64_values(values: 'pa.Array') -> array:
+    """Copy the buffer of an int64 (or timestamp[us]) array without nulls."""
+    packed = array('q')
+    data = values.buffers()[1]
+    if data is not None:
+        start = values.offset * packed.itemsize
+        end = start + len(values) * packed.itemsize
+        packed.frombytes(memoryview(data)[start:end])
+    return packed
+
+
+def string_values(values: 'pa.Array') -> StringColumn:
+    """
+    StringColumn of a string array without nulls: the UTF-8 data is
+    decoded once and the offsets recomputed in characters.
+    """
+    _, value_offsets, data = values.buffers()
+    if not len(values) or data is None:
+        return StringColumn.from_values([''] * len(values))
+    bounds = array('i')
+    bounds.frombytes(
+        memoryview(value_offsets)[
+            values.offset * bounds.itemsize : (values.offset + len(values) + 1)
+            * bounds.itemsize
+        ]
+    )
+    start, end = bounds[0], bounds[-1]
+    buffer = bytes(memoryview(data)[start:end]).decode('utf-8')
+    offsets = array('q', [0])
+    lengths = pc.cumulative_sum(pc.utf8_length(values).cast(pa.int64()))
+    offsets.extend(int64_values(lengths))
+    return StringColumn(buffer, offsets)
+
+
+def raw_strings(column: 'pa.Array') -> 'pa.Array':
+    """
+    Values of a column as strings. Arrow writes fractions of a second and
+    the Z of zoned timestamps, so these are cast to whole seconds first.
+    """
+    if pa.types.is_timestamp(column.type):
+        column = column.cast(pa.timestamp('s'), safe=False)
+    return column.cast(pa.string())
+
+
+class ArrowValidator:
+    """
+    Columnar counterpart of RowValidator for Parquet and Arrow record
+    batches, compiled once per model from its mapper.
+
+    Columns already stored with the right type, like integers, timestamps
+    and strings out of a warehouse export, are checked and cast with Arrow
+    compute kernels and copied into a ColumnBatch buffer by buffer, so no
+    Python object is created per value. Only columns of another type, like
+    integers written as strings, go through the converters of the CSV path
+    value by value.
+    """
+
+    def __init__(self, model_class: Type[SQLModel]):
+        mapper = sqlmodel_inspect(model_class)
+        self.fields = [column.key for column in mapper.columns]
+        self.columns = [column.name for column in mapper.columns]
+        self.kinds = [get_kind(column) for column in mapper.columns]
+        self._converters = [get_converter(column) for column in mapper.columns]
+        self._references = [
+            next((key.column.table.name for key in column.foreign_keys), None)
+            for column in mapper.columns
+        ]
+
+    def select(self, schema: 'pa.Schema') -> List[str]:
+        """
+        Names of the model columns in `schema`, matched regardless of case;
+        other columns are never read.
+
+        Raises:
+            ColumnarError: For model columns missing from the file
+        """
+        names = {name.lower(): name for name in schema.names}
+        missing = [c for c in self.columns if c.lower() not in names]
+        if missing:
+            raise ColumnarError(
+                f'Missing columns {", ".join(missing)}, expected '
+                f'{", ".join(self.columns)}'
+            )
+        return [names[column.lower()] for column in self.columns]
+
+    def validate(
+        self,
+        batch: 'pa.RecordBatch',
+        start: int = 1,
+        value_sets: Optional[Mapping[str, 'pa.Array']] = None,
+    ) -> Tuple[ColumnBatch, List[Tuple[int, str]]]:
+        """
+        Convert a record batch with the model columns in mapper order.
+
+        Args:
+            batch: Record batch, see `select`
+            start: Row number of the first row, used in error messages
+            value_sets: Ids of the referenced tables by table name, as
+                int64 arrays; foreign keys to other tables are not checked
+
+        Returns:
+            Tuple of (valid rows, (row number, message) errors)
+        """
+        failures: Dict[int, List[str]] = {}
+        converted = []
+        for position, column in enumerate(batch.columns):
+            field = self.fields[position]
+            for index in pc.indices_nonzero(pc.is_null(column)).to_pylist():
+                failures.setdefault(index, []).append(
+                    f'{field}: {MISSING_VALUE}'
+                )
+            values = self._convert(position, column, failures)
+            reference = self._references[position]
+            if value_sets and reference in value_sets:
+                unknown = pc.and_(
+                    pc.is_valid(values),
+                    pc.invert(
+                        pc.is_in(values, value_set=value_sets[reference])
+                    ),
+                )
+                for index in pc.indices_nonzero(unknown).to_pylist():
+                    failures.setdefault(index, []).append(
+                        f"{field}: got '{values[index].as_py()}' - "
+                        f'{missing_reference(reference)}'
+                    )
+            converted.append(values)
+
+        if failures:
+            keep = pa.array([
+                index not in failures for index in range(len(batch))
+            ])
+            converted = [values.filter(keep) for values in converted]
+        kinds = [
+            'str' if kind in {'str', 'object'} else kind for kind in self.kinds
+        ]
+        records = ColumnBatch(
+            kinds,
+            [
+                string_values(values)
+                if kind == 'str'
+                else int64_values(values)
+                for kind, values in zip(kinds, converted, strict=True)
+            ],
+            len(batch) - len(failures),
+        )
+        errors = [
+            (start + index, '; '.join(messages))
+            for index, messages in sorted(failures.items())
+        ]
+        return records, errors
+
+    @staticmethod
+    def validate_raw(
+        batch: 'pa.RecordBatch', start: int = 1
+    ) -> Tuple[List[tuple], List[Tuple[int, str]]]:
+        """
+        Like RowValidator.validate_raw: every value as a string, nulls as
+        empty strings, leaving types and keys to the staging table.
+        Timestamps are written as their UTC instant, see `raw_strings`.
+        """
+        columns = [
+            pc.fill_null(raw_strings(column), '').to_pylist()
+            for column in batch.columns
+        ]
+        rows = range(start, start + len(batch))
+        return list(zip(rows, *columns, strict=True)), []
+
+    def _convert(
+        self,
+        position: int,
+        column: 'pa.Array',
+        failures: Dict[int, List[str]],
+    ) -> 'pa.Array':
+        """
+        `column` as int64, timestamp[us] or string by the kind of the model
+        column. Values that cannot be converted become nulls.
+        """
+        kind = self.kinds[position]
+        target = arrow_type(kind)
+        try:
+            if kind in {'str', 'object'}:
+                return column.cast(target)
+            if kind == 'int' and pa.types.is_integer(column.type):
+                return column.cast(target)
+            if kind == 'datetime' and pa.types.is_timestamp(column.type):
+                # Time zone aware values are stored as UTC instants, which
+                # is what the naive timestamp keeps, like the Z of CSVs.
+                # Dates are left to the parser, which rejects them.
+                return column.cast(target)
+        except pa.ArrowInvalid:
+            # Out of range for int64 or microseconds, or invalid UTF-8
+            pass
+        return self._convert_slowly(position, column, failures)
+
+    def _convert_slowly(
+        self,
+        position: int,
+        column: 'pa.Array',
+        failures: Dict[int, List[str]],
+    ) -> 'pa.Array':
+        field = self.fields[position]
+        kind = self.kinds[position]
+        parse, message = self._converters[position] or (str, INVALID_STRING)
+        int_kind = kind == 'int'
+        result = []
+        for index, value in enumerate(column.to_pylist()):
+            if value is None:
+                result.append(None)
+                continue
+            try:
+                if isinstance(value, bytes):
+                    converted = parse(value.decode('utf-8'))
+                else:
+                    converted = parse(str(value))
+                if int_kind and not INT64_MIN <= converted <= INT64_MAX:
+                    raise ValueError(converted)
+            except (ValueError, TypeError):
+                failures.setdefault(index, []).append(
+                    f"{field}: got '{value}' - {message}"
+                )
+                converted = None
+            result.append(converted)
+        return pa.array(result, type=arrow_type(kind))
+
+
+@lru_cache
+def get_arrow_validator(model_class: Type[SQLModel]) -> ArrowValidator:
+    return ArrowValidator(model_class)
+
+
+def read_batches(
+    file: BinaryIO,
+    format_: FileFormat,
+    validator: ArrowValidator,
+    batch_size: int,
+) -> Iterator['pa.RecordBatch']:
+    """
+    Record batches of at most `batch_size` rows with only the model
+    columns, in mapper order. Parquet row groups are read one at a time and
+    only the selected columns are decoded.
+    """
+    if format_ == 'parquet':
+        parquet = pq.ParquetFile(file)
+        columns = validator.select(parquet.schema_arrow)
+        batches = parquet.iter_batches(batch_size=batch_size, columns=columns)
+    else:
+        magic = file.read(len(ARROW_FILE_MAGIC))
+        file.seek(0)
+        if magic == ARROW_FILE_MAGIC:
+            reader = ipc.open_file(file)
+            batches = (
+                reader.get_batch(i) for i in range(reader.num_record_batches)
+            )
+        else:
+            reader = ipc.open_stream(file)
+            batches = iter(reader)
+        columns = validator.select(reader.schema)
+
+    for batch in batches:
+        selected = batch.select(columns)
+        for offset in range(0, selected.num_rows, batch_size):
+            yield selected.slice(offset, batch_size)
+
+
+class ColumnarService:
+    @staticmethod
+    async def read_columnar_stream(
+        file: UploadFile,
+        model_class: Type[SQLModel],
+        format_: FileFormat,
+        batch_size: int = 1000,
+        raw: bool = False,
+        known_ids: Optional[Mapping[str, Collection[int]]] = None,
+    ) -> AsyncIterator[Tuple[Sequence[tuple], List[Tuple[int, str]]]]:
+        """
+        Read a Parquet or Arrow IPC (file or stream) upload in record
+        batches and yield them validated, like `CSVService.read_csv_stream`.
+
+        Columns are matched by name, so their order does not matter and
+        extra columns are ignored. Reading and validating a batch runs in
+        a worker thread; Arrow releases the GIL meanwhile.
+
+        Args:
+            file: Upload backed by a seekable file, Parquet keeps its
+                metadata at the end
+            model_class: SQLModel class the rows are validated against
+            format_: 'parquet' or 'arrow'
+            batch_size: Maximum number of rows per yielded batch
+            raw: Yield (row number, *values) tuples of strings, see
+                `ArrowValidator.validate_raw`
+            known_ids: Ids of referenced tables by table name, to reject
+                rows with unknown foreign keys
+
+        Yields:
+            Tuples of (rows, errors), rows being a ColumnBatch (a list of
+            raw tuples with `raw`) and errors carrying the row number in
+            the whole file
+
+        Raises:
+            ColumnarError: Without pyarrow, for corrupt files or files
+                missing model columns
+        """
+        if pa is None:
+            raise ColumnarError(
+                'Parquet and Arrow uploads need the pyarrow package'
+            )
+        validator = get_arrow_validator(model_class)
+        value_sets = {
+            table: pa.array(list(ids), pa.int64())
+            for table, ids in (known_ids or {}).items()
+        }
+
+        def next_batch(batches: Iterator['pa.RecordBatch'], start: int):
+            batch = next(batches, None)
+            if batch is None:
+                return None
+            if raw:
+                return validator.validate_raw(batch, start)
+            return validator.validate(batch, start, value_sets)
+
+        batches = read_batches(file.file, format_, validator, batch_size)
+        start = 1
+        try:
+            while (
+                result := await run_in_threadpool(next_batch, batches, start)
+            ) is not None:
+                rows, errors = result
+                start += len(rows) + len(errors)
+                yield rows, errors
+        except pa.ArrowException as e:
+            raise ColumnarError(f'Invalid {format_} file: {str(e)}') from e
@@ -1,13 +1,102 @@
+import asyncio
+import codecs
 import csv
 import io
-from typing import List, Tuple, Type, TypeVar
+from collections import deque
+from concurrent.futures import Executor
+from typing import (
+    AsyncIterator,
+    Collection,
+    Deque,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
+from fastapi import UploadFile
 from sqlmodel import SQLModel
 from sqlmodel import inspect as sqlmodel_inspect
 
+from app.services.column_batch import ColumnBatch, concat_rows
+from app.services.row_validator import get_row_validator
+
 ModelType = TypeVar('ModelType', bound=SQLModel)
 
 
+class CSVRecordSplitter:
+    """
+    Incrementally splits decoded CSV text into complete records.
+
+    A record is only emitted once its closing newline has been seen and its
+    quotes are balanced, so quoted fields containing line breaks are never
+    cut in half when the text arrives in arbitrary chunks.
+    """
+
+    def __init__(self):
+        self._pending = ''
+        self._record: List[str] = []
+        self._quotes = 0
+
+    def feed(self, text: str) -> List[str]:
+        self._pending += text
+        *lines, self._pending = self._pending.split('\n')
+        return self._collect(line + '\n' for line in lines)
+
+    def close(self) -> List[str]:
+        lines = [self._pending] if self._pending else []
+        self._pending = ''
+        records = self._collect(lines)
+        if self._record:
+            # Unbalanced quotes at EOF, let the csv reader report it
+            records.append(''.join(self._record))
+            self._record = []
+            self._quotes = 0
+        return records
+
+    def _collect(self, raw_records: Iterable[str]) -> List[str]:
+        records = []
+        for line in raw_records:
+            self._record.append(line)
+            self._quotes += line.count('"')
+            if self._quotes % 2 == 0:
+                records.append(''.join(self._record))
+                self._record = []
+                self._quotes = 0
+        return records
+
+
+def parse_raw_records(
+    model_class: Type[ModelType],
+    raw_records: List[str],
+    start: int,
+    raw: bool = False,
+    known_ids: Optional[Mapping[str, Collection[int]]] = None,
+) -> Tuple[List[tuple], List[Tuple[int, str]]]:
+    """
+    Validate a shard of raw CSV records starting at row `start` into a
+    ColumnBatch. With `raw` only the number of columns is checked, see
+    `validate_raw`.
+
+    Module level so it can be pickled and run in a worker process.
+    """
+    validator = get_row_validator(model_class)
+    try:
+        rows = list(csv.reader(raw_records))
+        if raw:
+            return validator.validate_raw(rows, start=start)
+        return validator.validate(
+            rows, start=start, known_ids=known_ids, compact=True
+        )
+    except Exception as e:
+        rows = [] if raw else ColumnBatch.empty(validator.kinds)
+        return rows, [(start, f'File reading error: {str(e)}')]
+
+
 class CSVService:
     @staticmethod
     def read_uploaded_csv(
@@ -23,37 +112,231 @@ class CSVService:
             if has_headers:
                 next(reader)
 
-            mapper = sqlmodel_inspect(model_class)
-            expected_fields = [column.description for column in mapper.columns]
-
-            for row_number, row in enumerate(reader, start=1):
-                try:
-                    if len(row) != len(expected_fields):
-                        errors.append((
-                            row_number,
-                            f'Expected {len(expected_fields)} columns '
-                            f'({", ".join(expected_fields)}), '
-                            f'got {len(row)}',
-                        ))
-                        continue
-
-                    record_dict = CSVService._convert_row_to_dict(
-                        row, expected_fields, mapper
-                    )
-
-                    record = model_class.model_validate(record_dict)
-                    records.append(record)
-
-                except ValueError as e:
-                    errors.append((row_number, f'Value error: {str(e)}'))
-                except Exception as e:
-                    errors.append((row_number, f'Unexpected error: {str(e)}'))
+            CSVService._parse_rows(reader, model_class, records, errors)
 
         except Exception as e:
             errors.append((0, f'File reading error: {str(e)}'))
 
         return records, errors
 
+    @staticmethod
+    def read_uploaded_rows(
+        file: io.StringIO,
+        model_class: Type[ModelType],
+        has_headers: bool = False,
+        raw: bool = False,
+        known_ids: Optional[Mapping[str, Collection[int]]] = None,
+        compact: bool = False,
+    ) -> Tuple[Sequence[tuple], List[Tuple[int, str]]]:
+        """
+        Fast path of `read_uploaded_csv` returning rows as tuples in mapper
+        column order instead of model instances, or as a ColumnBatch with
+        `compact`. With `raw` the values are kept as strings, see
+        `RowValidator.validate_raw`; otherwise foreign keys are checked
+        against `known_ids`, see `RowValidator.validate`.
+        """
+        validator = get_row_validator(model_class)
+        try:
+            reader = csv.reader(file)
+            if has_headers:
+                next(reader, None)
+            if raw:
+                return validator.validate_raw(list(reader))
+            return validator.validate(
+                list(reader), known_ids=known_ids, compact=compact
+            )
+        except Exception as e:
+            rows = (
+                ColumnBatch.empty(validator.kinds)
+                if compact and not raw
+                else []
+            )
+            return rows, [(0, f'File reading error: {str(e)}')]
+
+    @staticmethod
+    async def read_csv_stream(
+        file: UploadFile,
+        model_class: Type[ModelType],
+        has_headers: bool = False,
+        batch_size: int = 1000,
+        chunk_size: int = 1024 * 1024,
+        executor: Optional[Executor] = None,
+        max_in_flight: int = 4,
+        raw: bool = False,
+        known_ids: Optional[Mapping[str, Collection[int]]] = None,
+        first_row: int = 1,
+    ) -> AsyncIterator[Tuple[List[tuple], List[Tuple[int, str]]]]:
+        """
+        Read an uploaded CSV in chunks and yield validated batches.
+
+        The file is decoded incrementally, so peak memory depends on
+        `chunk_size` and `batch_size` instead of the size of the upload.
+
+        Args:
+            file: Uploaded file, read with `await file.read(chunk_size)`
+            model_class: SQLModel class the rows are validated against
+            has_headers: Whether the first record is a header to skip
+            batch_size: Maximum number of valid records per yielded batch
+            chunk_size: Number of bytes read from the file at a time
+            executor: Optional (process pool) executor the shards are
+                validated in, keeping the event loop free
+            max_in_flight: Number of shards submitted to the executor
+                before waiting for the oldest one
+            raw: Only check the number of columns and yield
+                (row number, *values) tuples of strings
+            known_ids: Ids of referenced tables by table name, to reject
+                rows with unknown foreign keys
+            first_row: Number of the first record, for files that continue
+                an earlier part of the same upload
+
+        Yields:
+            Tuples of (rows, errors), rows being a ColumnBatch (a list of
+            raw tuples with `raw`) and errors carrying the row number in
+            the whole file
+        """
+        parts: List[Sequence[tuple]] = []
+        pending = 0
+        errors: List[Tuple[int, str]] = []
+
+        async for rows, row_errors in CSVService._parse_shards(
+            CSVService._read_shards(
+                file, has_headers, batch_size, chunk_size, first_row
+            ),
+            model_class,
+            executor,
+            max_in_flight,
+            raw,
+            known_ids,
+        ):
+            parts.append(rows)
+            pending += len(rows)
+            errors.extend(row_errors)
+            if pending < batch_size:
+                continue
+
+            records = concat_rows(parts)
+            while len(records) >= batch_size:
+                yield records[:batch_size], errors
+                records = records[batch_size:]
+                errors = []
+            parts, pending = [records], len(records)
+
+        if pending or errors:
+            yield concat_rows(parts), errors
+
+    @staticmethod
+    async def _read_shards(
+        file: UploadFile,
+        has_headers: bool,
+        shard_size: int,
+        chunk_size: int,
+        first_row: int = 1,
+    ) -> AsyncIterator[Tuple[List[str], int]]:
+        """
+        Split the file on record boundaries into shards of at most
+        `shard_size` raw records, each with the row number it starts at.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        splitter = CSVRecordSplitter()
+        skip_header = has_headers
+        row_number = first_row
+
+        eof = False
+        while not eof:
+            chunk = await file.read(chunk_size)
+            eof = not chunk
+            if eof:
+                raw_records = splitter.feed(decoder.decode(b'', final=True))
+                raw_records += splitter.close()
+            else:
+                raw_records = splitter.feed(decoder.decode(chunk))
+
+            if skip_header and raw_records:
+                raw_records = raw_records[1:]
+                skip_header = False
+
+            for start in range(0, len(raw_records), shard_size):
+                shard = raw_records[start : start + shard_size]
+                yield shard, row_number
+                row_number += len(shard)
+
+    @staticmethod
+    async def _parse_shards(
+        shards: AsyncIterator[Tuple[List[str], int]],
+        model_class: Type[ModelType],
+        executor: Optional[Executor],
+        max_in_flight: int,
+        raw: bool = False,
+        known_ids: Optional[Mapping[str, Collection[int]]] = None,
+    ) -> AsyncIterator[Tuple[List[tuple], List[Tuple[int, str]]]]:
+        """
+        Validate shards inline or in `executor`, yielding the results in
+        file order whatever order the workers finish in.
+        """
+        if executor is None:
+            async for raw_records, start in shards:
+                yield parse_raw_records(
+                    model_class, raw_records, start, raw, known_ids
+                )
+            return
+
+        loop = asyncio.get_running_loop()
+        pending: Deque[asyncio.Future] = deque()
+        try:
+            async for raw_records, start in shards:
+                pending.append(
+                    loop.run_in_executor(
+                        executor,
+                        parse_raw_records,
+                        model_class,
+                        raw_records,
+                        start,
+                        raw,
+                        known_ids,
+                    )
+                )
+                if len(pending) >= max_in_flight:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _parse_rows(
+        reader: Iterable[List[str]],
+        model_class: Type[ModelType],
+        records: List[ModelType],
+        errors: List[Tuple[int, str]],
+        start: int = 1,
+    ) -> None:
+        mapper = sqlmodel_inspect(model_class)
+        expected_fields = [column.description for column in mapper.columns]
+
+        for row_number, row in enumerate(reader, start=start):
+            try:
+                if len(row) != len(expected_fields):
+                    errors.append((
+                        row_number,
+                        f'Expected {len(expected_fields)} columns '
+                        f'({", ".join(expected_fields)}), '
+                        f'got {len(row)}',
+                    ))
+                    continue
+
+                record_dict = CSVService._convert_row_to_dict(
+                    row, expected_fields, mapper
+                )
+
+                record = model_class.model_validate(record_dict)
+                records.append(record)
+
+            except ValueError as e:
+                errors.append((row_number, f'Value error: {str(e)}'))
+            except Exception as e:
+                errors.append((row_number, f'Unexpected error: {str(e)}'))
+
     @staticmethod
     def _convert_row_to_dict(
         row: List[str],
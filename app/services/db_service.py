@@ -1,22 +1,210 @@
+import asyncio
 import logging
-from typing import Sequence, Type, TypeVar
+import time
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
-from sqlalchemy import text
+from sqlalchemy import (
+    Delete,
+    column,
+    delete,
+    exists,
+    insert,
+    or_,
+    table,
+    text,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 from sqlmodel import SQLModel, select
+from sqlmodel import inspect as sqlmodel_inspect
+
+from app.database.postgres import observe_query
+from app.models.partitions import partition_key
+from app.models.requests import ConflictMode, LoadMethod, TransactionMode
+from app.services.column_batch import ColumnBatch
+from app.services.row_validator import datetime_pattern
+from app.services.staging_service import (
+    ROW_NUMBER,
+    get_staging_table,
+)
 
 ModelType = TypeVar('ModelType', bound=SQLModel)
+# Called with the rows each batch wrote and the rows rejected from it
+WrittenCallback = Callable[[int, List[Tuple[int, str]]], None]
 
 logger = logging.getLogger(__name__)
 
+ENSURE_PARTITIONS_QUERY = (
+    'SELECT ensure_yearly_partitions(:parent, :key, :years)'
+)
+MISSING_PARTITIONS_QUERY = (
+    'SELECT year FROM unnest(CAST(:years AS int[])) AS year '
+    "WHERE to_regclass(quote_ident(:parent || '_y' || year)) IS NULL"
+)
+# Whether the transaction wrote anything or touched the default partition,
+# either of which an ATTACH PARTITION on another connection would wait for
+HOLDS_PARTITION_LOCKS_QUERY = (
+    'SELECT pg_current_xact_id_if_assigned() IS NOT NULL OR EXISTS ('
+    'SELECT 1 FROM pg_locks WHERE pid = pg_backend_pid() '
+    "AND relation = to_regclass(quote_ident(:parent || '_default')))"
+)
+# Waiting longer means an upload holds the default partition, whose rows
+# are then left there
+PARTITION_LOCK_TIMEOUT = "SET LOCAL lock_timeout = '2s'"
+
+
+def with_on_conflict(statement, target, on_conflict: ConflictMode):
+    """
+    Add an ON CONFLICT (primary key) clause to a PostgreSQL INSERT.
+
+    'update' only rewrites the rows where some value is different, so
+    re-sending an unchanged file leaves the table and its triggers alone.
+    """
+    keys = [column.name for column in target.primary_key]
+    values = [
+        column.name for column in target.columns if not column.primary_key
+    ]
+    if on_conflict == 'ignore' or not values:
+        return statement.on_conflict_do_nothing(index_elements=keys)
+    return statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: statement.excluded[name] for name in values},
+        where=or_(
+            *(
+                target.c[name].is_distinct_from(statement.excluded[name])
+                for name in values
+            )
+        ),
+    )
+
+
+def id_columns(target) -> List[str]:
+    """Primary key columns of `target` other than its partition key."""
+    key = partition_key(target)
+    return [col.name for col in target.primary_key if col.name != key]
+
+
+def unique_rows(
+    rows: Sequence[tuple], positions: Sequence[int], on_conflict: ConflictMode
+) -> Sequence[tuple]:
+    """
+    Keep a single row per id of a batch to upsert.
+
+    ON CONFLICT cannot affect the same row twice in one statement, so
+    'update' keeps the last row of an id, the one that would be left
+    stored, and 'ignore' the first, since the others would be skipped.
+    """
+    ids = list(
+        zip(
+            *(column_values(rows, position) for position in positions),
+            strict=True,
+        )
+    )
+    if len(set(ids)) == len(ids):
+        return rows
+    kept = {}
+    for row_id, row in zip(ids, rows, strict=True):
+        if on_conflict == 'update' or row_id not in kept:
+            kept[row_id] = row
+    return list(kept.values())
+
+
+def resolve_moved_rows(
+    target, source: Select, on_conflict: ConflictMode
+) -> Tuple[Optional[Delete], Select]:
+    """
+    Prepare an upsert of `source` rows into a partitioned `target`.
+
+    The primary key of a partitioned table includes the partition key, so
+    a row coming back with another hire date does not conflict with the
+    one stored. 'update' first deletes the stored rows whose partition key
+    changed and 'ignore' skips the incoming rows whose id is stored.
+
+    Returns:
+        (DELETE to run before the upsert or None, SELECT to insert from)
+    """
+    key = partition_key(target)
+    if key is None or on_conflict == 'error':
+        return None, source
+
+    incoming = source.subquery()
+    same_id = [
+        target.c[name] == incoming.c[name] for name in id_columns(target)
+    ]
+    if on_conflict == 'ignore':
+        return None, select(*incoming.c).where(~exists().where(*same_id))
+    return (
+        delete(target).where(
+            *same_id, target.c[key].is_distinct_from(incoming.c[key])
+        ),
+        source,
+    )
+
+
+def partition_values(
+    model: Type[SQLModel], rows: Sequence[tuple], raw: bool = False
+) -> Iterable:
+    """
+    Partition key values of rows in mapper column order, or the years of
+    raw (row number, *values) rows, skipping the ones staging rejects.
+    """
+    key = partition_key(model.__table__)
+    if key is None:
+        return ()
+    names = [column.name for column in sqlmodel_inspect(model).columns]
+    if not raw:
+        return column_values(rows, names.index(key))
+    return (
+        int(value[:4])
+        for value in column_values(rows, names.index(key) + 1)
+        if value and datetime_pattern.fullmatch(value)
+    )
+
+
+def year_span(values: Iterable) -> range:
+    """
+    Years from the earliest to the latest of partition key values, given
+    as years or datetimes, so a whole load is resolved from two values.
+    """
+    years = [
+        value if isinstance(value, int) else value.year
+        for value in values
+        if value is not None
+    ]
+    if not years:
+        return range(0)
+    return range(min(years), max(years) + 1)
+
+
+def column_values(rows: Sequence[tuple], position: int) -> Iterable:
+    if isinstance(rows, ColumnBatch):
+        return rows.values(position)
+    return (row[position] for row in rows)
+
 
 class DBService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def create_batch(
-        self, records: Sequence[ModelType], batch_size: int = 1000
+        self,
+        records: Sequence[ModelType],
+        batch_size: int = 1000,
+        method: LoadMethod = 'orm',
+        transaction: TransactionMode = 'file',
     ) -> None:
         """
         Create records in batches.
@@ -24,39 +212,393 @@ class DBService:
         Args:
             records: Sequence of model instances to create
             batch_size: Number of records to create in each batch
+            method: 'orm' to add the instances to the session, 'copy' to
+                stream them with PostgreSQL COPY FROM STDIN
+            transaction: 'chunk' to commit after every batch, 'file' to
+                commit once after the last one
         """
-        try:
-            # Validate batch size
-            if len(records) > batch_size:
-                raise ValueError(
-                    f'Batch size exceeded: {len(records)} > {batch_size}'
+        if records:
+            model = type(records[0])
+            key = partition_key(model.__table__)
+            if key is not None:
+                await self.ensure_partitions(
+                    model, year_span(getattr(r, key) for r in records)
                 )
+        await self._write_in_chunks(
+            records,
+            lambda chunk: self.insert_records(chunk, method, partitions=False),
+            batch_size,
+            transaction,
+        )
 
-            # Add all records
-            self.session.add_all(records)
+    async def create_rows(
+        self,
+        model: Type[ModelType],
+        rows: Sequence[tuple],
+        batch_size: int = 1000,
+        method: LoadMethod = 'orm',
+        transaction: TransactionMode = 'file',
+        on_conflict: ConflictMode = 'error',
+    ) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Create rows given as tuples in mapper column order, in batches.
 
-            # Commit the transaction
-            try:
-                await self.session.commit()
-            except SQLAlchemyError as e:
-                await self.session.rollback()
-                logger.error(
-                    f'Database error during batch creation: {str(e)}',
-                    exc_info=True,
-                )
-                raise
+        Args:
+            model: SQLModel class of the target table
+            rows: Sequence of tuples, as produced by RowValidator
+            batch_size: Number of rows to create in each batch
+            method: 'orm' for batched INSERT statements, 'copy' to stream
+                them with PostgreSQL COPY FROM STDIN, 'staging' for raw
+                rows checked in a staging table (see `load_staged`)
+            transaction: 'chunk' to commit after every batch, 'file' to
+                commit once after the last one
+            on_conflict: 'error' to fail on existing ids, 'ignore' to skip
+                them, 'update' to overwrite the ones that changed
+
+        Returns:
+            (rows written, rejected rows): the rows inserted or changed,
+            which leaves out the ones skipped by 'ignore' or left as they
+            were by 'update', and the (row number, message) of the rows
+            rejected by the database checks, only ever filled with
+            method='staging'
+        """
+        # Once for the whole load rather than for every chunk
+        await self.ensure_partitions(
+            model,
+            year_span(partition_values(model, rows, method == 'staging')),
+        )
+        return await self._write_in_chunks(
+            rows,
+            lambda chunk: self.insert_rows(
+                model, chunk, method, on_conflict, partitions=False
+            ),
+            batch_size,
+            transaction,
+        )
+
+    async def _write_in_chunks(
+        self,
+        items: Sequence,
+        write: Callable[[Sequence], Awaitable[Optional[tuple]]],
+        batch_size: int,
+        transaction: TransactionMode,
+    ) -> Tuple[int, list]:
+        written, rejected = 0, []
+        try:
+            for start in range(0, len(items), batch_size):
+                result = await write(items[start : start + batch_size])
+                if result is not None:
+                    written += result[0]
+                    rejected.extend(result[1])
+                if transaction == 'chunk':
+                    await self.session.commit()
+            await self.session.commit()
+            return written, rejected
 
-        except ValueError as e:
+        except SQLAlchemyError as e:
+            await self.session.rollback()
             logger.error(
-                f'Validation error in create_batch: {str(e)}', exc_info=True
+                f'Database error during batch creation: {str(e)}',
+                exc_info=True,
             )
             raise
         except Exception as e:
+            await self.session.rollback()
             logger.error(
-                f'Unexpected error in create_batch: {str(e)}', exc_info=True
+                f'Unexpected error during batch creation: {str(e)}',
+                exc_info=True,
             )
             raise
 
+    async def insert_records(
+        self,
+        records: Sequence[ModelType],
+        method: LoadMethod = 'orm',
+        partitions: bool = True,
+    ) -> None:
+        """
+        Write records in the current transaction without committing it.
+
+        Args:
+            records: Sequence of model instances to create
+            method: 'orm' to flush them through the session, 'copy' to
+                stream them with PostgreSQL COPY FROM STDIN
+            partitions: False when the caller already ensured the
+                partitions of the whole load, see `ensure_partitions`
+        """
+        if not records:
+            return
+
+        model = type(records[0])
+        key = partition_key(model.__table__)
+        if partitions and key is not None:
+            await self.ensure_partitions(
+                model, [getattr(record, key) for record in records]
+            )
+
+        if method == 'copy':
+            # COPY bypasses the unit of work, no identity map state is built
+            keys = [column.key for column in sqlmodel_inspect(model).columns]
+            await self.copy_rows(
+                model,
+                [
+                    tuple(getattr(record, key) for key in keys)
+                    for record in records
+                ],
+            )
+        else:
+            self.session.add_all(records)
+            await self.session.flush()
+
+    async def insert_rows(
+        self,
+        model: Type[ModelType],
+        rows: Sequence[tuple],
+        method: LoadMethod = 'orm',
+        on_conflict: ConflictMode = 'error',
+        partitions: bool = True,
+    ) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Write tuple rows in the current transaction without committing it.
+
+        Args:
+            model: SQLModel class of the target table
+            rows: Sequence of tuples in mapper column order, or raw
+                (row number, *values) tuples with method='staging'
+            method: 'orm' for a batched INSERT statement, 'copy' to stream
+                them with PostgreSQL COPY FROM STDIN, 'staging' to check
+                them in a staging table first
+            on_conflict: 'error' to fail on existing ids, 'ignore' to skip
+                them, 'update' to overwrite the ones that changed
+            partitions: False when the caller already ensured the
+                partitions of the whole load, see `ensure_partitions`
+
+        Returns:
+            (rows inserted or changed, (row number, message) of the rows
+            rejected with 'staging')
+        """
+        if not rows:
+            return 0, []
+
+        if method == 'staging':
+            return await self.load_staged(model, rows, on_conflict, partitions)
+
+        target = model.__table__
+        names = [column.name for column in sqlmodel_inspect(model).columns]
+        if on_conflict != 'error':
+            rows = unique_rows(
+                rows,
+                [names.index(name) for name in id_columns(target)],
+                on_conflict,
+            )
+        if partitions:
+            await self.ensure_partitions(model, partition_values(model, rows))
+        key = partition_key(target)
+
+        # Upserts into a partitioned table need the incoming rows in a
+        # table to look for moved rows, see `resolve_moved_rows`
+        if method == 'copy' or (key is not None and on_conflict != 'error'):
+            if on_conflict == 'error':
+                await self.copy_rows(model, rows)
+                return len(rows), []
+            return await self.merge_rows(model, rows, on_conflict), []
+
+        parameters = [dict(zip(names, row, strict=False)) for row in rows]
+        if on_conflict == 'error':
+            await self.session.execute(insert(target), parameters)
+            return len(rows), []
+
+        # Only the rows actually inserted or updated come back
+        statement = with_on_conflict(
+            pg_insert(target), target, on_conflict
+        ).returning(*target.primary_key)
+        result = await self.session.execute(statement, parameters)
+        return len(result.all()), []
+
+    async def merge_rows(
+        self,
+        model: Type[ModelType],
+        rows: Sequence[tuple],
+        on_conflict: ConflictMode,
+    ) -> int:
+        """
+        COPY rows into a temporary staging table, then merge them into the
+        model table with a single INSERT ... SELECT ... ON CONFLICT.
+
+        The staging table lives until the end of the transaction and is
+        emptied after every merge, so it is created once per transaction.
+        Rows are expected to be unique per id, see `unique_rows`.
+
+        Returns:
+            Number of rows inserted or updated
+        """
+        target = model.__table__
+        names = [column.name for column in sqlmodel_inspect(model).columns]
+        staging = table(
+            f'staging_{target.name}', *(column(name) for name in names)
+        )
+
+        await self.session.execute(
+            text(
+                f'CREATE TEMPORARY TABLE IF NOT EXISTS {staging.name} '
+                f'(LIKE {target.name}) ON COMMIT DROP'
+            )
+        )
+        await self._copy(staging.name, None, names, rows)
+        moved, source = resolve_moved_rows(
+            target, staging.select(), on_conflict
+        )
+        if moved is not None:
+            await self.session.execute(moved)
+        statement = pg_insert(target).from_select(names, source)
+        result = await self.session.execute(
+            with_on_conflict(statement, target, on_conflict)
+        )
+        await self.session.execute(text(f'TRUNCATE {staging.name}'))
+        return result.rowcount
+
+    async def load_staged(
+        self,
+        model: Type[ModelType],
+        rows: Sequence[tuple],
+        on_conflict: ConflictMode = 'error',
+        partitions: bool = True,
+    ) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        COPY raw rows into a staging table, reject the ones failing the
+        null, type and foreign key checks and move the rest into the model
+        table with a single INSERT ... SELECT.
+
+        Args:
+            model: SQLModel class of the target table
+            rows: (row number, *values) tuples of raw CSV values
+            on_conflict: 'error' to fail on existing ids, 'ignore' to skip
+                them, 'update' to overwrite the ones that changed
+            partitions: False when the caller already ensured the
+                partitions of the whole load, see `ensure_partitions`
+
+        Returns:
+            (rows inserted or updated, (row number, message) of the
+            rejected rows, by row number)
+        """
+        # Before the staging table makes this transaction a writer
+        if partitions:
+            await self.ensure_partitions(
+                model, partition_values(model, rows, raw=True)
+            )
+        staging = get_staging_table(model)
+        await self.session.execute(text(staging.create_sql))
+        await self._copy(
+            staging.name, None, [ROW_NUMBER, *staging.columns], rows
+        )
+
+        result = await self.session.execute(text(staging.reject_sql))
+        rejected = sorted((row, message) for row, message in result)
+
+        source = staging.select_typed()
+        if on_conflict != 'error':
+            # Same rows `unique_rows` keeps, once the rejected ones are gone
+            row = staging.table.c[ROW_NUMBER]
+            ids = [
+                source.selected_columns[name]
+                for name in id_columns(staging.target)
+            ]
+            source = source.distinct(*ids).order_by(
+                *ids, row.desc() if on_conflict == 'update' else row
+            )
+        moved, source = resolve_moved_rows(staging.target, source, on_conflict)
+        if moved is not None:
+            await self.session.execute(moved)
+        statement = pg_insert(staging.target).from_select(
+            staging.columns, source
+        )
+        if on_conflict != 'error':
+            statement = with_on_conflict(
+                statement, staging.target, on_conflict
+            )
+        result = await self.session.execute(statement)
+        await self.session.execute(text(staging.truncate_sql))
+        return result.rowcount, rejected
+
+    async def ensure_partitions(
+        self, model: Type[ModelType], values: Iterable
+    ) -> None:
+        """
+        Create the yearly partitions of `model` that rows with these
+        partition key values go to, if it is partitioned and they are
+        missing, for every year from the earliest to the latest value.
+        Until then their rows land in the default partition.
+
+        Attaching a partition locks the default one exclusively until the
+        transaction ends, so the partitions are created in a short
+        transaction of their own on another connection, before this one
+        writes. Once it has written, or when another upload holds the
+        default partition, the rows go to the default partition and the
+        next upload of their year moves them.
+        """
+        key = partition_key(model.__table__)
+        years = list(year_span(values))
+        if key is None or not years:
+            return
+        parent = model.__tablename__
+        result = await self.session.execute(
+            text(MISSING_PARTITIONS_QUERY), {'parent': parent, 'years': years}
+        )
+        missing = list(result.scalars())
+        if not missing:
+            return
+        if await self.session.scalar(
+            text(HOLDS_PARTITION_LOCKS_QUERY), {'parent': parent}
+        ):
+            logger.info(
+                f'Rows of {missing} stay in the default partition of {parent}'
+            )
+            return
+
+        try:
+            async with self.session.bind.begin() as connection:
+                await connection.execute(text(PARTITION_LOCK_TIMEOUT))
+                await connection.execute(
+                    text(ENSURE_PARTITIONS_QUERY),
+                    {'parent': parent, 'key': key, 'years': missing},
+                )
+        except SQLAlchemyError as e:
+            logger.warning(
+                f'Partitions of {missing} for {parent} not created: {str(e)}'
+            )
+
+    async def copy_rows(
+        self, model: Type[ModelType], rows: Sequence[tuple]
+    ) -> None:
+        """
+        Bulk load rows with COPY FROM STDIN in the session transaction.
+
+        Args:
+            model: SQLModel class of the target table
+            rows: Sequence of tuples in mapper column order
+        """
+        target = model.__table__
+        columns = [column.name for column in sqlmodel_inspect(model).columns]
+        await self._copy(target.name, target.schema, columns, rows)
+
+    async def _copy(
+        self,
+        table_name: str,
+        schema_name: str | None,
+        columns: Sequence[str],
+        rows: Sequence[tuple],
+    ) -> None:
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        started = time.perf_counter()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table_name,
+            records=rows,
+            columns=columns,
+            schema_name=schema_name,
+        )
+        observe_query('COPY', time.perf_counter() - started)
+
     async def get_all(self, model: Type[ModelType]) -> list[ModelType]:
         """
         Get all records for a given model.
@@ -103,3 +645,114 @@ class DBService:
                 f'Unexpected error in execute_select: {str(e)}', exc_info=True
             )
             raise
+
+    async def stream_select(
+        self, query: str, params: dict | None = None, chunk_size: int = 1000
+    ) -> AsyncIterator[list[dict]]:
+        """
+        Execute a SELECT SQL query with a server-side cursor.
+
+        Args:
+            query: SQL SELECT query string
+            params: Optional dictionary of parameters for SQL query
+            chunk_size: Number of rows fetched from the cursor at a time
+
+        Yields:
+            Lists of at most `chunk_size` dictionaries, one per row
+        """
+        try:
+            result = await self.session.stream(
+                text(query),
+                params or {},
+                execution_options={'yield_per': chunk_size},
+            )
+            async for rows in result.mappings().partitions(chunk_size):
+                yield [dict(row) for row in rows]
+
+        except SQLAlchemyError as e:
+            logger.error(
+                f'Database error during SELECT streaming: {str(e)}',
+                exc_info=True,
+            )
+            raise
+
+
+class PipelinedWriter:
+    """
+    Writes batches of tuple rows through a DBService in the background.
+
+    `submit` returns as soon as the batch has been handed to a writer task,
+    so the caller can parse batch N+1 while batch N is on its way to the
+    database. Only one batch is in flight at a time because a session
+    cannot run concurrent operations.
+
+    Used as an async context manager: a clean exit waits for the last batch
+    and commits, unless `commit` is False to leave the transaction open
+    for more writes, and an exception rolls back whatever was not
+    committed yet.
+    """
+
+    def __init__(
+        self,
+        db_service: DBService,
+        model: Type[ModelType],
+        method: LoadMethod = 'orm',
+        transaction: TransactionMode = 'file',
+        on_written: WrittenCallback | None = None,
+        on_conflict: ConflictMode = 'error',
+        commit: bool = True,
+    ):
+        self.db_service = db_service
+        self.model = model
+        self.method = method
+        self.transaction = transaction
+        self.on_conflict = on_conflict
+        self.commit = commit
+        self.on_written = on_written
+        self._pending: asyncio.Task | None = None
+        # Years whose partitions were already ensured during this load
+        self._years: set[int] = set()
+
+    async def __aenter__(self) -> 'PipelinedWriter':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.flush()
+            if self.commit:
+                await self.db_service.session.commit()
+            return
+
+        if self._pending is not None:
+            self._pending.cancel()
+            await asyncio.gather(self._pending, return_exceptions=True)
+            self._pending = None
+        await self.db_service.session.rollback()
+
+    async def submit(self, rows: Sequence[tuple]) -> None:
+        await self.flush()
+        self._pending = asyncio.create_task(self._write(rows))
+
+    async def flush(self) -> None:
+        """Wait for the batch in flight, re-raising its error if any."""
+        if self._pending is None:
+            return
+        pending, self._pending = self._pending, None
+        await pending
+
+    async def _write(self, rows: Sequence[tuple]) -> None:
+        # The whole stream is not known up front, so only batches reaching
+        # years outside the ones seen so far look for missing partitions
+        years = year_span(
+            partition_values(self.model, rows, self.method == 'staging')
+        )
+        if not self._years.issuperset(years):
+            await self.db_service.ensure_partitions(self.model, years)
+            self._years.update(years)
+        written, rejected = await self.db_service.insert_rows(
+            self.model, rows, self.method, self.on_conflict, partitions=False
+        )
+        if self.transaction == 'chunk':
+            await self.db_service.session.commit()
+        if self.on_written is not None:
+            self.on_written(written, rejected)
@@ -0,0 +1,215 @@
+import bz2
+import zlib
+from pathlib import PurePosixPath
+from typing import Dict, Literal, Optional, Protocol
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    import zstandard
+except ImportError:  # Optional, pip install globant[zstd]
+    zstandard = None
+
+Codec = Literal['gzip', 'bz2', 'zstd']
+
+SUFFIXES: Dict[str, Codec] = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.bz2': 'bz2',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+}
+CONTENT_ENCODINGS: Dict[str, Codec] = {
+    'gzip': 'gzip',
+    'x-gzip': 'gzip',
+    'bzip2': 'bz2',
+    'x-bzip2': 'bz2',
+    'zstd': 'zstd',
+}
+
+# zstandard cannot cap the output of a call, so compressed input is fed in
+# slices this small: a 128 KiB zstd block takes at least 4 bytes, so a
+# slice never expands to more than 2 MiB
+ZSTD_INPUT_SLICE = 64
+
+CODEC_ERRORS = (zlib.error, OSError, EOFError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+class DecompressionError(ValueError):
+    """A compressed upload cannot be decompressed."""
+
+
+class AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+def detect_codec(
+    filename: str, content_encoding: Optional[str] = None
+) -> Optional[Codec]:
+    """
+    Codec a file was compressed with, from its Content-Encoding or else
+    the suffix of its name, None for plain files.
+
+    Raises:
+        DecompressionError: For a Content-Encoding that is not supported
+    """
+    if content_encoding:
+        encoding = content_encoding.strip().lower()
+        if encoding == 'identity':
+            return None
+        if encoding not in CONTENT_ENCODINGS:
+            raise DecompressionError(
+                f'Unsupported Content-Encoding {content_encoding}, expected '
+                f'{", ".join(CONTENT_ENCODINGS)}'
+            )
+        return CONTENT_ENCODINGS[encoding]
+    return SUFFIXES.get(PurePosixPath(filename).suffix.lower())
+
+
+def strip_codec_suffix(filename: str) -> str:
+    """`filename` without a compression suffix, employees.csv.gz -> .csv"""
+    path = PurePosixPath(filename)
+    if path.suffix.lower() in SUFFIXES:
+        return str(path.with_suffix(''))
+    return filename
+
+
+def upload_codec(file: UploadFile) -> Optional[Codec]:
+    """Codec of an upload, from the headers of its multipart part."""
+    return detect_codec(
+        file.filename or '', file.headers.get('content-encoding')
+    )
+
+
+def new_decompressor(codec: Codec):
+    if codec == 'gzip':
+        return zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    if codec == 'bz2':
+        return bz2.BZ2Decompressor()
+    if zstandard is None:
+        raise DecompressionError(
+            'zstd compressed uploads need the zstandard package'
+        )
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+class DecompressingFile:
+    """
+    Decompresses `source` as it is read, so a compressed upload feeds the
+    CSV parser chunk by chunk like a plain one, never held whole in memory.
+
+    Compressed input is read `chunk_size` bytes at a time and decompressed
+    in a worker thread; the codecs release the GIL, so decompression of a
+    chunk overlaps with the event loop. Concatenated gzip members, bz2
+    streams and zstd frames are read one after the other, like `gzip -d`.
+
+    Only as much is decompressed as a read asks for: the input left over
+    is kept for the next read, so a small file expanding to gigabytes
+    (a decompression bomb) is never expanded whole.
+    """
+
+    def __init__(
+        self,
+        source: AsyncReadable,
+        codec: Codec,
+        chunk_size: int = 1024 * 1024,
+    ):
+        self.source = source
+        self.codec = codec
+        self.chunk_size = chunk_size
+        self._decompressor = new_decompressor(codec)
+        # Whether the current member got input and has not ended yet
+        self._in_member = False
+        # Compressed input not consumed yet
+        self._pending = b''
+        # Whether the decompressor may hold output without more input
+        self._has_output = False
+        self._buffer = bytearray()
+        self._eof = False
+
+    async def read(self, size: int = -1) -> bytes:
+        """
+        Up to `size` decompressed bytes, everything left if negative. Only
+        returns b'' at the end of the data.
+
+        Raises:
+            DecompressionError: For corrupt or truncated data
+        """
+        while size < 0 or len(self._buffer) < size:
+            if not self._pending and not self._has_output:
+                if self._eof:
+                    break
+                chunk = await self.source.read(self.chunk_size)
+                if not chunk:
+                    self._eof = True
+                    if self._in_member:
+                        raise DecompressionError(
+                            f'Truncated {self.codec} data'
+                        )
+                    break
+                self._pending = chunk
+            wanted = self.chunk_size if size < 0 else size - len(self._buffer)
+            self._buffer += await run_in_threadpool(self._decompress, wanted)
+
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def _decompress(self, max_length: int) -> bytes:
+        """
+        Up to about `max_length` bytes out of the pending input, less when
+        it runs out.
+        """
+        output = []
+        try:
+            while max_length > 0 and (self._pending or self._has_output):
+                data = self._step(max_length)
+                output.append(data)
+                max_length -= len(data)
+        except CODEC_ERRORS as e:
+            raise DecompressionError(
+                f'Invalid {self.codec} data: {str(e)}'
+            ) from e
+        return b''.join(output)
+
+    def _step(self, max_length: int) -> bytes:
+        decompressor = self._decompressor
+        if self.codec == 'zstd':
+            data = self._pending[:ZSTD_INPUT_SLICE]
+            rest = self._pending[ZSTD_INPUT_SLICE:]
+            output = decompressor.decompress(data)
+            self._has_output = False
+        else:
+            output = decompressor.decompress(self._pending, max_length)
+            # zlib leaves the input past max_length in unconsumed_tail, and
+            # everything past the end of a member in unused_data, while bz2
+            # keeps the input it did not use by itself
+            rest = b''
+            if not decompressor.eof:
+                rest = getattr(decompressor, 'unconsumed_tail', b'')
+            self._has_output = len(output) == max_length
+
+        self._in_member = not decompressor.eof
+        if self._in_member:
+            self._pending = rest
+        else:
+            self._pending = decompressor.unused_data + rest
+            self._decompressor = new_decompressor(self.codec)
+            self._has_output = False
+        return output
+
+
+def decompressed(
+    file: AsyncReadable,
+    codec: Optional[Codec],
+    chunk_size: int = 1024 * 1024,
+) -> AsyncReadable:
+    """`file` itself if it is not compressed."""
+    if codec is None:
+        return file
+    return DecompressingFile(file, codec, chunk_size)
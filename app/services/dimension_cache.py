@@ -0,0 +1,72 @@
+import logging
+import time
+from typing import Callable, Dict, FrozenSet, Sequence, Type
+
+from sqlmodel import SQLModel
+
+from app.services.db_service import DBService
+
+logger = logging.getLogger(__name__)
+
+
+class DimensionCache:
+    """
+    Process-wide cache of the ids of small dimension tables.
+
+    Employee rows reference departments and jobs, which only have a few
+    hundred rows and rarely change. Keeping their ids in memory lets the
+    validator reject orphan references row by row instead of failing the
+    whole batch on a foreign key violation.
+
+    A dimension is reloaded with `DBService.get_all` on first use, after an
+    upload of that dimension calls `invalidate`, and once it is older than
+    `ttl`. The TTL bounds how long uploads handled by other processes go
+    unnoticed.
+    """
+
+    def __init__(
+        self,
+        models: Sequence[Type[SQLModel]],
+        ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.models = {model.__tablename__: model for model in models}
+        self.ttl = ttl
+        self.clock = clock
+        self._ids: Dict[str, tuple[float, FrozenSet[int]]] = {}
+
+    async def known_ids(
+        self, db_service: DBService, model_class: Type[SQLModel]
+    ) -> Dict[str, FrozenSet[int]]:
+        """
+        Ids of the cached tables `model_class` has foreign keys to, by
+        table name, loading the ones that are missing or expired.
+        """
+        referenced = {
+            key.column.table.name
+            for column in model_class.__table__.columns
+            for key in column.foreign_keys
+        }
+        return {
+            name: await self.get(db_service, name)
+            for name in sorted(referenced)
+            if name in self.models
+        }
+
+    async def get(self, db_service: DBService, name: str) -> FrozenSet[int]:
+        entry = self._ids.get(name)
+        if entry is not None and entry[0] > self.clock():
+            return entry[1]
+
+        records = await db_service.get_all(self.models[name])
+        ids = frozenset(record.id for record in records)
+        self._ids[name] = (self.clock() + self.ttl, ids)
+        logger.info(f'Loaded {len(ids)} {name} ids into the dimension cache')
+        return ids
+
+    def invalidate(self, model_class: Type[SQLModel] | None = None) -> None:
+        """Forget one dimension, or all of them without `model_class`."""
+        if model_class is None:
+            self._ids.clear()
+        else:
+            self._ids.pop(model_class.__tablename__, None)
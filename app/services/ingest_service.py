@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple, Type
+
+from fastapi import UploadFile
+from sqlmodel import SQLModel
+
+from app.config import Settings
+from app.models.requests import UploadOptions
+from app.services.columnar_service import ColumnarService, FileFormat
+from app.services.csv_service import CSVService
+from app.services.db_service import DBService, PipelinedWriter
+from app.services.dimension_cache import DimensionCache
+from app.services.parser_pool import get_parser_pool, get_parser_workers
+
+settings = Settings()
+
+
+@dataclass
+class IngestProgress:
+    rows_parsed: int = 0
+    rows_inserted: int = 0
+    rows_rejected: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+
+class IngestService:
+    def __init__(
+        self,
+        db_service: DBService,
+        dimensions: DimensionCache | None = None,
+    ):
+        self.db_service = db_service
+        self.dimensions = dimensions
+
+    async def ingest_stream(
+        self,
+        file: UploadFile,
+        model_class: Type[SQLModel],
+        options: UploadOptions,
+        progress: IngestProgress | None = None,
+        commit: bool = True,
+        file_format: FileFormat = 'csv',
+        first_row: int = 1,
+    ) -> IngestProgress:
+        """
+        Read the file in chunks and hand every validated batch to a
+        pipelined writer, so memory usage does not grow with the size of
+        the file and the next batch is parsed while the previous one is
+        being written.
+
+        With `options.parallel` the shards are validated in the parser
+        process pool, which keeps the event loop free for other requests.
+
+        With `dimensions`, rows referencing unknown departments or jobs are
+        rejected while parsing instead of failing their whole batch.
+
+        Parquet and Arrow files are read in record batches and validated
+        column by column instead, see `ColumnarService`.
+
+        Args:
+            file: Object with an async `read(size)`, usually an UploadFile
+            model_class: SQLModel class of the target table
+            options: Upload options of the request
+            progress: Counters updated in place as batches go through,
+                so callers can report progress while the upload runs
+            commit: False to leave the last batch uncommitted, so more
+                files can be written in the same transaction
+            file_format: 'csv', 'parquet' or 'arrow'; columnar files must
+                be UploadFiles over a seekable file
+            first_row: Number of the first CSV record in error messages,
+                for a file continuing an earlier part of the same upload
+
+        Returns:
+            The final progress counters and row-numbered errors
+        """
+        progress = progress or IngestProgress()
+        raw = options.method == 'staging'
+        known_ids = None
+        if self.dimensions is not None and not raw:
+            known_ids = await self.dimensions.known_ids(
+                self.db_service, model_class
+            )
+        executor, max_in_flight = None, 1
+        if options.parallel:
+            executor = get_parser_pool()
+            max_in_flight = get_parser_workers() * 2
+
+        async with PipelinedWriter(
+            self.db_service,
+            model_class,
+            options.method,
+            options.transaction,
+            on_written=lambda written, rejected: self._count_written(
+                progress, written, rejected
+            ),
+            on_conflict=options.on_conflict,
+            commit=commit,
+        ) as writer:
+            if file_format == 'csv':
+                batches = CSVService.read_csv_stream(
+                    file,
+                    model_class,
+                    options.has_headers,
+                    batch_size=settings.max_batch_size,
+                    chunk_size=settings.upload_chunk_size,
+                    executor=executor,
+                    max_in_flight=max_in_flight,
+                    raw=raw,
+                    known_ids=known_ids,
+                    first_row=first_row,
+                )
+            else:
+                batches = ColumnarService.read_columnar_stream(
+                    file,
+                    model_class,
+                    file_format,
+                    batch_size=settings.max_batch_size,
+                    raw=raw,
+                    known_ids=known_ids,
+                )
+            async for rows, errors in batches:
+                progress.errors.extend(errors)
+                progress.rows_rejected += len(errors)
+                progress.rows_parsed += len(rows) + len(errors)
+                if rows:
+                    await writer.submit(rows)
+
+        # Rows rejected by the database come after the ones of their batch
+        progress.errors.sort()
+        return progress
+
+    @staticmethod
+    def _count_written(
+        progress: IngestProgress,
+        written: int,
+        rejected: List[Tuple[int, str]],
+    ):
+        progress.rows_inserted += written
+        progress.rows_rejected += len(rejected)
+        progress.errors.extend(rejected)
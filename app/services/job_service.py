@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Type
+from uuid import uuid4
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel
+
+from app.models.requests import UploadOptions
+from app.models.responses import UploadJob
+from app.services.columnar_service import FileFormat
+from app.services.db_service import DBService
+from app.services.decompression import Codec, decompressed
+from app.services.dimension_cache import DimensionCache
+from app.services.ingest_service import IngestProgress, IngestService
+from app.utils.parsers import generate_upload_response
+
+logger = logging.getLogger(__name__)
+
+SessionFactory = Callable[[], AsyncSession]
+
+
+@dataclass
+class _QueuedUpload:
+    job: UploadJob
+    path: Path
+    model_class: Type[SQLModel]
+    options: UploadOptions
+    progress: IngestProgress
+    codec: Codec | None = None
+    file_format: FileFormat = 'csv'
+
+
+class UploadJobManager:
+    """
+    Runs uploads in the background on a bounded pool of worker tasks.
+
+    Uploads are spooled to local disk so the request can return as soon as
+    the file is received. Jobs are kept in memory; the oldest finished ones
+    are dropped once more than `retention` jobs are tracked. `on_finished`
+    is called with the model class and the progress of every job, whether
+    or not it wrote any rows.
+    """
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        workers: int = 2,
+        spool_dir: str | None = None,
+        retention: int = 1000,
+        chunk_size: int = 1024 * 1024,
+        on_finished: Callable[[Type[SQLModel], IngestProgress], None]
+        | None = None,
+        dimensions: DimensionCache | None = None,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.spool_dir = Path(
+            spool_dir or os.path.join(tempfile.gettempdir(), 'globant-uploads')
+        )
+        self.retention = retention
+        self.chunk_size = chunk_size
+        self.on_finished = on_finished
+        self.dimensions = dimensions
+        self._jobs: OrderedDict[str, _QueuedUpload] = OrderedDict()
+        self._queue: asyncio.Queue[_QueuedUpload] | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def submit(
+        self,
+        file: UploadFile,
+        model_class: Type[SQLModel],
+        options: UploadOptions,
+        entity_name: str,
+        codec: Codec | None = None,
+        file_format: FileFormat = 'csv',
+    ) -> UploadJob:
+        """
+        Spool `file` to disk and queue it, returning the new job. Files
+        compressed with `codec` are spooled as they are and decompressed
+        while the job reads them.
+        """
+        path = await self._spool(file)
+        queued = _QueuedUpload(
+            job=UploadJob(
+                id=uuid4().hex,
+                entity=entity_name,
+                created_at=datetime.now(timezone.utc),
+            ),
+            path=path,
+            model_class=model_class,
+            options=options,
+            progress=IngestProgress(),
+            codec=codec,
+            file_format=file_format,
+        )
+        self._jobs[queued.job.id] = queued
+        self._evict()
+
+        self._start_workers()
+        await self._queue.put(queued)
+        logger.info(f'Queued {entity_name} upload job {queued.job.id}')
+        return self._snapshot(queued)
+
+    def get(self, job_id: str) -> UploadJob | None:
+        queued = self._jobs.get(job_id)
+        return self._snapshot(queued) if queued else None
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        self._queue = None
+
+    async def _spool(self, file: UploadFile) -> Path:
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        handle, name = tempfile.mkstemp(suffix='.csv', dir=self.spool_dir)
+        with os.fdopen(handle, 'wb') as spooled:
+            while chunk := await file.read(self.chunk_size):
+                await run_in_threadpool(spooled.write, chunk)
+        return Path(name)
+
+    def _start_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._work()))
+
+    def _evict(self) -> None:
+        finished = [
+            job_id
+            for job_id, queued in self._jobs.items()
+            if queued.job.status in {'succeeded', 'failed'}
+        ]
+        for job_id in finished[: max(0, len(self._jobs) - self.retention)]:
+            del self._jobs[job_id]
+
+    async def _work(self) -> None:
+        while True:
+            queued = await self._queue.get()
+            try:
+                await self._run(queued)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, queued: _QueuedUpload) -> None:
+        job = queued.job
+        job.status = 'running'
+        job.started_at = datetime.now(timezone.utc)
+        try:
+            with queued.path.open('rb') as spooled:
+                upload = UploadFile(file=spooled, filename=queued.path.name)
+                async with self.session_factory() as session:
+                    await IngestService(
+                        DBService(session), self.dimensions
+                    ).ingest_stream(
+                        decompressed(upload, queued.codec, self.chunk_size),
+                        queued.model_class,
+                        queued.options,
+                        queued.progress,
+                        file_format=queued.file_format,
+                    )
+
+            progress = queued.progress
+            job.result = generate_upload_response(
+                job.entity, progress.rows_inserted, progress.errors
+            )
+            if progress.rows_inserted:
+                job.status = 'succeeded'
+            else:
+                job.status = 'failed'
+                job.error = 'No valid records found'
+
+        except Exception as e:
+            logger.error(
+                f'Upload job {job.id} for {job.entity} failed: {str(e)}',
+                exc_info=True,
+            )
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            queued.path.unlink(missing_ok=True)
+            if self.on_finished is not None:
+                self.on_finished(queued.model_class, queued.progress)
+
+    @staticmethod
+    def _snapshot(queued: _QueuedUpload) -> UploadJob:
+        progress = queued.progress
+        return queued.job.model_copy(
+            update={
+                'rows_parsed': progress.rows_parsed,
+                'rows_inserted': progress.rows_inserted,
+                'rows_rejected': progress.rows_rejected,
+            }
+        )
@@ -0,0 +1,284 @@
+import math
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)  # fmt: skip
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace('\\', r'\\')
+            .replace('\n', r'\n')
+            .replace('"', r'\"'),
+        )
+        for name, value in labels.items()
+    )
+    return f'{{{pairs}}}'
+
+
+class Metric(ABC):
+    kind = 'untyped'
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name} takes labels {self.labelnames}, '
+                f'got {tuple(labels)}'
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key, strict=True))
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]:
+        """(name, labels, value) of every sample to render."""
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError('Counters can only go up')
+        self._values[self._key(labels)] += amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in sorted(self._values.items()):
+            yield self.name, self._labels(key), value
+
+
+class Gauge(Metric):
+    """Values read from `collect` when the metrics are rendered."""
+
+    kind = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self.collect():
+            yield self.name, self._labels(key), value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label values: a count per bucket, the sum and the count
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[-1]) if series else 0
+
+    def samples(self) -> Iterator[Sample]:
+        for key, series in sorted(self._series.items()):
+            labels = self._labels(key)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series, strict=False):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket',
+                    {**labels, 'le': format_value(bound)},
+                    cumulative,
+                )
+            yield f'{self.name}_sum', labels, series[-2]
+            yield f'{self.name}_count', labels, series[-1]
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text format.
+
+    Metrics are only updated from the event loop thread, so they take no
+    locks. Each worker process keeps its own values, which Prometheus
+    scrapes and sums separately.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(
+            Histogram(name, documentation, labelnames, buckets)
+        )
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(
+                f'{name}{format_labels(labels)} {format_value(value)}'
+                for name, labels, value in metric.samples()
+            )
+        return '\n'.join(lines) + '\n'
+
+
+class AppMetrics:
+    """
+    Metrics of the application: request latency by route, database
+    statement time by operation, rows of every upload by outcome, the
+    time spent waiting for a pooled connection and, once `watch_pools` is
+    called, the connections of every pool.
+    """
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.histogram(
+            'http_request_duration_seconds',
+            'Time to serve HTTP requests, until the last body chunk is sent',
+            ('method', 'route', 'status'),
+        )
+        self.queries = self.registry.histogram(
+            'db_query_duration_seconds',
+            'Execution time of database statements by SQL operation',
+            ('operation',),
+        )
+        self.upload_rows = self.registry.counter(
+            'upload_rows_total',
+            'Rows of uploaded files by table and outcome',
+            ('table', 'outcome'),
+        )
+        self.pool_wait = self.registry.histogram(
+            'db_pool_wait_seconds',
+            'Time spent waiting to check out a pooled database connection',
+            ('pool',),
+            buckets=POOL_WAIT_BUCKETS,
+        )
+
+    def observe_request(
+        self, method: str, route: str, status: int, seconds: float
+    ) -> None:
+        self.requests.observe(
+            seconds, method=method, route=route, status=status
+        )
+
+    def observe_query(self, operation: str, seconds: float) -> None:
+        self.queries.observe(seconds, operation=operation)
+
+    def observe_pool_wait(self, pool: str, seconds: float) -> None:
+        self.pool_wait.observe(seconds, pool=pool)
+
+    def watch_pools(
+        self, pool_stats: Callable[[], Dict[str, Dict[str, int]]]
+    ) -> None:
+        """Publish the connections of every pool by state, see `stats`."""
+
+        def collect():
+            for pool, stats in sorted(pool_stats().items()):
+                for state, value in stats.items():
+                    yield (pool, state), value
+
+        self.registry.gauge(
+            'db_pool_connections',
+            'Connections of each pool: size, checked_out, idle, overflow',
+            ('pool', 'state'),
+            collect,
+        )
+
+    def record_upload(
+        self, table: str, parsed: int, inserted: int, rejected: int
+    ) -> None:
+        """
+        Count the rows of an upload. Parsed rows neither inserted nor
+        rejected were skipped as conflicts or left unchanged by an update.
+        """
+        skipped = max(parsed - inserted - rejected, 0)
+        self.upload_rows.inc(parsed, table=table, outcome='parsed')
+        self.upload_rows.inc(inserted, table=table, outcome='inserted')
+        self.upload_rows.inc(rejected, table=table, outcome='rejected')
+        self.upload_rows.inc(skipped, table=table, outcome='skipped')
+
+    def render(self) -> str:
+        return self.registry.render()
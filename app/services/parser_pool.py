@@ -0,0 +1,41 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+settings = Settings()
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_parser_workers() -> int:
+    return settings.parser_workers or os.cpu_count() or 1
+
+
+def get_parser_pool() -> ProcessPoolExecutor:
+    """
+    Process pool used to validate CSV shards off the event loop.
+
+    Created on first use and shared by every upload of the process. Workers
+    are spawned rather than forked so they never inherit the event loop or
+    open database connections of the API process.
+    """
+    global _pool  # noqa: PLW0603
+    if _pool is None:
+        workers = get_parser_workers()
+        logger.info(f'Starting CSV parser pool with {workers} workers')
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _pool
+
+
+def shutdown_parser_pool() -> None:
+    global _pool  # noqa: PLW0603
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -0,0 +1,81 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+@dataclass(frozen=True)
+class CachedReport:
+    body: bytes
+    media_type: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def etag(self) -> str:
+        return f'"{hashlib.blake2b(self.body, digest_size=16).hexdigest()}"'
+
+
+class ReportCache:
+    """
+    In-process LRU cache of rendered reports with a TTL.
+
+    Reports only change when the tables do, so every successful upload
+    calls `invalidate`, which bumps the data version and drops all entries.
+    A report built while an upload was committing is not stored, since it
+    may have read the data from before the upload.
+
+    Each worker process has its own cache, so the TTL bounds how long a
+    process can serve a report after an upload handled by another one.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.version = 0
+        self._entries: OrderedDict[Hashable, tuple[float, CachedReport]] = (
+            OrderedDict()
+        )
+
+    def get(self, key: Hashable) -> CachedReport | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, report = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return report
+
+    def put(self, key: Hashable, report: CachedReport, version: int) -> None:
+        """Store `report` unless the data changed since `version`."""
+        if version != self.version or self.maxsize <= 0:
+            return
+        self._entries[key] = (self.clock() + self.ttl, report)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get_or_create(
+        self, key: Hashable, build: Callable[[], Awaitable[CachedReport]]
+    ) -> CachedReport:
+        report = self.get(key)
+        if report is None:
+            version = self.version
+            report = await build()
+            self.put(key, report, version)
+        return report
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,149 @@
+from typing import AsyncIterator
+
+from app.models.requests import ReportParams
+from app.services.db_service import DBService
+
+# Hires per department, job and quarter from the trigger maintained stats
+QUARTERLY_HIRES_BY_YEAR = """
+    SELECT department_id, job_id, quarter, hires
+    FROM quarterlyhiringstats
+    WHERE year = :year
+"""
+
+# Same shape computed from the employees, with a sargable range predicate
+# served by ix_hiredemployees_datetime_department_id_job_id
+QUARTERLY_HIRES_BY_RANGE = """
+    SELECT
+        department_id,
+        job_id,
+        EXTRACT(quarter FROM datetime)::int AS quarter,
+        COUNT(*) AS hires
+    FROM hiredemployees
+    WHERE datetime >= :start AND datetime < :end
+    GROUP BY 1, 2, 3
+"""
+
+QUARTERLY_HIRING_QUERY = """
+WITH hires AS ({hires})
+SELECT
+    d.name AS department,
+    j.name AS job,
+    SUM(CASE WHEN h.quarter = 1 THEN h.hires ELSE 0 END)::int AS q1,
+    SUM(CASE WHEN h.quarter = 2 THEN h.hires ELSE 0 END)::int AS q2,
+    SUM(CASE WHEN h.quarter = 3 THEN h.hires ELSE 0 END)::int AS q3,
+    SUM(CASE WHEN h.quarter = 4 THEN h.hires ELSE 0 END)::int AS q4
+FROM
+    hires h
+INNER JOIN
+    departments d ON d.id = h.department_id
+INNER JOIN
+    jobs j ON j.id = h.job_id
+GROUP BY
+    department,
+    job
+HAVING
+    SUM(h.hires) > 0
+ORDER BY
+    department,
+    job
+"""
+
+# Hires per department from the trigger maintained stats
+DEPARTMENT_HIRES_BY_YEAR = """
+    SELECT department_id AS id, hires AS hired_count
+    FROM departmenthiringstats
+    WHERE year = :year AND hires > 0
+"""
+
+DEPARTMENT_HIRES_BY_RANGE = """
+    SELECT department_id AS id, COUNT(*) AS hired_count
+    FROM hiredemployees
+    WHERE datetime >= :start AND datetime < :end
+    GROUP BY department_id
+"""
+
+DEPARTMENTS_ABOVE_MEAN_QUERY = """
+WITH department_hires AS ({hires})
+SELECT
+    d.id,
+    d.name,
+    h.hired_count AS hired_employees
+FROM
+    department_hires h
+INNER JOIN
+    departments d ON d.id = h.id
+WHERE
+    h.hired_count > (SELECT AVG(hired_count) FROM department_hires)
+ORDER BY
+    h.hired_count DESC
+"""
+
+
+class ReportService:
+    def __init__(self, db_service: DBService):
+        self.db_service = db_service
+
+    @staticmethod
+    def quarterly_hiring_query(params: ReportParams) -> tuple[str, dict]:
+        """
+        Whole years are read from the pre-aggregated quarterly stats, any
+        other period is computed from hiredemployees.
+        """
+        if params.year is not None:
+            return (
+                QUARTERLY_HIRING_QUERY.format(hires=QUARTERLY_HIRES_BY_YEAR),
+                {'year': params.year},
+            )
+        start, end = params.bounds()
+        return (
+            QUARTERLY_HIRING_QUERY.format(hires=QUARTERLY_HIRES_BY_RANGE),
+            {'start': start, 'end': end},
+        )
+
+    @staticmethod
+    def departments_above_mean_query(params: ReportParams) -> tuple[str, dict]:
+        """
+        Whole years only read one row per department from the yearly
+        stats, any other period counts the employees in it.
+        """
+        if params.year is not None:
+            return (
+                DEPARTMENTS_ABOVE_MEAN_QUERY.format(
+                    hires=DEPARTMENT_HIRES_BY_YEAR
+                ),
+                {'year': params.year},
+            )
+        start, end = params.bounds()
+        return (
+            DEPARTMENTS_ABOVE_MEAN_QUERY.format(
+                hires=DEPARTMENT_HIRES_BY_RANGE
+            ),
+            {'start': start, 'end': end},
+        )
+
+    async def quarterly_hiring(self, params: ReportParams) -> list[dict]:
+        """
+        Employees hired per quarter for each department and job.
+        """
+        query, query_params = self.quarterly_hiring_query(params)
+        return await self.db_service.execute_select(query, query_params)
+
+    async def departments_above_mean(self, params: ReportParams) -> list[dict]:
+        """
+        Departments that hired more employees than the mean of all
+        departments over the period.
+        """
+        query, query_params = self.departments_above_mean_query(params)
+        return await self.db_service.execute_select(query, query_params)
+
+    def stream_quarterly_hiring(
+        self, params: ReportParams, chunk_size: int = 1000
+    ) -> AsyncIterator[list[dict]]:
+        query, query_params = self.quarterly_hiring_query(params)
+        return self.db_service.stream_select(query, query_params, chunk_size)
+
+    def stream_departments_above_mean(
+        self, params: ReportParams, chunk_size: int = 1000
+    ) -> AsyncIterator[list[dict]]:
+        query, query_params = self.departments_above_mean_query(params)
+        return self.db_service.stream_select(query, query_params, chunk_size)
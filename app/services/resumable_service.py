@@ -0,0 +1,459 @@
+import asyncio
+import io
+import logging
+import os
+import tempfile
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterable, Callable, Dict, Mapping, Tuple, Type
+from uuid import uuid4
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select, update
+from sqlmodel import SQLModel
+
+from app.models.requests import IngestOptions, UploadOptions
+from app.models.responses import ResumableUpload, UploadResponse
+from app.models.uploads import UploadSession, UploadSessionError
+from app.services.db_service import DBService
+from app.services.dimension_cache import DimensionCache
+from app.services.ingest_service import IngestProgress, IngestService
+from app.services.job_service import SessionFactory
+from app.utils.parsers import generate_upload_response
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionConflict(ValueError):
+    """A request does not fit the current state of its upload session."""
+
+
+def complete_records(data: bytes) -> int:
+    """
+    Length of the complete CSV records at the start of `data`, which must
+    begin on a record boundary: up to the last line break outside quotes.
+    Quotes and line breaks are single bytes in UTF-8, so the records are
+    found without decoding.
+    """
+    end = data.rfind(b'\n') + 1
+    quotes = data.count(b'"', 0, end)
+    while end and quotes % 2:
+        previous = data.rfind(b'\n', 0, end - 1) + 1
+        quotes -= data.count(b'"', previous, end)
+        end = previous
+    return end
+
+
+def read_range(path: Path, offset: int, size: int) -> bytes:
+    with path.open('rb') as spooled:
+        spooled.seek(offset)
+        return spooled.read(size)
+
+
+def restore_spool(path: Path, committed_offset: int) -> int:
+    """
+    Size of the spool file of a session, recreating it when it is gone.
+    Bytes before the checkpoint are never read again, so a missing file is
+    replaced with a sparse one of that size and receiving resumes there.
+    """
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('wb') as spooled:
+            spooled.truncate(committed_offset)
+    return path.stat().st_size
+
+
+def write_chunk(spooled: io.BufferedWriter, chunk: bytes) -> None:
+    spooled.write(chunk)
+    spooled.flush()
+
+
+@dataclass
+class _Receiver:
+    record: UploadSession
+    path: Path
+    received: int
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    arrived: asyncio.Event = field(default_factory=asyncio.Event)
+    loader: asyncio.Task | None = None
+    result: UploadResponse | None = None
+
+    @property
+    def completing(self) -> bool:
+        """Whether the client sent every chunk and completed the upload."""
+        return self.record.size is not None
+
+
+class ResumableUploadManager:
+    """
+    Uploads sent in chunks at increasing offsets, which survive dropped
+    connections, failed loads and restarts.
+
+    Chunks are appended to a spool file on local disk as they arrive. A
+    loader task per session ingests the spooled bytes in segments of
+    complete CSV records once `segment_size` bytes are pending, so a file
+    is loaded while it is still being received. Each segment is written in
+    one transaction that also moves the checkpoint of the session, its
+    `committed_offset` and `committed_rows`, and stores its rejected rows.
+
+    A chunk cut short keeps the bytes received so far; the client resumes
+    from `received`. A segment that fails rolls back with its checkpoint,
+    and the next chunk or completion resumes loading from the checkpoint,
+    also after a restart, instead of from the first row.
+
+    Spool files are local, so all the requests of a session must reach the
+    same host. `on_finished` is called like in `UploadJobManager`, with the
+    rows loaded by each run of the loader.
+    """
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        entities: Mapping[str, Tuple[Type[SQLModel], str]],
+        spool_dir: str | None = None,
+        segment_size: int = 8 * 1024 * 1024,
+        on_finished: Callable[[Type[SQLModel], IngestProgress], None]
+        | None = None,
+        dimensions: DimensionCache | None = None,
+    ):
+        self.session_factory = session_factory
+        self.entities = entities
+        self.spool_dir = (
+            Path(
+                spool_dir
+                or os.path.join(tempfile.gettempdir(), 'globant-uploads')
+            )
+            / 'sessions'
+        )
+        self.segment_size = segment_size
+        self.on_finished = on_finished
+        self.dimensions = dimensions
+        self._receivers: Dict[str, _Receiver] = {}
+
+    async def create(
+        self, entity: str, options: IngestOptions
+    ) -> ResumableUpload:
+        """Start a session loading `entity`, one of `entities`."""
+        now = datetime.now(timezone.utc)
+        record = UploadSession(
+            id=uuid4().hex,
+            entity=entity,
+            options=options.model_dump(),
+            created_at=now,
+            updated_at=now,
+        )
+        path = self._path(record.id)
+        await run_in_threadpool(restore_spool, path, 0)
+        async with self.session_factory() as session:
+            session.add(record)
+            await session.commit()
+
+        receiver = _Receiver(record, path, received=0)
+        self._receivers[record.id] = receiver
+        logger.info(f'Created {entity} upload session {record.id}')
+        return self._snapshot(receiver)
+
+    async def get(self, session_id: str) -> ResumableUpload | None:
+        receiver = await self._receiver(session_id)
+        return self._snapshot(receiver) if receiver else None
+
+    async def append(
+        self, session_id: str, offset: int, chunks: AsyncIterable[bytes]
+    ) -> ResumableUpload | None:
+        """
+        Spool the bytes of `chunks` at `offset`, which must be the number
+        of bytes received so far. Bytes are kept as they are written, even
+        when `chunks` breaks off.
+
+        Raises:
+            UploadSessionConflict: For a wrong offset, a session already
+                completing or another chunk being received
+        """
+        receiver = await self._receiver(session_id)
+        if receiver is None:
+            return None
+        if receiver.lock.locked():
+            raise UploadSessionConflict(
+                f'Another chunk of upload session {session_id} is being '
+                'received'
+            )
+        async with receiver.lock:
+            if receiver.completing:
+                raise UploadSessionConflict(
+                    f'Upload session {session_id} is {receiver.record.status}'
+                    ' and takes no more chunks'
+                )
+            if offset != receiver.received:
+                raise UploadSessionConflict(
+                    f'Chunk starts at offset {offset}, upload session '
+                    f'{session_id} expects {receiver.received}'
+                )
+            self._start_loader(receiver)
+            with receiver.path.open('r+b') as spooled:
+                spooled.seek(offset)
+                async for chunk in chunks:
+                    await run_in_threadpool(write_chunk, spooled, chunk)
+                    receiver.received += len(chunk)
+                    receiver.arrived.set()
+        return self._snapshot(receiver)
+
+    async def complete(self, session_id: str) -> ResumableUpload | None:
+        """
+        Load what is left of the upload, the last record may lack its line
+        break, and return the final state. Completing a failed session
+        retries it from its checkpoint.
+
+        Raises:
+            UploadSessionConflict: While a chunk is being received, or
+                when bytes of a completed upload were lost with its spool
+                file
+        """
+        receiver = await self._receiver(session_id)
+        if receiver is None:
+            return None
+        if receiver.lock.locked():
+            raise UploadSessionConflict(
+                f'A chunk of upload session {session_id} is being received'
+            )
+        self._check_received(receiver)
+        if receiver.record.status != 'succeeded':
+            if not receiver.completing:
+                await self._save(
+                    receiver, status='completing', size=receiver.received
+                )
+            self._start_loader(receiver)
+            receiver.arrived.set()
+            # The load goes on if the client gives up waiting
+            await asyncio.shield(receiver.loader)
+        return self._snapshot(receiver)
+
+    async def shutdown(self) -> None:
+        loaders = [
+            receiver.loader
+            for receiver in self._receivers.values()
+            if receiver.loader is not None
+        ]
+        for loader in loaders:
+            loader.cancel()
+        for loader in loaders:
+            with suppress(asyncio.CancelledError):
+                await loader
+        self._receivers = {}
+
+    def _path(self, session_id: str) -> Path:
+        return self.spool_dir / f'{session_id}.csv'
+
+    async def _receiver(self, session_id: str) -> _Receiver | None:
+        """Receiver of a session, restored from its checkpoint if needed."""
+        receiver = self._receivers.get(session_id)
+        if receiver is not None:
+            return receiver
+
+        async with self.session_factory() as session:
+            record = await session.get(UploadSession, session_id)
+        if record is None:
+            return None
+        path = self._path(session_id)
+        received = record.committed_offset
+        if record.status != 'succeeded':
+            received = await run_in_threadpool(
+                restore_spool, path, record.committed_offset
+            )
+        receiver = _Receiver(record, path, received)
+        if record.status == 'succeeded':
+            # Only ever read, kept out of the registry
+            return receiver
+        return self._receivers.setdefault(session_id, receiver)
+
+    @staticmethod
+    def _check_received(receiver: _Receiver) -> None:
+        """
+        Raises:
+            UploadSessionConflict: When a completed upload has fewer bytes
+                spooled than it was completed with, after its spool file
+                was lost, so they cannot be loaded
+        """
+        record = receiver.record
+        if receiver.completing and receiver.received < record.size:
+            raise UploadSessionConflict(
+                f'Bytes {receiver.received} to {record.size} of upload '
+                f'session {record.id} were lost with its spool file'
+            )
+
+    def _start_loader(self, receiver: _Receiver) -> None:
+        if receiver.loader is None or receiver.loader.done():
+            receiver.record.status = (
+                'completing' if receiver.completing else 'receiving'
+            )
+            receiver.record.error = None
+            receiver.result = None
+            receiver.loader = asyncio.create_task(self._load(receiver))
+
+    async def _load(self, receiver: _Receiver) -> None:
+        model_class, _ = self.entities[receiver.record.entity]
+        loaded = IngestProgress()
+        try:
+            while (segment := await self._next_segment(receiver)) is not None:
+                await self._commit_segment(
+                    receiver, model_class, segment, loaded
+                )
+            await self._finish(receiver)
+        except Exception as e:
+            logger.error(
+                f'Upload session {receiver.record.id} failed at offset '
+                f'{receiver.record.committed_offset}: {str(e)}',
+                exc_info=True,
+            )
+            try:
+                await self._save(receiver, status='failed', error=str(e))
+            except Exception:
+                logger.error(
+                    f'Could not save the state of upload session '
+                    f'{receiver.record.id}',
+                    exc_info=True,
+                )
+        finally:
+            # Restored from the database if it is ever used again
+            self._receivers.pop(receiver.record.id, None)
+            if self.on_finished is not None:
+                self.on_finished(model_class, loaded)
+
+    async def _next_segment(self, receiver: _Receiver) -> bytes | None:
+        """
+        Next complete records after the checkpoint, once `segment_size`
+        bytes are pending or the session is completing. None once all of
+        a completing session is loaded.
+        """
+        size = self.segment_size
+        while True:
+            pending = receiver.received - receiver.record.committed_offset
+            if receiver.completing and not pending:
+                self._check_received(receiver)
+                return None
+            if receiver.completing or pending >= size:
+                data = await run_in_threadpool(
+                    read_range,
+                    receiver.path,
+                    receiver.record.committed_offset,
+                    min(pending, size),
+                )
+                if receiver.completing and len(data) == pending:
+                    return data
+                end = complete_records(data)
+                if end:
+                    return data[:end]
+                # A record longer than the segment
+                size *= 2
+                continue
+            receiver.arrived.clear()
+            await receiver.arrived.wait()
+
+    async def _commit_segment(
+        self,
+        receiver: _Receiver,
+        model_class: Type[SQLModel],
+        segment: bytes,
+        loaded: IngestProgress,
+    ) -> None:
+        """
+        Write the rows of `segment`, its rejected rows and the checkpoint
+        after it in a single transaction.
+        """
+        record = receiver.record
+        options = UploadOptions(**record.options, transaction='file')
+        # Only the first segment starts with the header
+        options.has_headers = (
+            options.has_headers and not record.committed_offset
+        )
+        progress = IngestProgress()
+        async with self.session_factory() as session:
+            await IngestService(
+                DBService(session), self.dimensions
+            ).ingest_stream(
+                UploadFile(file=io.BytesIO(segment)),
+                model_class,
+                options,
+                progress,
+                commit=False,
+                first_row=record.committed_rows + 1,
+            )
+            if progress.errors:
+                await session.execute(
+                    insert(UploadSessionError),
+                    [
+                        {
+                            'session_id': record.id,
+                            'row_number': row,
+                            'message': message,
+                        }
+                        for row, message in progress.errors
+                    ],
+                )
+            values = {
+                'status': record.status,
+                'committed_offset': record.committed_offset + len(segment),
+                'committed_rows': record.committed_rows + progress.rows_parsed,
+                'rows_inserted': record.rows_inserted + progress.rows_inserted,
+                'rows_rejected': record.rows_rejected + progress.rows_rejected,
+                'error': None,
+                'updated_at': datetime.now(timezone.utc),
+            }
+            await session.execute(
+                update(UploadSession)
+                .where(UploadSession.id == record.id)
+                .values(**values)
+            )
+            await session.commit()
+
+        record.sqlmodel_update(values)
+        loaded.rows_parsed += progress.rows_parsed
+        loaded.rows_inserted += progress.rows_inserted
+        loaded.rows_rejected += progress.rows_rejected
+
+    async def _finish(self, receiver: _Receiver) -> None:
+        record = receiver.record
+        async with self.session_factory() as session:
+            errors = (
+                await session.execute(
+                    select(
+                        UploadSessionError.row_number,
+                        UploadSessionError.message,
+                    )
+                    .where(UploadSessionError.session_id == record.id)
+                    .order_by(UploadSessionError.row_number)
+                )
+            ).all()
+        _, entity_name = self.entities[record.entity]
+        receiver.result = generate_upload_response(
+            entity_name, record.rows_inserted, [tuple(e) for e in errors]
+        )
+        if record.rows_inserted:
+            await self._save(receiver, status='succeeded')
+        else:
+            await self._save(
+                receiver, status='failed', error='No valid records found'
+            )
+        await run_in_threadpool(receiver.path.unlink, missing_ok=True)
+        logger.info(f'Upload session {record.id}: {receiver.result.message}')
+
+    async def _save(self, receiver: _Receiver, **values) -> None:
+        values['updated_at'] = datetime.now(timezone.utc)
+        receiver.record.sqlmodel_update(values)
+        async with self.session_factory() as session:
+            await session.execute(
+                update(UploadSession)
+                .where(UploadSession.id == receiver.record.id)
+                .values(**values)
+            )
+            await session.commit()
+
+    @staticmethod
+    def _snapshot(receiver: _Receiver) -> ResumableUpload:
+        return ResumableUpload(
+            **receiver.record.model_dump(exclude={'options'}),
+            received=receiver.received,
+            result=receiver.result,
+        )
@@ -0,0 +1,260 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from itertools import compress
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+from sqlalchemy import DateTime, Integer
+from sqlalchemy.types import TypeEngine
+from sqlmodel import SQLModel
+from sqlmodel import inspect as sqlmodel_inspect
+
+from app.services.column_batch import ColumnBatch, get_kind
+
+Converter = Callable[[str], object]
+
+
+# UTC timestamps as the upload format documents them, optionally with a
+# space for the T and without the Z. Dates alone, offsets and other ISO
+# forms are rejected, so no value is stored other than as it was written.
+DATETIME_PATTERN = (
+    r'[0-9]{4}-[0-9]{2}-[0-9]{2}[T ][0-9]{2}:[0-9]{2}:[0-9]{2}Z?'
+)
+INTEGER_PATTERN = r'-?[0-9]+'
+
+datetime_pattern = re.compile(DATETIME_PATTERN)
+integer_pattern = re.compile(INTEGER_PATTERN)
+
+
+def parse_datetime(value: str) -> datetime:
+    if not datetime_pattern.fullmatch(value):
+        raise ValueError(f'Invalid datetime {value!r}')
+    return datetime.fromisoformat(value[:19])
+
+
+def parse_int(value: str) -> int:
+    # int() also takes whitespace, a plus sign, underscores and non-ASCII
+    # digits; plain ASCII digits skip the regular expression
+    if value.isascii() and (
+        value.isdigit() or integer_pattern.fullmatch(value)
+    ):
+        return int(value)
+    raise ValueError(f'Invalid integer {value!r}')
+
+
+CONVERTERS: Dict[Type[TypeEngine], Tuple[Converter, str]] = {
+    Integer: (parse_int, 'Input should be a valid integer'),
+    DateTime: (
+        parse_datetime,
+        'Invalid datetime format. Expected: YYYY-MM-DDThh:mm:ssZ',
+    ),
+}
+
+
+def missing_reference(table_name: str) -> str:
+    return f'No {table_name} with this id'
+
+
+def get_converter(column) -> Optional[Tuple[Converter, str]]:
+    for column_type, converter in CONVERTERS.items():
+        if isinstance(column.type, column_type):
+            return converter
+    return None
+
+
+class RowValidator:
+    """
+    Column-oriented validator compiled once per model from its mapper.
+
+    Instead of building a dict and calling `model_validate` for every row,
+    the rows of a batch are transposed and each column is converted with a
+    single `map` call. Only when a column fails is it converted again value
+    by value to find the offending rows. Valid rows come out as tuples in
+    mapper column order, ready for bulk insert.
+
+    Foreign key columns are also checked against the ids of the referenced
+    tables when they are given, see `DimensionCache`. With `compact` the
+    valid rows come out as a `ColumnBatch` instead, skipping the tuples.
+    """
+
+    def __init__(self, model_class: Type[SQLModel]):
+        mapper = sqlmodel_inspect(model_class)
+        self.model_class = model_class
+        self.fields = [column.key for column in mapper.columns]
+        self.columns = [column.name for column in mapper.columns]
+        self._converters: List[Optional[Tuple[Converter, str]]] = [
+            get_converter(column) for column in mapper.columns
+        ]
+        self.kinds = [get_kind(column) for column in mapper.columns]
+        self._references: List[Optional[str]] = [
+            next((key.column.table.name for key in column.foreign_keys), None)
+            for column in mapper.columns
+        ]
+        self._width_error = (
+            f'Expected {len(self.fields)} columns ({", ".join(self.fields)})'
+        )
+
+    def validate(
+        self,
+        rows: Sequence[Sequence[str]],
+        start: int = 1,
+        known_ids: Optional[Mapping[str, Collection[int]]] = None,
+        compact: bool = False,
+    ) -> Tuple[List[tuple] | ColumnBatch, List[Tuple[int, str]]]:
+        """
+        Convert a batch of raw CSV rows.
+
+        Args:
+            rows: Rows as returned by csv.reader
+            start: Row number of the first row, used in error messages
+            known_ids: Ids of the referenced tables by table name; foreign
+                keys to tables missing from it are not checked
+            compact: Return the valid rows as a ColumnBatch
+
+        Returns:
+            Tuple of (valid rows as tuples, (row number, message) errors)
+        """
+        width = len(self.fields)
+        failures: Dict[int, List[str]] = {}
+        indexes = []
+        for index, row in enumerate(rows):
+            if len(row) == width:
+                indexes.append(index)
+            else:
+                failures[index] = [f'{self._width_error}, got {len(row)}']
+
+        if len(indexes) == len(rows):
+            candidates = rows
+        else:
+            candidates = [rows[index] for index in indexes]
+
+        converted = []
+        for field, converter, reference, values in zip(
+            self.fields,
+            self._converters,
+            self._references,
+            zip(*candidates, strict=False),
+            strict=False,
+        ):
+            if converter is None:
+                column = values
+            else:
+                try:
+                    column = list(map(converter[0], values))
+                except (ValueError, TypeError):
+                    column = self._convert_slowly(
+                        field, converter, values, indexes, failures
+                    )
+            if known_ids and reference in known_ids:
+                self._check_references(
+                    field,
+                    reference,
+                    known_ids[reference],
+                    column,
+                    indexes,
+                    failures,
+                )
+            converted.append(column)
+
+        records = self._collect(converted, indexes, failures, compact)
+        errors = [
+            (start + index, '; '.join(messages))
+            for index, messages in sorted(failures.items())
+        ]
+        return records, errors
+
+    def _collect(
+        self,
+        converted: List[Sequence],
+        indexes: List[int],
+        failures: Dict[int, List[str]],
+        compact: bool,
+    ) -> List[tuple] | ColumnBatch:
+        """Assemble the rows that did not fail out of the columns."""
+        if compact:
+            if not converted:
+                converted = [[] for _ in self.fields]
+            if failures:
+                keep = [index not in failures for index in indexes]
+                converted = [
+                    list(compress(values, keep)) for values in converted
+                ]
+            return ColumnBatch.from_columns(self.kinds, converted)
+        if failures:
+            return [
+                record
+                for index, record in zip(
+                    indexes, zip(*converted, strict=False), strict=False
+                )
+                if index not in failures
+            ]
+        return list(zip(*converted, strict=False))
+
+    def validate_raw(
+        self, rows: Sequence[Sequence[str]], start: int = 1
+    ) -> Tuple[List[tuple], List[Tuple[int, str]]]:
+        """
+        Only check the number of columns, leaving types and keys to the
+        database. Rows come out as (row number, *values) tuples of strings.
+        """
+        width = len(self.fields)
+        records, errors = [], []
+        for row_number, row in enumerate(rows, start=start):
+            if len(row) == width:
+                records.append((row_number, *row))
+            else:
+                errors.append((
+                    row_number,
+                    f'{self._width_error}, got {len(row)}',
+                ))
+        return records, errors
+
+    @staticmethod
+    def _check_references(
+        field: str,
+        reference: str,
+        ids: Collection[int],
+        values: Sequence,
+        indexes: List[int],
+        failures: Dict[int, List[str]],
+    ) -> None:
+        for index, value in zip(indexes, values, strict=True):
+            if value is not None and value not in ids:
+                failures.setdefault(index, []).append(
+                    f"{field}: got '{value}' - {missing_reference(reference)}"
+                )
+
+    @staticmethod
+    def _convert_slowly(
+        field: str,
+        converter: Tuple[Converter, str],
+        values: Sequence[str],
+        indexes: List[int],
+        failures: Dict[int, List[str]],
+    ) -> list:
+        parse, message = converter
+        result = []
+        for index, value in zip(indexes, values, strict=True):
+            try:
+                result.append(parse(value))
+            except (ValueError, TypeError):
+                failures.setdefault(index, []).append(
+                    f"{field}: got '{value}' - {message}"
+                )
+                result.append(None)
+        return result
+
+
+@lru_cache
+def get_row_validator(model_class: Type[SQLModel]) -> RowValidator:
+    return RowValidator(model_class)
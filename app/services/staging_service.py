@@ -0,0 +1,158 @@
+from functools import lru_cache
+from typing import Type
+
+from sqlalchemy import DateTime, Integer, cast, column, select, table
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Select
+from sqlmodel import SQLModel
+from sqlmodel import inspect as sqlmodel_inspect
+
+from app.services.row_validator import (
+    DATETIME_PATTERN,
+    INTEGER_PATTERN,
+    get_converter,
+    missing_reference,
+)
+
+ROW_NUMBER = '_row'
+
+# PostgreSQL also takes inputs like 'now', dates alone or offsets for
+# timestamps and '1_0', '+1' or surrounding spaces for integers, which the
+# Python validator rejects, so values must match what it accepts
+PATTERNS = {
+    DateTime: f'^{DATETIME_PATTERN}$',
+    Integer: f'^{INTEGER_PATTERN}$',
+}
+
+dialect = postgresql.dialect()
+quote = dialect.identifier_preparer.quote
+
+
+# Deletes the staged rows failing any check, returning their messages
+REJECT_QUERY = """
+WITH rejected AS (
+    SELECT s.{row}, string_agg(c.message, '; ' ORDER BY c.position)
+        AS message
+    FROM {staging} s
+    CROSS JOIN LATERAL (VALUES
+{checks}
+    ) AS c(position, message)
+    WHERE c.message IS NOT NULL
+    GROUP BY s.{row}
+)
+DELETE FROM {staging} s
+USING rejected r
+WHERE s.{row} = r.{row}
+RETURNING r.{row}, r.message
+"""
+
+
+def literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class StagingTable:
+    """
+    Temporary table of raw text rows, validated with set-based SQL.
+
+    Raw CSV values are COPYed in as text next to their row number in the
+    file. `reject_sql` then checks nulls, types (with `pg_input_is_valid`,
+    PostgreSQL 16+) and foreign keys of the whole batch in one statement,
+    deletes the failing rows and returns their row numbers and messages.
+    Whatever is left is cast to the column types by `select_typed`.
+
+    Temporary tables are never WAL-logged, like UNLOGGED ones, and are
+    private to the connection, so concurrent uploads do not see each
+    other's rows. The table is dropped when the transaction ends.
+    """
+
+    def __init__(self, model_class: Type[SQLModel]):
+        mapper = sqlmodel_inspect(model_class)
+        self.target = model_class.__table__
+        self.name = f'staging_raw_{self.target.name}'
+        self.fields = [col.key for col in mapper.columns]
+        self.columns = [col.name for col in mapper.columns]
+        self.table = table(
+            self.name,
+            column(ROW_NUMBER),
+            *(column(name) for name in self.columns),
+        )
+
+        definitions = ', '.join(
+            [f'{ROW_NUMBER} bigint']
+            + [f'{quote(name)} text' for name in self.columns]
+        )
+        self.create_sql = (
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {self.name} '
+            f'({definitions}) ON COMMIT DROP'
+        )
+
+        checks = ',\n'.join(
+            f'({position}, {self._check(field, col)})'
+            for position, (field, col) in enumerate(
+                zip(self.fields, mapper.columns, strict=True)
+            )
+        )
+        self.reject_sql = REJECT_QUERY.format(
+            staging=self.name, row=ROW_NUMBER, checks=checks
+        )
+        self.truncate_sql = f'TRUNCATE {self.name}'
+
+    def select_typed(self) -> Select:
+        """Staged rows cast to the types of the target columns."""
+        return select(
+            *(
+                cast(self.table.c[name], self.target.c[name].type).label(name)
+                for name in self.columns
+            )
+        )
+
+    @staticmethod
+    def _check(field: str, col) -> str:
+        """
+        CASE expression with the first problem of a value, or NULL.
+
+        CASE evaluates its branches in order, so the foreign key lookup
+        only ever casts values that passed the type check.
+        """
+        value = f's.{quote(col.name)}'
+        type_name = col.type.compile(dialect=dialect)
+        converter = get_converter(col)
+        message = (
+            converter[1]
+            if converter
+            else f'Input should be a valid {type_name}'
+        )
+
+        def failure(reason: str) -> str:
+            # Same wording as the messages of RowValidator
+            return (
+                f'{literal(f"{field}: got '")} || {value} '
+                f'|| {literal(f"' - {reason}")}'
+            )
+
+        branches = []
+        if not col.nullable:
+            branches.append(
+                f'WHEN {value} IS NULL '
+                f'THEN {literal(f"{field}: Field required")}'
+            )
+        valid = f'pg_input_is_valid({value}, {literal(type_name)})'
+        for column_type, pattern in PATTERNS.items():
+            if isinstance(col.type, column_type):
+                valid = f'{value} ~ {literal(pattern)} AND {valid}'
+        branches.append(f'WHEN NOT ({valid}) THEN {failure(message)}')
+        for foreign_key in col.foreign_keys:
+            referenced = foreign_key.column
+            branches.append(
+                f'WHEN NOT EXISTS (SELECT 1 FROM '  # noqa: S608
+                f'{quote(referenced.table.name)} ref WHERE '
+                f'ref.{quote(referenced.name)} = {value}::{type_name}) '
+                f'THEN {failure(missing_reference(referenced.table.name))}'
+            )
+        return f'CASE {" ".join(branches)} END'
+
+
+@lru_cache
+def get_staging_table(model_class: Type[SQLModel]) -> StagingTable:
+    return StagingTable(model_class)
@@ -1,8 +1,61 @@
 import csv
 from io import StringIO
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Type
 
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from pydantic_core import to_json
+from sqlmodel import SQLModel
+
+from app.models.responses import ErrorDetail, UploadResponse
+from app.utils.columnar import COLUMNAR_FORMATS, iter_columnar
+
+
+def format_error_message(error_msg: str) -> str:
+    """Extract field name, error and
+    input value from Pydantic validation message"""
+    try:
+        lines = error_msg.split('\n')
+        field = lines[1].strip()
+        error = lines[2].strip()
+
+        if 'input_value=' in error:
+            input_value = error.split('input_value=')[1].split(',')[0]
+            return f"{field}: got '{input_value}' - {error.split('] [')[0]}"
+
+        return f'{field}: {error}'
+    except:  # noqa: E722
+        return error_msg.split('\n')[0]
+
+
+def format_errors(errors: List[Tuple[int, str]]) -> List[ErrorDetail]:
+    """Convert (row, message) tuples into ErrorDetail objects."""
+    return [
+        ErrorDetail(row=row, message=format_error_message(error_msg))
+        for row, error_msg in errors
+    ]
+
+
+def generate_upload_response(
+    entity_name: str, total_records: int, errors: List[Tuple[int, str]]
+) -> UploadResponse:
+    """
+    Builds the response of a successful upload.
+
+    :param entity_name: Name of the uploaded entity, used in the message.
+    :param total_records: Number of records written to the database.
+    :param errors: (row, message) tuples of the rejected rows.
+    :return: UploadResponse summarizing the upload.
+    """
+    formatted_errors = format_errors(errors)
+    message = f'Successfully uploaded {total_records} {entity_name} records'
+    if formatted_errors:
+        message += f' with {len(formatted_errors)} validation errors'
+
+    return UploadResponse(
+        message=message,
+        total_records=total_records,
+        errors=formatted_errors,
+    )
 
 
 def generate_csv_response(data: List[Dict], filename: str) -> Response:
@@ -32,3 +85,79 @@ def generate_csv_response(data: List[Dict], filename: str) -> Response:
         media_type='text/csv',
         headers={'Content-Disposition': f'attachment;filename={filename}'},
     )
+
+
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+
+def generate_ndjson(data: List[Dict]) -> bytes:
+    """Serializes rows as newline delimited JSON, one object per line."""
+    return b''.join(to_json(row) + b'\n' for row in data)
+
+
+async def iter_csv(chunks: AsyncIterator[List[Dict]]) -> AsyncIterator[str]:
+    writer = None
+    output = StringIO()
+    async for rows in chunks:
+        if writer is None and rows:
+            writer = csv.DictWriter(output, fieldnames=rows[0].keys())
+            writer.writeheader()
+        if writer is not None:
+            writer.writerows(rows)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
+
+
+async def iter_ndjson(
+    chunks: AsyncIterator[List[Dict]],
+) -> AsyncIterator[bytes]:
+    async for rows in chunks:
+        yield generate_ndjson(rows)
+
+
+async def iter_json(chunks: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    separator = b'['
+    async for rows in chunks:
+        if rows:
+            yield separator + b','.join(to_json(row) for row in rows)
+            separator = b','
+    yield b'[]' if separator == b'[' else b']'
+
+
+def generate_streaming_response(
+    chunks: AsyncIterator[List[Dict]],
+    format: str,
+    filename: str,
+    model: Optional[Type[SQLModel]] = None,
+) -> StreamingResponse:
+    """
+    Generates a response that writes rows as they are read, so only one
+    chunk of the report is held in memory at a time.
+
+    :param chunks: Async iterator of lists of dictionaries.
+    :param format: One of 'json', 'csv', 'ndjson', 'parquet' or 'arrow'.
+    :param filename: Name used in the Content-Disposition of file formats.
+    :param model: Response model of the rows, giving the Parquet and Arrow
+        column types.
+    :return: StreamingResponse writing the rows in the requested format.
+    """
+    writers = {'json': iter_json, 'csv': iter_csv, 'ndjson': iter_ndjson}
+    headers = {}
+    if format != 'json':
+        headers['Content-Disposition'] = f'attachment;filename={filename}'
+    if format in COLUMNAR_FORMATS:
+        body = iter_columnar(chunks, format, model)
+    else:
+        body = writers[format](chunks)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
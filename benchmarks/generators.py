@@ -0,0 +1,139 @@
+"""
+Synthetic departments, jobs and hired employees CSV files.
+
+Rows are generated from a seeded random generator, so a given scale, error
+rate and seed always produce the same files. A fraction `error_rate` of the
+rows is broken in one of the ways the validators must catch: a bad id, a
+bad datetime, a missing column or an unknown department.
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+
+DEPARTMENTS = 12
+JOBS = 183
+# Hires are spread over these years, so every report has data
+YEARS = (2020, 2021, 2022)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    departments: Path
+    jobs: Path
+    employees: Path
+    rows: int
+    invalid_rows: int
+
+
+# One template per kind of invalid row, formatted with the row id
+BROKEN_EMPLOYEES = (
+    'x{0},Employee {0},2021-01-01T00:00:00Z,1,1',
+    '{0},Employee {0},yesterday,1,1',
+    '{0},Employee {0},2021-01-01T00:00:00Z,1',
+    '{0},Employee {0},2021-01-01T00:00:00Z,%d,1' % (DEPARTMENTS + 1),
+)
+EMPLOYEE_COLUMNS = 5
+
+
+def employee_lines(
+    rows: int, error_rate: float = 0.0, seed: int = 42
+) -> Iterator[str]:
+    """
+    Lines of a hired employees file without headers, with ids from 1 and
+    about `error_rate` of them invalid.
+    """
+    rng = random.Random(seed)  # noqa: S311
+    start = datetime(YEARS[0], 1, 1)
+    span = (datetime(YEARS[-1] + 1, 1, 1) - start).days * 86400
+    for row_id in range(1, rows + 1):
+        if error_rate and rng.random() < error_rate:
+            yield rng.choice(BROKEN_EMPLOYEES).format(row_id)
+            continue
+        hired_at = start + timedelta(seconds=rng.randrange(span))
+        yield (
+            f'{row_id},Employee {row_id},'
+            f'{hired_at:%Y-%m-%dT%H:%M:%SZ},'
+            f'{rng.randint(1, DEPARTMENTS)},{rng.randint(1, JOBS)}'
+        )
+
+
+def dimension_lines(name: str, rows: int) -> Iterator[str]:
+    for row_id in range(1, rows + 1):
+        yield f'{row_id},{name} {row_id}'
+
+
+def write_lines(path: Path, lines: Iterator[str]) -> None:
+    with path.open('w', encoding='utf-8', newline='') as file:
+        for line in lines:
+            file.write(line)
+            file.write('\n')
+
+
+def generate_dataset(
+    folder: Path, rows: int, error_rate: float = 0.0, seed: int = 42
+) -> Dataset:
+    """Write the three files of a dataset with `rows` employees."""
+    folder.mkdir(parents=True, exist_ok=True)
+    departments = folder / 'departments.csv'
+    jobs = folder / 'jobs.csv'
+    employees = folder / f'hired_employees_{rows}.csv'
+    write_lines(departments, dimension_lines('Department', DEPARTMENTS))
+    write_lines(jobs, dimension_lines('Job', JOBS))
+
+    invalid = 0
+
+    def count_invalid(lines: Iterator[str]) -> Iterator[str]:
+        nonlocal invalid
+        for line in lines:
+            invalid += not is_valid_employee(line)
+            yield line
+
+    write_lines(
+        employees, count_invalid(employee_lines(rows, error_rate, seed))
+    )
+    return Dataset(departments, jobs, employees, rows, invalid)
+
+
+def write_employees_parquet(source: Path, target: Path) -> int:
+    """
+    Typed Parquet copy of the valid rows of an employees file, as a
+    warehouse would export them. Needs pyarrow; returns the rows written.
+    """
+    import pyarrow as pa  # noqa: PLC0415
+    import pyarrow.parquet as pq  # noqa: PLC0415
+
+    columns = [[] for _ in range(EMPLOYEE_COLUMNS)]
+    with source.open(encoding='utf-8') as file:
+        for raw_line in file:
+            line = raw_line.rstrip('\n')
+            if not is_valid_employee(line):
+                continue
+            row_id, name, hired_at, department_id, job_id = line.split(',')
+            columns[0].append(int(row_id))
+            columns[1].append(name)
+            columns[2].append(datetime.fromisoformat(hired_at))
+            columns[3].append(int(department_id))
+            columns[4].append(int(job_id))
+
+    table = pa.table({
+        'id': pa.array(columns[0], pa.int64()),
+        'name': pa.array(columns[1], pa.string()),
+        'datetime': pa.array(columns[2], pa.timestamp('s', tz='UTC')),
+        'department_id': pa.array(columns[3], pa.int32()),
+        'job_id': pa.array(columns[4], pa.int32()),
+    })
+    pq.write_table(table, target)
+    return table.num_rows
+
+
+def is_valid_employee(line: str) -> bool:
+    values = line.split(',')
+    return (
+        len(values) == EMPLOYEE_COLUMNS
+        and values[0].isdigit()
+        and values[2][:4].isdigit()
+        and int(values[3]) <= DEPARTMENTS
+    )
@@ -0,0 +1,56 @@
+"""
+Compare row validation throughput of the per-row Pydantic path
+(`CSVService.read_uploaded_csv`) with the compiled column validator
+(`CSVService.read_uploaded_rows`).
+
+Usage:
+    python -m benchmarks.validation --rows 200000
+"""
+
+import argparse
+import io
+import time
+
+from app.models.base import HiredEmployees
+from app.services.csv_service import CSVService
+from benchmarks.generators import employee_lines
+
+
+def generate_employees_csv(rows: int, seed: int = 42) -> str:
+    return '\n'.join(employee_lines(rows, seed=seed))
+
+
+def measure(label: str, read, content: str, rows: int) -> float:
+    started = time.perf_counter()
+    records, errors = read(io.StringIO(content), HiredEmployees)
+    elapsed = time.perf_counter() - started
+    if len(records) != rows or errors:
+        raise RuntimeError(f'{label}: unexpected validation result')
+    rate = rows / elapsed
+    print(f'{label:<28} {elapsed:8.3f}s {rate:12,.0f} rows/s')
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    content = generate_employees_csv(args.rows)
+    before = measure(
+        'read_uploaded_csv (pydantic)',
+        CSVService.read_uploaded_csv,
+        content,
+        args.rows,
+    )
+    after = measure(
+        'read_uploaded_rows (compiled)',
+        CSVService.read_uploaded_rows,
+        content,
+        args.rows,
+    )
+    print(f'speedup: {after / before:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
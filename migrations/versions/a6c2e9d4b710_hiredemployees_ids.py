@@ -0,0 +1,64 @@
+"""hiredemployees ids
+
+Revision ID: a6c2e9d4b710
+Revises: f3b7d2c9a6e1
+Create Date: 2026-10-18 16:20:14.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c2e9d4b710'
+down_revision: Union[str, None] = 'f3b7d2c9a6e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNIQUE_ID_FUNCTION = """
+CREATE OR REPLACE FUNCTION hiredemployees_unique_id()
+RETURNS trigger LANGUAGE plpgsql
+SET enable_hashjoin = off SET enable_mergejoin = off AS $$
+DECLARE
+    duplicate int;
+BEGIN
+{lock}    SELECT n.id INTO duplicate
+    FROM new_rows n
+    JOIN hiredemployees h ON h.id = n.id AND h.datetime <> n.datetime
+    LIMIT 1;
+    IF FOUND THEN
+        RAISE EXCEPTION
+            'duplicate key value violates unique constraint "%"',
+            'hiredemployees_id_key'
+            USING ERRCODE = 'unique_violation',
+                DETAIL = format('Key (id)=(%s) already exists.', duplicate);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+# Concurrent writers of an id wait for each other's commit on its row
+LOCK_IDS = """    INSERT INTO hiredemployees_ids (id)
+    SELECT DISTINCT id FROM new_rows ORDER BY id
+    ON CONFLICT (id) DO NOTHING;
+    PERFORM FROM hiredemployees_ids
+    WHERE id IN (SELECT id FROM new_rows)
+    ORDER BY id
+    FOR UPDATE;
+"""
+
+
+def upgrade() -> None:
+    op.create_table('hiredemployees_ids',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute('INSERT INTO hiredemployees_ids (id) SELECT DISTINCT id FROM hiredemployees')
+    op.execute(UNIQUE_ID_FUNCTION.format(lock=LOCK_IDS))
+
+
+def downgrade() -> None:
+    op.execute(UNIQUE_ID_FUNCTION.format(lock=''))
+    op.drop_table('hiredemployees_ids')
@@ -0,0 +1,182 @@
+"""partition hiredemployees by year
+
+Revision ID: e8c4f1a7b352
+Revises: d5a9c3e71f20
+Create Date: 2026-10-18 15:31:40.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4f1a7b352'
+down_revision: Union[str, None] = 'd5a9c3e71f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = 'ix_hiredemployees_datetime_department_id_job_id'
+STATS_TRIGGERS = [
+    ('quarterly_stats', 'hiredemployees_quarterly_stats'),
+    ('department_stats', 'hiredemployees_department_stats'),
+]
+
+
+def create_table(name: str, primary_key: Sequence[str], **kwargs) -> None:
+    op.create_table(name,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('datetime', sa.DateTime(), nullable=False),
+    sa.Column('department_id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ),
+    sa.PrimaryKeyConstraint(*primary_key),
+    **kwargs
+    )
+    op.create_index(INDEX, name, ['datetime', 'department_id', 'job_id'], unique=False)
+
+
+def move_old_table() -> None:
+    """Rename hiredemployees and free the names of its index and key."""
+    op.rename_table('hiredemployees', 'hiredemployees_old')
+    op.drop_index(INDEX, table_name='hiredemployees_old')
+    op.execute('ALTER TABLE hiredemployees_old RENAME CONSTRAINT hiredemployees_pkey TO hiredemployees_old_pkey')
+
+
+def copy_old_rows() -> None:
+    # Before the triggers exist, the stats already count these rows
+    op.execute("""
+    INSERT INTO hiredemployees (id, name, datetime, department_id, job_id)
+    SELECT id, name, datetime, department_id, job_id
+    FROM hiredemployees_old
+    """)
+    op.drop_table('hiredemployees_old')
+
+
+def create_stats_triggers() -> None:
+    for prefix, function in STATS_TRIGGERS:
+        op.execute(f"""
+CREATE OR REPLACE TRIGGER {prefix}_insert
+AFTER INSERT ON hiredemployees
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+""")
+        op.execute(f"""
+CREATE OR REPLACE TRIGGER {prefix}_update
+AFTER UPDATE ON hiredemployees
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+""")
+        op.execute(f"""
+CREATE OR REPLACE TRIGGER {prefix}_delete
+AFTER DELETE ON hiredemployees
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+""")
+        op.execute(f"""
+CREATE OR REPLACE TRIGGER {prefix}_truncate
+AFTER TRUNCATE ON hiredemployees
+FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+""")
+
+
+def upgrade() -> None:
+    op.execute("""
+CREATE OR REPLACE FUNCTION ensure_yearly_partitions(
+    parent text, key text, years int[]
+)
+RETURNS int LANGUAGE plpgsql AS $$
+DECLARE
+    year int;
+    partition text;
+    lower timestamp;
+    upper timestamp;
+    created int := 0;
+BEGIN
+    FOREACH year IN ARRAY coalesce(years, '{}') LOOP
+        partition := format('%s_y%s', parent, year);
+        CONTINUE WHEN to_regclass(quote_ident(partition)) IS NOT NULL;
+        lower := make_timestamp(year, 1, 1, 0, 0, 0);
+        upper := make_timestamp(year + 1, 1, 1, 0, 0, 0);
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS '
+                'INCLUDING CONSTRAINTS)',
+                partition, parent
+            );
+        EXCEPTION WHEN duplicate_table THEN
+            CONTINUE;
+        END;
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE %I >= $1 AND %I < $2 '
+            'RETURNING *) INSERT INTO %I SELECT * FROM moved',
+            parent || '_default', key, key, partition
+        ) USING lower, upper;
+        EXECUTE format(
+            'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            parent, partition, lower, upper
+        );
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END
+$$
+""")
+    move_old_table()
+    create_table('hiredemployees', ['id', 'datetime'], postgresql_partition_by='RANGE (datetime)')
+    op.execute('CREATE TABLE hiredemployees_default PARTITION OF hiredemployees DEFAULT')
+    op.execute("""
+    SELECT ensure_yearly_partitions('hiredemployees', 'datetime', ARRAY(
+        SELECT DISTINCT EXTRACT(year FROM datetime)::int
+        FROM hiredemployees_old
+    ))
+    """)
+    copy_old_rows()
+    create_stats_triggers()
+
+    op.execute("""
+CREATE OR REPLACE FUNCTION hiredemployees_unique_id()
+RETURNS trigger LANGUAGE plpgsql
+SET enable_hashjoin = off SET enable_mergejoin = off AS $$
+DECLARE
+    duplicate int;
+BEGIN
+    SELECT n.id INTO duplicate
+    FROM new_rows n
+    JOIN hiredemployees h ON h.id = n.id AND h.datetime <> n.datetime
+    LIMIT 1;
+    IF FOUND THEN
+        RAISE EXCEPTION
+            'duplicate key value violates unique constraint "%"',
+            'hiredemployees_id_key'
+            USING ERRCODE = 'unique_violation',
+                DETAIL = format('Key (id)=(%s) already exists.', duplicate);
+    END IF;
+    RETURN NULL;
+END
+$$
+""")
+    op.execute("""
+CREATE OR REPLACE TRIGGER unique_id_insert
+AFTER INSERT ON hiredemployees
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_unique_id()
+""")
+    op.execute("""
+CREATE OR REPLACE TRIGGER unique_id_update
+AFTER UPDATE ON hiredemployees
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION hiredemployees_unique_id()
+""")
+
+
+def downgrade() -> None:
+    move_old_table()
+    create_table('hiredemployees', ['id'])
+    copy_old_rows()
+    create_stats_triggers()
+    op.execute('DROP FUNCTION IF EXISTS hiredemployees_unique_id()')
+    op.execute('DROP FUNCTION IF EXISTS ensure_yearly_partitions(text, text, int[])')
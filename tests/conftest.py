@@ -12,8 +12,16 @@ from testcontainers.postgres import PostgresContainer
 
 from app import models  # noqa: F401
 from app.config import Settings
-from app.dependencies.connection import get_db
+from app.dependencies.cache import get_dimension_cache, get_report_cache
+from app.dependencies.connection import (
+    get_db,
+    get_read_db,
+    get_read_session_factory,
+)
 from app.main import app as fastapi_app
+from app.models.base import Departments, Jobs
+from app.services.dimension_cache import DimensionCache
+from app.services.report_cache import ReportCache
 from tests.test_data import (
     create_test_departments,
     create_test_employees,
@@ -83,13 +91,35 @@ async def async_session(async_engine: AsyncSession, event_loop):
 
 
 @pytest.fixture
-async def async_client(async_session: AsyncSession) -> AsyncClient:  # type: ignore
+def report_cache() -> ReportCache:
+    """Fresh report cache, so no test sees reports cached by another."""
+    return ReportCache()
+
+
+@pytest.fixture
+async def async_client(
+    async_engine, async_session: AsyncSession, report_cache: ReportCache
+) -> AsyncClient:  # type: ignore
     """Create an async client for testing FastAPI endpoints."""
 
     async def get_postgres_session_override():
         yield async_session
 
     fastapi_app.dependency_overrides[get_db] = get_postgres_session_override
+    fastapi_app.dependency_overrides[get_read_db] = (
+        get_postgres_session_override
+    )
+    fastapi_app.dependency_overrides[get_report_cache] = lambda: report_cache
+    dimension_cache = DimensionCache([Departments, Jobs])
+    fastapi_app.dependency_overrides[get_dimension_cache] = lambda: (
+        dimension_cache
+    )
+    session_factory = async_sessionmaker(
+        async_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    fastapi_app.dependency_overrides[get_read_session_factory] = lambda: (
+        session_factory
+    )
     client = AsyncClient(app=fastapi_app, base_url='http://test')
     yield client
     await client.aclose()
@@ -0,0 +1,99 @@
+from http import HTTPStatus
+from io import BytesIO
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database.postgres import TimedQueuePool, instrument_engine
+from app.dependencies.metrics import metrics
+
+
+@pytest.mark.asyncio
+async def test_metrics_time_requests_by_route(async_client: AsyncClient):
+    labels = {
+        'method': 'GET',
+        'route': '/reports/quarterly-hiring',
+        'status': '422',
+    }
+    before = metrics.requests.count(**labels)
+    await async_client.get('/reports/quarterly-hiring')
+    await async_client.get('/reports/quarterly-hiring')
+    assert metrics.requests.count(**labels) == before + 2
+
+    response = await async_client.get('/metrics')
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/reports/quarterly-hiring",status="422"}'
+    ) in response.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_upload_rows_and_copy(async_client: AsyncClient):
+    def rows(outcome):
+        return metrics.upload_rows.value(table='jobs', outcome=outcome)
+
+    parsed, inserted, rejected = (
+        rows('parsed'),
+        rows('inserted'),
+        rows('rejected'),
+    )
+    copies = metrics.queries.count(operation='COPY')
+    files = {
+        'file': ('jobs.csv', BytesIO(b'700,Welder\nx,Broken\n'), 'text/csv')
+    }
+    response = await async_client.post(
+        '/upload/jobs', params={'method': 'copy'}, files=files
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert rows('parsed') == parsed + 2
+    assert rows('inserted') == inserted + 1
+    assert rows('rejected') == rejected + 1
+    assert metrics.queries.count(operation='COPY') == copies + 1
+
+    response = await async_client.get('/metrics')
+    assert 'upload_rows_total{table="jobs",outcome="inserted"}' in (
+        response.text
+    )
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_rows_skipped_as_conflicts(
+    async_client: AsyncClient,
+):
+    def rows(outcome):
+        return metrics.upload_rows.value(table='jobs', outcome=outcome)
+
+    def upload():
+        files = {'file': ('jobs.csv', BytesIO(b'701,Glazier\n'), 'text/csv')}
+        return async_client.post(
+            '/upload/jobs', params={'on_conflict': 'ignore'}, files=files
+        )
+
+    assert (await upload()).status_code == HTTPStatus.OK
+    parsed, skipped = rows('parsed'), rows('skipped')
+    await upload()
+    assert rows('parsed') == parsed + 1
+    assert rows('skipped') == skipped + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_time_queries_and_pool_waits(async_engine):
+    engine = create_async_engine(
+        async_engine.url, poolclass=TimedQueuePool, pool_logging_name='test'
+    )
+    instrument_engine(engine)
+    instrument_engine(engine)
+    selects = metrics.queries.count(operation='SELECT')
+    waits = metrics.pool_wait.count(pool='test')
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+    finally:
+        await engine.dispose()
+
+    assert metrics.queries.count(operation='SELECT') == selects + 1
+    assert metrics.pool_wait.count(pool='test') == waits + 1
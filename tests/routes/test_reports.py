@@ -1,7 +1,15 @@
+import json
+import re
+import datetime
+import io
 from http import HTTPStatus
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import text
+
+from app.models.requests import ReportParams
+from app.services.report_service import ReportService
 
 
 @pytest.mark.asyncio
@@ -45,3 +53,267 @@ async def test_get_departments_above_mean_2021(
 
     engineering_dept = next(r for r in data if r['name'] == 'Engineering')
     assert engineering_dept['hired_employees'] > 1
+
+
+@pytest.mark.asyncio
+async def test_quarterly_hiring_2021_counts(
+    async_client: AsyncClient, populated_async_session
+):
+    response = await async_client.get('/reports/quarterly-hiring-2021')
+    data = response.json()
+
+    engineering_record = next(
+        r
+        for r in data
+        if r['department'] == 'Engineering' and r['job'] == 'Software Engineer'
+    )
+    assert engineering_record['q1'] == 2  # noqa: PLR2004
+    assert engineering_record['q2'] == 1
+    assert engineering_record['q3'] == 0
+    assert engineering_record['q4'] == 0
+
+
+@pytest.mark.asyncio
+async def test_get_quarterly_hiring_by_year(
+    async_client: AsyncClient, populated_async_session
+):
+    response = await async_client.get(
+        '/reports/quarterly-hiring', params={'year': 2021}
+    )
+    assert response.status_code == HTTPStatus.OK
+    legacy = await async_client.get('/reports/quarterly-hiring-2021')
+    assert response.json() == legacy.json()
+
+    response = await async_client.get(
+        '/reports/quarterly-hiring', params={'year': 2020}
+    )
+    assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_get_quarterly_hiring_by_range_matches_year(
+    async_client: AsyncClient, populated_async_session
+):
+    by_year = await async_client.get(
+        '/reports/quarterly-hiring', params={'year': 2021}
+    )
+    by_range = await async_client.get(
+        '/reports/quarterly-hiring',
+        params={'start': '2021-01-01', 'end': '2022-01-01'},
+    )
+    assert by_range.status_code == HTTPStatus.OK
+    assert by_range.json() == by_year.json()
+
+
+@pytest.mark.asyncio
+async def test_get_departments_above_mean_by_range(
+    async_client: AsyncClient, populated_async_session
+):
+    response = await async_client.get(
+        '/reports/departments-above-mean',
+        params={'start': '2021-01-01', 'end': '2021-05-01', 'format': 'csv'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.text.splitlines() == [
+        'id,name,hired_employees',
+        '1,Engineering,2',
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'params',
+    [
+        {},
+        {'year': 2021, 'start': '2021-01-01'},
+        {'start': '2021-02-01', 'end': '2021-01-01'},
+    ],
+)
+async def test_report_period_validation(async_client: AsyncClient, params):
+    response = await async_client.get(
+        '/reports/departments-above-mean', params=params
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'path',
+    ['/reports/quarterly-hiring-2021', '/reports/departments-above-mean-2021'],
+)
+async def test_legacy_reports_reject_unknown_formats(
+    async_client: AsyncClient, path
+):
+    response = await async_client.get(path, params={'format': 'xml'})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'build_query',
+    [
+        ReportService.departments_above_mean_query,
+        ReportService.quarterly_hiring_query,
+    ],
+)
+async def test_report_queries_use_datetime_index(
+    populated_async_session, build_query
+):
+    query, params = build_query(
+        ReportParams(
+            start=datetime.date(2021, 1, 1), end=datetime.date(2021, 7, 1)
+        )
+    )
+    # The tables are tiny, so make sure sequential scans are not preferred
+    await populated_async_session.execute(
+        text('SET LOCAL enable_seqscan = off')
+    )
+    result = await populated_async_session.execute(
+        text(f'EXPLAIN {query}'), params
+    )
+    plan = '\n'.join(row[0] for row in result)
+    await populated_async_session.rollback()
+
+    # Partitions get their own copy of the index, named after them
+    assert re.search(r'hiredemployees_\w+_datetime_department_id_job_id', plan)
+    assert 'Index Cond: ((datetime >=' in plan
+
+
+@pytest.mark.asyncio
+async def test_departments_above_mean_reads_yearly_stats(
+    async_client: AsyncClient, populated_async_session
+):
+    query, params = ReportService.departments_above_mean_query(
+        ReportParams(year=2021)
+    )
+    result = await populated_async_session.execute(
+        text(f'EXPLAIN {query}'), params
+    )
+    plan = '\n'.join(row[0] for row in result)
+    assert 'departmenthiringstats' in plan
+    assert 'hiredemployees' not in plan
+
+    by_year = await async_client.get(
+        '/reports/departments-above-mean', params={'year': 2021}
+    )
+    by_range = await async_client.get(
+        '/reports/departments-above-mean',
+        params={'start': '2021-01-01', 'end': '2022-01-01'},
+    )
+    assert by_year.json() == by_range.json()
+    assert by_year.json()
+
+
+@pytest.mark.asyncio
+async def test_report_etag_returns_not_modified(
+    async_client: AsyncClient, populated_async_session, report_cache
+):
+    response = await async_client.get(
+        '/reports/quarterly-hiring', params={'year': 2021}
+    )
+    etag = response.headers['etag']
+    assert len(report_cache) == 1
+
+    response = await async_client.get(
+        '/reports/quarterly-hiring',
+        params={'year': 2021},
+        headers={'If-None-Match': etag},
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+
+    response = await async_client.get(
+        '/reports/quarterly-hiring',
+        params={'year': 2021, 'format': 'csv'},
+        headers={'If-None-Match': etag},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag'] != etag
+    assert len(report_cache) == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'format', ['json', 'csv', 'ndjson', 'parquet', 'arrow']
+)
+async def test_streamed_report_matches_buffered(
+    async_client: AsyncClient, populated_async_session, format
+):
+    if format in {'parquet', 'arrow'}:
+        pytest.importorskip('pyarrow')
+    params = {'start': '2021-01-01', 'end': '2022-01-01', 'format': format}
+    buffered = await async_client.get(
+        '/reports/quarterly-hiring', params=params
+    )
+    streamed = await async_client.get(
+        '/reports/quarterly-hiring', params={**params, 'stream': True}
+    )
+
+    assert streamed.status_code == HTTPStatus.OK
+    assert streamed.content == buffered.content
+    assert streamed.headers['content-type'] == buffered.headers['content-type']
+    assert 'etag' not in streamed.headers
+
+
+@pytest.mark.asyncio
+async def test_get_departments_above_mean_ndjson(
+    async_client: AsyncClient, populated_async_session
+):
+    response = await async_client.get(
+        '/reports/departments-above-mean',
+        params={'year': 2021, 'format': 'ndjson', 'stream': True},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert (
+        'departments_above_mean_2021.ndjson'
+        in (response.headers['content-disposition'])
+    )
+    lines = response.text.splitlines()
+    assert [json.loads(line) for line in lines] == (
+        await async_client.get('/reports/departments-above-mean-2021')
+    ).json()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ('route', 'format', 'media_type'),
+    [
+        ('quarterly-hiring', 'parquet', 'application/vnd.apache.parquet'),
+        (
+            'departments-above-mean',
+            'arrow',
+            'application/vnd.apache.arrow.stream',
+        ),
+    ],
+)
+@pytest.mark.parametrize('stream', [False, True])
+async def test_columnar_report_matches_json(
+    async_client: AsyncClient,
+    populated_async_session,
+    route,
+    format,
+    media_type,
+    stream,
+):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    response = await async_client.get(
+        f'/reports/{route}',
+        params={'year': 2021, 'format': format, 'stream': stream},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == media_type
+    assert f'_2021.{format}' in response.headers['content-disposition']
+
+    if format == 'parquet':
+        table = pq.read_table(io.BytesIO(response.content))
+    else:
+        table = pa.ipc.open_stream(response.content).read_all()
+    expected = await async_client.get(
+        f'/reports/{route}', params={'year': 2021}
+    )
+    assert table.to_pylist() == expected.json()
+    assert table.num_rows > 0
+    assert pa.types.is_int64(table.schema.field(-1).type)
@@ -0,0 +1,40 @@
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+
+from app.dependencies.connection import get_db
+from app.main import app as fastapi_app
+
+
+@pytest.fixture
+def db_requests(async_client: AsyncClient, async_session) -> list:
+    """Records every request that resolved a `get_db` session."""
+    requests = []
+
+    async def get_counted_session():
+        requests.append(1)
+        yield async_session
+
+    fastapi_app.dependency_overrides[get_db] = get_counted_session
+    return requests
+
+
+@pytest.mark.asyncio
+async def test_routes_without_database_get_no_session(
+    async_client: AsyncClient, db_requests: list
+):
+    for path in ('/', '/metrics', '/openapi.json', '/upload/jobs/missing'):
+        response = await async_client.get(path)
+        assert response.status_code in {HTTPStatus.OK, HTTPStatus.NOT_FOUND}
+    assert db_requests == []
+
+
+@pytest.mark.asyncio
+async def test_routes_with_database_get_one_session(
+    async_client: AsyncClient, db_requests: list
+):
+    files = {'file': ('jobs.csv', b'801,Plumber\n', 'text/csv')}
+    response = await async_client.post('/upload/jobs', files=files)
+    assert response.status_code == HTTPStatus.OK
+    assert db_requests == [1]
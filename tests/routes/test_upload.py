@@ -1,8 +1,21 @@
+import asyncio
+import bz2
+import gzip
+import zipfile
+from datetime import datetime
 from http import HTTPStatus
 from io import BytesIO
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.dependencies.jobs import get_job_manager, get_upload_sessions
+from app.main import app as fastapi_app
+from app.services.batch_service import BATCH_ENTITIES
+from app.services.job_service import UploadJobManager
+from app.services.resumable_service import ResumableUploadManager
 
 
 @pytest.fixture
@@ -27,6 +40,30 @@ def employees_csv():
     )
 
 
+@pytest.fixture
+async def job_manager(async_engine, async_client, tmp_path):
+    manager = UploadJobManager(
+        async_sessionmaker(
+            async_engine, class_=AsyncSession, expire_on_commit=False
+        ),
+        workers=1,
+        spool_dir=str(tmp_path),
+    )
+    fastapi_app.dependency_overrides[get_job_manager] = lambda: manager
+    yield manager
+    await manager.shutdown()
+
+
+async def wait_for_job(client: AsyncClient, job_id: str) -> dict:
+    for _ in range(100):
+        response = await client.get(f'/upload/jobs/{job_id}')
+        job = response.json()
+        if job['status'] in {'succeeded', 'failed'}:
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError(f'Job {job_id} did not finish')
+
+
 @pytest.mark.asyncio
 async def test_upload_departments_success(
     async_client: AsyncClient, departments_csv
@@ -63,6 +100,156 @@ async def test_upload_employees_success(
     assert len(data['errors']) == 0
 
 
+@pytest.mark.asyncio
+async def test_upload_departments_streaming(async_client: AsyncClient):
+    csv_content = BytesIO(b'5,Finance\n6,Legal\nbroken\n7,Support\n')
+    files = {'file': ('departments.csv', csv_content, 'text/csv')}
+    response = await async_client.post(
+        '/upload/departments', files=files, params={'streaming': True}
+    )
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['total_records'] == 3  # noqa: PLR2004
+    assert [error['row'] for error in data['errors']] == [3]
+
+
+@pytest.mark.asyncio
+async def test_upload_employees_with_copy(async_client: AsyncClient):
+    csv_content = BytesIO(
+        b'4,Alice Brown,2021-04-05T00:00:00Z,3,11\n'
+        b'5,Charlie Wilson,2021-06-15T00:00:00Z,1,10\n'
+    )
+    files = {'file': ('employees.csv', csv_content, 'text/csv')}
+    response = await async_client.post(
+        '/upload/employees', files=files, params={'method': 'copy'}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total_records'] == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_upload_larger_than_max_batch_size(async_client: AsyncClient):
+    csv_content = BytesIO(
+        ''.join(f'{i},Job {i}\n' for i in range(1000, 3500)).encode()
+    )
+    files = {'file': ('jobs.csv', csv_content, 'text/csv')}
+    response = await async_client.post('/upload/jobs', files=files)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total_records'] == 2500  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_upload_jobs_parallel(async_client: AsyncClient):
+    csv_content = BytesIO(
+        ''.join(f'{i},Job {i}\n' for i in range(4000, 4100)).encode()
+        + b'not-an-id,Job\n'
+    )
+    files = {'file': ('jobs.csv', csv_content, 'text/csv')}
+    response = await async_client.post(
+        '/upload/jobs', files=files, params={'parallel': True}
+    )
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['total_records'] == 100  # noqa: PLR2004
+    assert [error['row'] for error in data['errors']] == [101]
+
+
+@pytest.mark.asyncio
+async def test_upload_departments_background_job(
+    async_client: AsyncClient, job_manager
+):
+    csv_content = BytesIO(b'20,Treasury\n21,Audit\nbroken\n')
+    files = {'file': ('departments.csv', csv_content, 'text/csv')}
+    response = await async_client.post(
+        '/upload/departments', files=files, params={'background': True}
+    )
+    assert response.status_code == HTTPStatus.ACCEPTED
+    job = await wait_for_job(async_client, response.json()['id'])
+
+    assert job['status'] == 'succeeded'
+    assert job['rows_parsed'] == 3  # noqa: PLR2004
+    assert job['rows_inserted'] == 2  # noqa: PLR2004
+    assert job['rows_rejected'] == 1
+    assert job['result']['total_records'] == 2  # noqa: PLR2004
+    assert not list(job_manager.spool_dir.iterdir())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('streaming', [False, True])
+async def test_upload_gzip_compressed_csv(
+    async_client: AsyncClient, streaming
+):
+    base_id = 5410 if streaming else 5400
+    content = gzip.compress(
+        f'{base_id},Payroll\n{base_id + 1},Facilities\nbroken\n'.encode()
+    )
+    files = {'file': ('departments.csv.gz', BytesIO(content))}
+    response = await async_client.post(
+        '/upload/departments', files=files, params={'streaming': streaming}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['total_records'] == 2  # noqa: PLR2004
+    assert data['errors'][0]['row'] == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_upload_compressed_by_content_encoding(
+    async_client: AsyncClient,
+):
+    content = bz2.compress(b'5420,Procurement\n5421,Compliance')
+    files = {
+        'file': (
+            'departments.csv',
+            BytesIO(content),
+            'text/csv',
+            {'Content-Encoding': 'bzip2'},
+        )
+    }
+    response = await async_client.post('/upload/departments', files=files)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total_records'] == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_upload_compressed_background_job(
+    async_client: AsyncClient, job_manager
+):
+    content = gzip.compress(b'5430,Logistics\n5431,Security')
+    files = {'file': ('departments.csv.gz', BytesIO(content))}
+    response = await async_client.post(
+        '/upload/departments', files=files, params={'background': True}
+    )
+    assert response.status_code == HTTPStatus.ACCEPTED
+    job = await wait_for_job(async_client, response.json()['id'])
+
+    assert job['status'] == 'succeeded'
+    assert job['rows_inserted'] == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('streaming', [False, True])
+async def test_upload_corrupt_compressed_csv(
+    async_client: AsyncClient, streaming
+):
+    content = gzip.compress(b'5440,Corrupt\n' * 100)[:-20]
+    files = {'file': ('departments.csv.gz', BytesIO(content))}
+    response = await async_client.post(
+        '/upload/departments', files=files, params={'streaming': streaming}
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert 'gzip' in response.json()['detail']
+
+
+@pytest.mark.asyncio
+async def test_get_unknown_upload_job(async_client: AsyncClient):
+    response = await async_client.get('/upload/jobs/unknown')
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
 @pytest.mark.asyncio
 async def test_upload_invalid_csv_format(async_client: AsyncClient):
     invalid_csv = BytesIO(b'invalid,data\nwithout,proper,columns')
@@ -79,3 +266,571 @@ async def test_upload_non_csv_file(async_client: AsyncClient):
     files = {'file': ('test.txt', BytesIO(b'not a csv'), 'text/plain')}
     response = await async_client.post('/upload/departments', files=files)
     assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_upload_invalidates_report_cache(
+    async_client: AsyncClient, report_cache
+):
+    await async_client.get('/reports/departments-above-mean-2021')
+    assert len(report_cache) == 1
+
+    csv_file = BytesIO(b'900,Research')
+    files = {'file': ('departments.csv', csv_file, 'text/csv')}
+    response = await async_client.post('/upload/departments', files=files)
+    assert response.status_code == HTTPStatus.OK
+
+    assert report_cache.version == 1
+    assert len(report_cache) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('method', ['orm', 'copy'])
+async def test_reupload_with_on_conflict_update(
+    async_client: AsyncClient, method
+):
+    base_id = 950 if method == 'orm' else 952
+    # Unchanged rows are not counted again
+    for name, written in [('Support', 2), ('Customer Support', 1)]:
+        csv_file = BytesIO(f'{base_id},{name}\n{base_id + 1},Legal'.encode())
+        files = {'file': ('departments.csv', csv_file, 'text/csv')}
+        response = await async_client.post(
+            '/upload/departments',
+            files=files,
+            params={'on_conflict': 'update', 'method': method},
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['total_records'] == written
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('streaming', [False, True])
+async def test_upload_employees_with_staging(
+    async_client: AsyncClient, streaming
+):
+    base_id = 960 if streaming else 970
+    csv_file = BytesIO(
+        f'{base_id},Staged,2021-05-01 00:00:00,1,10\n'
+        f'{base_id + 1},Staged,2021-05-01 00:00:00,999,10\n'
+        f'{base_id + 2},Staged\n'
+        f'{base_id + 3},Staged,2021-05-02 00:00:00,1,10'.encode()
+    )
+    files = {'file': ('employees.csv', csv_file, 'text/csv')}
+    response = await async_client.post(
+        '/upload/employees',
+        files=files,
+        params={'method': 'staging', 'streaming': streaming},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['total_records'] == 2  # noqa: PLR2004
+    assert [error['row'] for error in data['errors']] == [2, 3]
+    assert 'No departments with this id' in data['errors'][0]['message']
+
+
+@pytest.mark.asyncio
+async def test_upload_with_staging_all_rows_rejected(
+    async_client: AsyncClient,
+):
+    csv_file = BytesIO(b'980,Staged,2021-05-01 00:00:00,999,10')
+    files = {'file': ('employees.csv', csv_file, 'text/csv')}
+    response = await async_client.post(
+        '/upload/employees', files=files, params={'method': 'staging'}
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json()['detail']['errors'][0]['row'] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('streaming', [False, True])
+async def test_upload_employees_rejects_unknown_references(
+    async_client: AsyncClient, streaming
+):
+    base_id = 985 if streaming else 990
+    csv_file = BytesIO(
+        f'{base_id},Known,2021-05-01 00:00:00,1,10\n'
+        f'{base_id + 1},Orphan,2021-05-01 00:00:00,1,999'.encode()
+    )
+    files = {'file': ('employees.csv', csv_file, 'text/csv')}
+    response = await async_client.post(
+        '/upload/employees', files=files, params={'streaming': streaming}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['total_records'] == 1
+    assert data['errors'] == [
+        {'row': 2, 'message': "job_id: got '999' - No jobs with this id"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_dimension_upload_refreshes_known_ids(async_client: AsyncClient):
+    files = {'file': ('departments.csv', BytesIO(b'995,Data'), 'text/csv')}
+    await async_client.post('/upload/departments', files=files)
+
+    employees = b'995,New job,2021-05-01 00:00:00,995,995'
+    files = {'file': ('employees.csv', BytesIO(employees), 'text/csv')}
+    response = await async_client.post('/upload/employees', files=files)
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    files = {'file': ('jobs.csv', BytesIO(b'995,Analyst'), 'text/csv')}
+    response = await async_client.post('/upload/jobs', files=files)
+    assert response.status_code == HTTPStatus.OK
+
+    files = {'file': ('employees.csv', BytesIO(employees), 'text/csv')}
+    response = await async_client.post('/upload/employees', files=files)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['errors'] == []
+
+
+def columnar_file(columns: dict, file_format: str) -> BytesIO:
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    table = pa.table(columns)
+    buffer = BytesIO()
+    if file_format == 'parquet':
+        pq.write_table(table, buffer)
+    else:
+        new_writer = (
+            pa.ipc.new_file if file_format == 'arrow' else (pa.ipc.new_stream)
+        )
+        with new_writer(buffer, table.schema) as writer:
+            writer.write_table(table)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ('file_format', 'method', 'base_id'),
+    [
+        ('parquet', 'orm', 5500),
+        ('parquet', 'copy', 5510),
+        ('arrow', 'copy', 5520),
+        ('arrows', 'orm', 5530),
+    ],
+)
+async def test_upload_columnar_files(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    file_format,
+    method,
+    base_id,
+):
+    pa = pytest.importorskip('pyarrow')
+    departments = columnar_file(
+        {'name': ['Data', 'Platform'], 'id': [base_id, base_id + 1]},
+        file_format,
+    )
+    files = {'file': (f'departments.{file_format}', departments)}
+    response = await async_client.post(
+        '/upload/departments', files=files, params={'method': method}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total_records'] == 2  # noqa: PLR2004
+
+    files = {
+        'file': (
+            f'jobs.{file_format}',
+            columnar_file({'ID': [base_id], 'NAME': ['Analyst']}, file_format),
+        )
+    }
+    response = await async_client.post('/upload/jobs', files=files)
+    assert response.status_code == HTTPStatus.OK
+
+    employees = columnar_file(
+        {
+            'id': pa.array(range(base_id, base_id + 4), pa.int32()),
+            'name': ['Ada', None, 'Grace', 'Linus'],
+            'datetime': pa.array(
+                [datetime(2021, 4, 1, 9, 30)] * 4, pa.timestamp('ms')
+            ),
+            'department_id': [base_id, base_id, base_id + 1, base_id + 2],
+            'job_id': [base_id] * 4,
+            'exported_at': ['2024-01-01'] * 4,
+        },
+        file_format,
+    )
+    files = {'file': (f'employees.{file_format}', employees)}
+    response = await async_client.post(
+        '/upload/employees', files=files, params={'method': method}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['total_records'] == 2  # noqa: PLR2004
+    assert [(e['row'], e['message']) for e in data['errors']] == [
+        (2, 'name: Field required'),
+        (
+            4,
+            f"department_id: got '{base_id + 2}' - No departments with this id",
+        ),
+    ]
+    result = await async_session.execute(
+        text('SELECT name, datetime FROM hiredemployees WHERE id = :id'),
+        {'id': base_id},
+    )
+    assert result.one() == ('Ada', datetime(2021, 4, 1, 9, 30))
+
+
+@pytest.mark.asyncio
+async def test_upload_parquet_with_staging(async_client: AsyncClient):
+    departments = columnar_file(
+        {'id': ['5540', 'x'], 'name': ['Staged', 'Broken']}, 'parquet'
+    )
+    files = {'file': ('departments.parquet', departments)}
+    response = await async_client.post(
+        '/upload/departments', files=files, params={'method': 'staging'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['total_records'] == 1
+    assert data['errors'][0]['row'] == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ('content', 'headers', 'detail'),
+    [
+        ({'id': [5550]}, {}, 'Missing columns name'),
+        (
+            {'id': [5551], 'name': ['Zipped']},
+            {'Content-Encoding': 'gzip'},
+            'gzip',
+        ),
+        (None, {}, 'Invalid parquet file'),
+    ],
+)
+async def test_upload_unreadable_parquet(
+    async_client: AsyncClient, content, headers, detail
+):
+    if content is None:
+        parquet = BytesIO(b'PAR1 not really parquet')
+    else:
+        parquet = columnar_file(content, 'parquet')
+    files = {
+        'file': (
+            'departments.parquet',
+            parquet,
+            'application/octet-stream',
+            headers,
+        )
+    }
+    response = await async_client.post('/upload/departments', files=files)
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert detail in response.json()['detail']
+
+
+def batch_files(base_id: int) -> dict:
+    return {
+        'employees': (
+            f'{base_id},Batched,2021-05-01 00:00:00,{base_id},{base_id}\n'
+            f'{base_id + 1},Batched,2021-06-01 00:00:00,{base_id},{base_id}'
+        ).encode(),
+        'jobs': f'{base_id},Batched job'.encode(),
+        'departments': f'{base_id},Batched department'.encode(),
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('method', ['orm', 'staging'])
+async def test_upload_batch_in_dependency_order(
+    async_client: AsyncClient, method
+):
+    base_id = 5000 if method == 'orm' else 5100
+    # Employees come first, they still need the departments and jobs
+    files = [
+        ('files', (f'{name}.csv', BytesIO(content), 'text/csv'))
+        for name, content in batch_files(base_id).items()
+    ]
+    response = await async_client.post(
+        '/upload/batch', files=files, params={'method': method}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['total_records'] == 4  # noqa: PLR2004
+    assert [f['file'] for f in data['files']] == [
+        'departments.csv',
+        'jobs.csv',
+        'employees.csv',
+    ]
+    assert [f['total_records'] for f in data['files']] == [1, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_upload_batch_from_zip(async_client: AsyncClient):
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zipped:
+        for name, content in batch_files(5200).items():
+            zipped.writestr(f'dataset/{name}.csv', content)
+        zipped.writestr('__MACOSX/dataset/._jobs.csv', b'\x00')
+    archive.seek(0)
+
+    response = await async_client.post(
+        '/upload/batch',
+        files={'files': ('dataset.zip', archive, 'application/zip')},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total_records'] == 4  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_upload_batch_is_all_or_nothing(
+    async_client: AsyncClient, async_session: AsyncSession
+):
+    files = [
+        ('files', ('departments.csv', BytesIO(b'5300,Rolled back'))),
+        ('files', ('hired_employees.csv', BytesIO(b'5300,Missing columns'))),
+    ]
+    response = await async_client.post('/upload/batch', files=files)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    result = await async_session.execute(
+        text('SELECT COUNT(*) FROM departments WHERE id = 5300')
+    )
+    assert result.scalar_one() == 0
+
+
+@pytest.mark.asyncio
+async def test_upload_batch_mixes_formats(async_client: AsyncClient):
+    content = batch_files(5600)
+    files = [
+        (
+            'files',
+            (
+                'departments.parquet',
+                columnar_file({'id': [5600], 'name': ['Mixed']}, 'parquet'),
+            ),
+        ),
+        (
+            'files',
+            (
+                'jobs.arrow',
+                columnar_file({'id': [5600], 'name': ['Mixed']}, 'arrow'),
+            ),
+        ),
+        (
+            'files',
+            ('employees.csv.gz', BytesIO(gzip.compress(content['employees']))),
+        ),
+    ]
+    response = await async_client.post('/upload/batch', files=files)
+
+    assert response.status_code == HTTPStatus.OK
+    assert [f['total_records'] for f in response.json()['files']] == [1, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_upload_batch_rejects_unknown_files(async_client: AsyncClient):
+    files = {'files': ('salaries.csv', BytesIO(b'1,1000'), 'text/csv')}
+    response = await async_client.post('/upload/batch', files=files)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert 'Unexpected file salaries.csv' in response.json()['detail']
+
+
+def session_manager(async_engine, spool_dir) -> ResumableUploadManager:
+    # Small segments, so files are loaded over several transactions
+    manager = ResumableUploadManager(
+        async_sessionmaker(
+            async_engine, class_=AsyncSession, expire_on_commit=False
+        ),
+        BATCH_ENTITIES,
+        spool_dir=str(spool_dir),
+        segment_size=64,
+    )
+    fastapi_app.dependency_overrides[get_upload_sessions] = lambda: manager
+    return manager
+
+
+@pytest.fixture
+async def upload_sessions(async_engine, async_client, tmp_path):
+    manager = session_manager(async_engine, tmp_path)
+    yield manager
+    await manager.shutdown()
+
+
+async def send_chunks(
+    client: AsyncClient, session_id: str, content: bytes, size: int
+) -> dict:
+    for offset in range(0, len(content), size):
+        response = await client.put(
+            f'/upload/sessions/{session_id}',
+            params={'offset': offset},
+            content=content[offset : offset + size],
+        )
+        assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_loads_chunks_as_they_arrive(
+    async_client: AsyncClient, async_session, upload_sessions
+):
+    content = (
+        ''.join(f'{5700 + i},Division {i}\n' for i in range(20))
+        + 'broken\n5720,"Split\nname"'
+    ).encode()
+    response = await async_client.post(
+        '/upload/sessions', params={'entity': 'departments'}
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    session_id = response.json()['id']
+
+    # Chunks end anywhere, even inside a record
+    upload = await send_chunks(async_client, session_id, content, 37)
+    assert upload['received'] == len(content)
+    for _ in range(100):
+        upload = (
+            await async_client.get(f'/upload/sessions/{session_id}')
+        ).json()
+        if upload['committed_rows']:
+            break
+        await asyncio.sleep(0.01)
+    assert 0 < upload['committed_rows'] < 22  # noqa: PLR2004
+
+    response = await async_client.post(
+        f'/upload/sessions/{session_id}/complete'
+    )
+    assert response.status_code == HTTPStatus.OK
+    upload = response.json()
+    assert upload['status'] == 'succeeded'
+    assert upload['committed_rows'] == 22  # noqa: PLR2004
+    assert upload['committed_offset'] == len(content)
+    assert upload['result']['total_records'] == 21  # noqa: PLR2004
+    assert [error['row'] for error in upload['result']['errors']] == [21]
+
+    result = await async_session.execute(
+        text('SELECT name FROM departments WHERE id = 5720')
+    )
+    assert result.scalar_one() == 'Split\nname'
+    assert not list(upload_sessions.spool_dir.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_rejects_wrong_offsets(
+    async_client: AsyncClient, upload_sessions
+):
+    response = await async_client.post(
+        '/upload/sessions', params={'entity': 'jobs'}
+    )
+    session_id = response.json()['id']
+    await send_chunks(async_client, session_id, b'5730,Intern\n', 100)
+
+    response = await async_client.put(
+        f'/upload/sessions/{session_id}', params={'offset': 0}, content=b'x'
+    )
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert 'expects 12' in response.json()['detail']
+
+    response = await async_client.put(
+        '/upload/sessions/unknown', params={'offset': 0}, content=b'x'
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_resumes_from_checkpoint(
+    async_client: AsyncClient, async_session, async_engine, upload_sessions
+):
+    await async_session.execute(
+        text("INSERT INTO departments VALUES (5750, 'Taken')")
+    )
+    await async_session.commit()
+    content = ''.join(f'{5740 + i},Branch {i}\n' for i in range(20)).encode()
+    response = await async_client.post(
+        '/upload/sessions', params={'entity': 'departments'}
+    )
+    session_id = response.json()['id']
+    await send_chunks(async_client, session_id, content, 100)
+
+    # Row 11 exists, its segment rolls back with the checkpoint
+    response = await async_client.post(
+        f'/upload/sessions/{session_id}/complete'
+    )
+    assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+    failed = (await async_client.get(f'/upload/sessions/{session_id}')).json()
+    assert failed['status'] == 'failed'
+    assert 0 < failed['committed_rows'] < 11  # noqa: PLR2004
+
+    await async_session.execute(
+        text('DELETE FROM departments WHERE id = 5750')
+    )
+    await async_session.commit()
+    # A new process resumes from the checkpoint stored in the database
+    await upload_sessions.shutdown()
+    restarted = session_manager(async_engine, upload_sessions.spool_dir.parent)
+    response = await async_client.post(
+        f'/upload/sessions/{session_id}/complete'
+    )
+    await restarted.shutdown()
+
+    assert response.status_code == HTTPStatus.OK
+    upload = response.json()
+    assert upload['rows_inserted'] == 20  # noqa: PLR2004
+    assert upload['committed_rows'] == 20  # noqa: PLR2004
+    result = await async_session.execute(
+        text("SELECT COUNT(*) FROM departments WHERE name LIKE 'Branch %'")
+    )
+    assert result.scalar_one() == 20  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_refuses_lost_bytes(
+    async_client: AsyncClient, async_session, async_engine, upload_sessions
+):
+    await async_session.execute(
+        text("INSERT INTO departments VALUES (5770, 'Taken')")
+    )
+    await async_session.commit()
+    content = ''.join(f'{5760 + i},Office {i}\n' for i in range(20)).encode()
+    response = await async_client.post(
+        '/upload/sessions', params={'entity': 'departments'}
+    )
+    session_id = response.json()['id']
+    await send_chunks(async_client, session_id, content, 100)
+    response = await async_client.post(
+        f'/upload/sessions/{session_id}/complete'
+    )
+    assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+
+    # The spool file is gone after the restart
+    await upload_sessions.shutdown()
+    for path in upload_sessions.spool_dir.iterdir():
+        path.unlink()
+    restarted = session_manager(async_engine, upload_sessions.spool_dir.parent)
+    response = await async_client.post(
+        f'/upload/sessions/{session_id}/complete'
+    )
+    upload = (await async_client.get(f'/upload/sessions/{session_id}')).json()
+    await restarted.shutdown()
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert 'were lost' in response.json()['detail']
+    assert upload['status'] == 'failed'
+    assert upload['received'] < upload['size'] == len(content)
+
+
+@pytest.mark.asyncio
+async def test_succeeded_upload_session_is_not_kept(
+    async_client: AsyncClient, upload_sessions
+):
+    response = await async_client.post(
+        '/upload/sessions', params={'entity': 'jobs'}
+    )
+    session_id = response.json()['id']
+    await send_chunks(async_client, session_id, b'5780,Clerk\n', 100)
+    response = await async_client.post(
+        f'/upload/sessions/{session_id}/complete'
+    )
+    assert response.json()['status'] == 'succeeded'
+
+    response = await async_client.get(f'/upload/sessions/{session_id}')
+    assert response.json()['status'] == 'succeeded'
+    assert session_id not in upload_sessions._receivers
@@ -0,0 +1,72 @@
+import gzip
+import io
+import tarfile
+from contextlib import ExitStack
+
+import pytest
+from fastapi import UploadFile
+
+from app.models.base import Departments, HiredEmployees, Jobs
+from app.services.batch_service import BatchError, collect_batch_files
+
+
+def tar_upload(files: dict) -> UploadFile:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return UploadFile(file=buffer, filename='dataset.tar.gz')
+
+
+def test_collect_batch_files_orders_archive_members():
+    upload = tar_upload({
+        'data/hired_employees.csv': b'1,Employee,2021-01-01,1,1',
+        'data/.DS_Store': b'',
+        'data/jobs.csv': b'1,Job',
+    })
+    departments = UploadFile(
+        file=io.BytesIO(b'1,Department'), filename='departments.csv'
+    )
+
+    with ExitStack() as stack:
+        files = collect_batch_files([upload, departments], stack)
+        assert [f.model_class for f in files] == [
+            Departments,
+            Jobs,
+            HiredEmployees,
+        ]
+        assert files[1].name == 'data/jobs.csv'
+        assert files[1].file.file.read() == b'1,Job'
+
+
+@pytest.mark.parametrize(
+    ('uploads', 'message'),
+    [
+        (['jobs.csv', 'jobs.CSV'], 'Both jobs.csv and jobs.CSV load jobs'),
+        (['employees.txt'], 'Unexpected file employees.txt'),
+    ],
+)
+def test_collect_batch_files_rejects_bad_names(uploads, message):
+    files = [
+        UploadFile(file=io.BytesIO(b''), filename=name) for name in uploads
+    ]
+    with ExitStack() as stack, pytest.raises(BatchError, match=message):
+        collect_batch_files(files, stack)
+
+
+def test_collect_batch_files_rejects_broken_archives():
+    upload = UploadFile(file=io.BytesIO(b'not a zip'), filename='data.zip')
+    with ExitStack() as stack, pytest.raises(BatchError, match='data.zip'):
+        collect_batch_files([upload], stack)
+
+
+async def test_collect_batch_files_decompresses_members():
+    upload = tar_upload({'data/jobs.csv.gz': gzip.compress(b'1,Job')})
+    with ExitStack() as stack:
+        (jobs,) = collect_batch_files([upload], stack)
+        assert jobs.model_class is Jobs
+        assert jobs.name == 'data/jobs.csv.gz'
+        assert await jobs.file.read() == b'1,Job'
@@ -0,0 +1,95 @@
+import datetime
+import pickle
+import sys
+
+from app.models.base import HiredEmployees
+from app.services.column_batch import ColumnBatch, concat_rows
+from app.services.row_validator import get_row_validator
+
+KINDS = ['int', 'str', 'datetime', 'int', 'int']
+
+
+def make_rows(count: int, start: int = 1) -> list:
+    return [
+        (
+            i,
+            f'Employee {i}',
+            datetime.datetime(2021, 1, 1) + datetime.timedelta(seconds=i),
+            i % 7,
+            i % 11,
+        )
+        for i in range(start, start + count)
+    ]
+
+
+def make_batch(rows: list) -> ColumnBatch:
+    return ColumnBatch.from_columns(KINDS, list(zip(*rows, strict=True)))
+
+
+def test_column_batch_round_trips_rows():
+    rows = make_rows(100)
+    batch = make_batch(rows)
+    assert len(batch) == 100
+    assert list(batch) == rows
+    assert batch.kinds == KINDS
+
+
+def test_column_batch_slices_and_concatenates():
+    rows = make_rows(10)
+    batch = make_batch(rows)
+    assert list(batch[2:5]) == rows[2:5]
+    assert list(batch[8:20]) == rows[8:]
+    assert len(batch[5:2]) == 0
+
+    merged = concat_rows([batch[:3], batch[3:], make_batch(make_rows(2, 50))])
+    assert list(merged) == rows + make_rows(2, 50)
+
+
+def test_column_batch_falls_back_to_objects():
+    rows = make_rows(2)
+    batch = make_batch(rows)
+    wide = ColumnBatch.from_columns(
+        KINDS,
+        [[2**70], ['x'], [datetime.datetime(2022, 1, 1)], [None], [1]],
+    )
+    assert wide.kinds == ['object', 'str', 'datetime', 'object', 'int']
+
+    merged = ColumnBatch.concat([batch, wide])
+    assert merged.kinds == ['object', 'str', 'datetime', 'object', 'int']
+    assert list(merged)[-1] == (
+        2**70,
+        'x',
+        datetime.datetime(2022, 1, 1),
+        None,
+        1,
+    )
+    assert list(merged)[:2] == rows
+
+
+def test_column_batch_is_smaller_than_tuples():
+    rows = make_rows(10_000)
+    batch = make_batch(rows)
+    tuples = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        for row in rows
+    )
+    assert batch.nbytes * 4 < tuples
+    assert list(pickle.loads(pickle.dumps(batch))) == rows
+
+
+def test_validator_returns_compact_batches():
+    validator = get_row_validator(HiredEmployees)
+    rows, errors = validator.validate(
+        [
+            ['1', 'John Doe', '2021-01-15T10:30:00Z', '1', '2'],
+            ['x', 'Jane Smith', '2021-02-01 00:00:00', '3', '4'],
+            ['3', 'Jim Beam', '2021-03-01 00:00:00', '5', '6'],
+        ],
+        compact=True,
+    )
+    assert isinstance(rows, ColumnBatch)
+    assert [row for row, _ in errors] == [2]
+    assert list(rows) == [
+        (1, 'John Doe', datetime.datetime(2021, 1, 15, 10, 30), 1, 2),
+        (3, 'Jim Beam', datetime.datetime(2021, 3, 1), 5, 6),
+    ]
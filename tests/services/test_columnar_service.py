@@ -0,0 +1,148 @@
+import io
+from datetime import date, datetime
+
+import pytest
+
+from app.models.base import HiredEmployees, Jobs
+from app.services.columnar_service import (
+    ColumnarError,
+    file_format,
+    get_arrow_validator,
+    read_batches,
+    string_values,
+)
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def employees_batch(**columns):
+    defaults = {
+        'id': pa.array([1, 2, 3], pa.int32()),
+        'name': ['Ada', 'Grace', 'Linus'],
+        'datetime': pa.array(
+            [datetime(2021, 1, 1, 10, 0)] * 3, pa.timestamp('s')
+        ),
+        'department_id': [1, 1, 1],
+        'job_id': [1, 1, 1],
+    }
+    return pa.record_batch({**defaults, **columns})
+
+
+@pytest.mark.parametrize(
+    ('filename', 'expected'),
+    [
+        ('employees.parquet', 'parquet'),
+        ('employees.PQ', 'parquet'),
+        ('employees.arrow', 'arrow'),
+        ('employees.feather', 'arrow'),
+        ('employees.csv.zst', 'csv'),
+        ('employees.json', None),
+    ],
+)
+def test_file_format(filename, expected):
+    assert file_format(filename) == expected
+
+
+def test_validate_typed_columns():
+    batch = employees_batch(
+        datetime=pa.array(
+            [datetime(2021, 1, 1, 10, 0)] * 3, pa.timestamp('ms', tz='+02:00')
+        ),
+    )
+    rows, errors = get_arrow_validator(HiredEmployees).validate(batch)
+
+    assert errors == []
+    assert rows.kinds == ['int', 'str', 'datetime', 'int', 'int']
+    # The UTC instant, like '2021-01-01T10:00:00Z' in a CSV
+    assert list(rows)[0] == (1, 'Ada', datetime(2021, 1, 1, 10, 0), 1, 1)
+
+
+def test_validate_rejects_dates():
+    batch = employees_batch(datetime=pa.array([date(2021, 1, 1)] * 3))
+    rows, errors = get_arrow_validator(HiredEmployees).validate(batch)
+
+    assert len(rows) == 0
+    assert errors[0] == (
+        1,
+        "datetime: got '2021-01-01' - Invalid datetime format. "
+        'Expected: YYYY-MM-DDThh:mm:ssZ',
+    )
+
+
+def test_validate_reports_rows_like_the_csv_path():
+    batch = employees_batch(
+        id=pa.array([1, None, 3], pa.int64()),
+        department_id=['1', '1', 'x'],
+        job_id=[1, 2, 1],
+    )
+    rows, errors = get_arrow_validator(HiredEmployees).validate(
+        batch, start=10, value_sets={'jobs': pa.array([1], pa.int64())}
+    )
+
+    assert [row[0] for row in rows] == [1]
+    assert errors == [
+        (11, "id: Field required; job_id: got '2' - No jobs with this id"),
+        (12, "department_id: got 'x' - Input should be a valid integer"),
+    ]
+
+
+def test_validate_raw_yields_strings():
+    batch = employees_batch(
+        name=['Ada', None, 'Linus'],
+        datetime=pa.array(
+            [datetime(2021, 1, 1, 10, 0, 0, 500000)] * 3,
+            pa.timestamp('us', tz='+02:00'),
+        ),
+    )
+    rows, errors = get_arrow_validator(HiredEmployees).validate_raw(batch, 5)
+
+    assert errors == []
+    # The UTC instant, in the form the staging table checks
+    assert rows[1][:4] == (6, '2', '', '2021-01-01 10:00:00')
+
+
+def test_string_values_of_a_slice():
+    values = pa.array(['ñandú', 'café', 'tea', 'x']).slice(1, 2)
+    column = string_values(values)
+    assert list(column) == ['café', 'tea']
+    assert column.buffer == 'cafétea'
+
+
+def test_read_batches_matches_columns_by_name():
+    table = pa.table({
+        'NAME': ['Analyst', 'Engineer', 'Manager'],
+        'notes': ['a', 'b', 'c'],
+        'Id': [1, 2, 3],
+    })
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, row_group_size=2)
+    buffer.seek(0)
+
+    batches = list(
+        read_batches(buffer, 'parquet', get_arrow_validator(Jobs), 2)
+    )
+
+    assert [batch.num_rows for batch in batches] == [2, 1]
+    assert batches[0].schema.names == ['Id', 'NAME']
+
+
+def test_read_batches_splits_large_ipc_batches():
+    table = pa.table({'id': list(range(5)), 'name': ['Job'] * 5})
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, table.schema) as writer:
+        writer.write_table(table)
+    buffer.seek(0)
+
+    batches = list(read_batches(buffer, 'arrow', get_arrow_validator(Jobs), 2))
+
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+
+
+def test_read_batches_requires_model_columns():
+    buffer = io.BytesIO()
+    pq.write_table(pa.table({'id': [1]}), buffer)
+    buffer.seek(0)
+
+    with pytest.raises(ColumnarError, match='Missing columns name'):
+        list(read_batches(buffer, 'parquet', get_arrow_validator(Jobs), 10))
@@ -1,5 +1,9 @@
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 import pytest
-from io import StringIO
+from io import BytesIO, StringIO
 from app.services.csv_service import CSVService
 from app.models.base import Departments, Jobs, HiredEmployees
 
@@ -29,3 +33,103 @@ def test_read_invalid_departments_csv(invalid_departments_csv):
     )
     assert len(records) == 0
     assert len(errors) > 0
+
+
+class ChunkedUpload:
+    """Minimal stand-in for UploadFile returning bytes in small chunks."""
+
+    def __init__(self, content: bytes):
+        self._file = BytesIO(content)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+async def collect_stream(content: bytes, model_class, **kwargs):
+    records, errors = [], []
+    async for batch, batch_errors in CSVService.read_csv_stream(
+        ChunkedUpload(content), model_class, **kwargs
+    ):
+        records.extend(batch)
+        errors.extend(batch_errors)
+    return records, errors
+
+
+@pytest.mark.asyncio
+async def test_read_csv_stream_across_chunk_boundaries():
+    content = (
+        'id,name\n1,Pesquisa e Inovação\n2,"Sales\nand Marketing"\n3\n4,HR'
+    ).encode()
+    records, errors = await collect_stream(
+        content, Departments, has_headers=True, batch_size=2, chunk_size=3
+    )
+    assert [name for _, name in records] == [
+        'Pesquisa e Inovação',
+        'Sales\nand Marketing',
+        'HR',
+    ]
+    assert [row for row, _ in errors] == [3]
+
+
+@pytest.mark.asyncio
+async def test_read_csv_stream_batches():
+    content = ''.join(f'{i},Job {i}\n' for i in range(1, 11)).encode()
+    batches = [
+        batch
+        async for batch, _ in CSVService.read_csv_stream(
+            ChunkedUpload(content), Jobs, batch_size=4, chunk_size=16
+        )
+    ]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+@pytest.mark.asyncio
+async def test_read_csv_stream_reports_unreadable_shards():
+    oversized = 'x' * 200_000
+    content = f'1,a\n2,b\n3,{oversized}\n4,d\n5,e\n'.encode()
+    records, errors = await collect_stream(
+        content, Departments, batch_size=2, chunk_size=1024
+    )
+    assert [name for _, name in records] == ['a', 'b', 'e']
+    assert errors == [
+        (3, 'File reading error: field larger than field limit (131072)')
+    ]
+
+
+def test_read_uploaded_rows_returns_tuples():
+    csv_file = StringIO(
+        '1,John Doe,2021-01-15T00:00:00Z,1,1\n'
+        '2,Jane Smith,not a date,1,1\n'
+        '3,Bob Johnson,2021-03-10T00:00:00Z,,2\n'
+    )
+    rows, errors = CSVService.read_uploaded_rows(csv_file, HiredEmployees)
+    assert rows == [
+        (1, 'John Doe', datetime.datetime(2021, 1, 15), 1, 1),
+    ]
+    assert [row for row, _ in errors] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_read_csv_stream_in_process_pool():
+    content = ''.join(
+        f'{i},Employee {i},2021-0{i % 9 + 1}-01T00:00:00Z,1,1\n'
+        if i % 7
+        else f'{i},Broken {i},yesterday,1,1\n'
+        for i in range(1, 101)
+    ).encode()
+    sequential = await collect_stream(
+        content, HiredEmployees, batch_size=10, chunk_size=64
+    )
+    with ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context('spawn')
+    ) as pool:
+        parallel = await collect_stream(
+            content,
+            HiredEmployees,
+            batch_size=10,
+            chunk_size=64,
+            executor=pool,
+            max_in_flight=4,
+        )
+    assert parallel == sequential
+    assert [row for row, _ in parallel[1]] == list(range(7, 101, 7))
@@ -1,7 +1,13 @@
+import asyncio
+import datetime
+
 import pytest
+from asyncpg.exceptions import UniqueViolationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from app.models.base import Departments, HiredEmployees
-from app.services.db_service import DBService
+from app.models.base import Departments, HiredEmployees, Jobs
+from app.services.db_service import DBService, PipelinedWriter
 from tests.test_data import (
     create_test_departments,
     create_test_employees,
@@ -30,6 +36,26 @@ async def test_execute_select_with_data(async_session):
     assert results[0]['name'] == 'Engineering'
 
 
+@pytest.mark.asyncio
+async def test_stream_select_yields_chunks(async_session):
+    db_service = DBService(async_session)
+
+    query = 'SELECT n FROM generate_series(1, :last) AS n ORDER BY n'
+    chunks = [
+        chunk
+        async for chunk in db_service.stream_select(
+            query, {'last': 5}, chunk_size=2
+        )
+    ]
+    await async_session.rollback()
+
+    assert chunks == [
+        [{'n': 1}, {'n': 2}],
+        [{'n': 3}, {'n': 4}],
+        [{'n': 5}],
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_all_with_relationships(async_session):
     db_service = DBService(async_session)
@@ -41,3 +67,605 @@ async def test_get_all_with_relationships(async_session):
     await db_service.create_batch(employees)
     all_employees = await db_service.get_all(HiredEmployees)
     assert len(all_employees) == 7  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_create_batch_with_copy(async_session):
+    db_service = DBService(async_session)
+    jobs = [Jobs(id=100 + i, name=f'Copied job {i}') for i in range(3)]
+
+    await db_service.create_batch(jobs, method='copy')
+
+    results = await db_service.execute_select(
+        'SELECT id, name FROM jobs WHERE id >= 100 ORDER BY id'
+    )
+    assert [row['name'] for row in results] == [
+        'Copied job 0',
+        'Copied job 1',
+        'Copied job 2',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_create_batch_splits_large_batches(async_session):
+    db_service = DBService(async_session)
+    jobs = [Jobs(id=200 + i, name=f'Chunked job {i}') for i in range(5)]
+
+    await db_service.create_batch(jobs, batch_size=2)
+
+    results = await db_service.execute_select(
+        'SELECT COUNT(*) AS total FROM jobs WHERE id BETWEEN 200 AND 299'
+    )
+    assert results[0]['total'] == 5  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ('transaction', 'expected'), [('chunk', 2), ('file', 0)]
+)
+async def test_create_batch_transaction_modes(
+    async_session, transaction, expected
+):
+    db_service = DBService(async_session)
+    base_id = 300 if transaction == 'chunk' else 400
+    jobs = [
+        Jobs(id=base_id, name='First'),
+        Jobs(id=base_id + 1, name='Second'),
+        Jobs(id=base_id, name='Duplicate'),
+    ]
+
+    with pytest.raises(Exception):  # noqa: B017
+        await db_service.create_batch(
+            jobs, batch_size=2, method='copy', transaction=transaction
+        )
+
+    results = await db_service.execute_select(
+        'SELECT COUNT(*) AS total FROM jobs WHERE id IN (:first, :second)',
+        {'first': base_id, 'second': base_id + 1},
+    )
+    assert results[0]['total'] == expected
+
+
+@pytest.mark.asyncio
+async def test_pipelined_writer(async_session):
+    db_service = DBService(async_session)
+
+    async with PipelinedWriter(db_service, Jobs, method='copy') as writer:
+        for start in range(500, 506, 2):
+            await writer.submit([
+                (start, 'Pipelined'),
+                (start + 1, 'Pipelined'),
+            ])
+
+    results = await db_service.execute_select(
+        "SELECT COUNT(*) AS total FROM jobs WHERE name = 'Pipelined'"
+    )
+    assert results[0]['total'] == 6  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_create_rows(async_session):
+    db_service = DBService(async_session)
+    rows = [(600 + i, f'Row job {i}') for i in range(5)]
+
+    await db_service.create_rows(Jobs, rows, batch_size=2)
+
+    results = await db_service.execute_select(
+        'SELECT COUNT(*) AS total FROM jobs WHERE id BETWEEN 600 AND 699'
+    )
+    assert results[0]['total'] == 5  # noqa: PLR2004
+
+
+STATS_FROM_EMPLOYEES = """
+SELECT
+    department_id,
+    job_id,
+    EXTRACT(year FROM datetime)::int AS year,
+    EXTRACT(quarter FROM datetime)::int AS quarter,
+    COUNT(*) AS hires
+FROM hiredemployees
+GROUP BY 1, 2, 3, 4
+ORDER BY 1, 2, 3, 4
+"""
+
+STATS_FROM_AGGREGATE = """
+SELECT department_id, job_id, year, quarter, hires
+FROM quarterlyhiringstats
+WHERE hires <> 0
+ORDER BY 1, 2, 3, 4
+"""
+
+
+@pytest.mark.asyncio
+async def test_quarterly_stats_follow_employee_changes(async_session):
+    db_service = DBService(async_session)
+    await db_service.create_rows(
+        HiredEmployees,
+        [
+            (100, 'Copied', datetime.datetime(2021, 8, 1), 2, 2),
+            (101, 'Copied', datetime.datetime(2022, 2, 1), 2, 2),
+        ],
+        method='copy',
+    )
+    expected = await db_service.execute_select(STATS_FROM_EMPLOYEES)
+    assert await db_service.execute_select(STATS_FROM_AGGREGATE) == expected
+
+    await db_service.execute_select(
+        "UPDATE hiredemployees SET datetime = '2021-11-30' WHERE id = 100 "
+        'RETURNING id'
+    )
+    await db_service.execute_select(
+        'DELETE FROM hiredemployees WHERE id = 101 RETURNING id'
+    )
+    await async_session.commit()
+
+    expected = await db_service.execute_select(STATS_FROM_EMPLOYEES)
+    assert await db_service.execute_select(STATS_FROM_AGGREGATE) == expected
+
+
+DEPARTMENT_STATS_FROM_EMPLOYEES = """
+SELECT
+    EXTRACT(year FROM datetime)::int AS year,
+    department_id,
+    COUNT(*) AS hires
+FROM hiredemployees
+GROUP BY 1, 2
+ORDER BY 1, 2
+"""
+
+DEPARTMENT_STATS_FROM_AGGREGATE = """
+SELECT year, department_id, hires
+FROM departmenthiringstats
+WHERE hires <> 0
+ORDER BY 1, 2
+"""
+
+
+@pytest.mark.asyncio
+async def test_department_stats_follow_employee_changes(async_session):
+    db_service = DBService(async_session)
+    await db_service.create_rows(
+        HiredEmployees,
+        [
+            (120, 'Copied', datetime.datetime(2021, 3, 1), 1, 2),
+            (121, 'Inserted', datetime.datetime(2023, 5, 1), 2, 2),
+        ],
+        method='copy',
+    )
+    expected = await db_service.execute_select(DEPARTMENT_STATS_FROM_EMPLOYEES)
+    assert (
+        await db_service.execute_select(DEPARTMENT_STATS_FROM_AGGREGATE)
+        == expected
+    )
+
+    await db_service.execute_select(
+        'UPDATE hiredemployees SET department_id = 2 WHERE id = 120 '
+        'RETURNING id'
+    )
+    await db_service.execute_select(
+        'DELETE FROM hiredemployees WHERE id = 121 RETURNING id'
+    )
+    await async_session.commit()
+
+    expected = await db_service.execute_select(DEPARTMENT_STATS_FROM_EMPLOYEES)
+    assert (
+        await db_service.execute_select(DEPARTMENT_STATS_FROM_AGGREGATE)
+        == expected
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('method', ['orm', 'copy'])
+async def test_create_rows_on_conflict(async_session, method):
+    db_service = DBService(async_session)
+    base_id = 700 if method == 'orm' else 710
+    first, second = base_id, base_id + 1
+    await db_service.create_rows(
+        Jobs, [(first, 'Original'), (second, 'Original')], method=method
+    )
+
+    await db_service.create_rows(
+        Jobs,
+        [(first, 'Ignored'), (base_id + 2, 'New')],
+        method=method,
+        on_conflict='ignore',
+    )
+    await db_service.create_rows(
+        Jobs,
+        [(second, 'Updated'), (base_id + 3, 'New')],
+        batch_size=1,
+        method=method,
+        on_conflict='update',
+    )
+
+    results = await db_service.execute_select(
+        'SELECT id, name FROM jobs WHERE id BETWEEN :first AND :last '
+        'ORDER BY id',
+        {'first': base_id, 'last': base_id + 9},
+    )
+    assert results == [
+        {'id': first, 'name': 'Original'},
+        {'id': second, 'name': 'Updated'},
+        {'id': base_id + 2, 'name': 'New'},
+        {'id': base_id + 3, 'name': 'New'},
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('method', ['orm', 'copy', 'staging'])
+async def test_upsert_keeps_one_row_per_id(async_session, method):
+    db_service = DBService(async_session)
+    base_id = {'orm': 150, 'copy': 155, 'staging': 160}[method]
+
+    def employees(*rows):
+        if method != 'staging':
+            return [
+                (base_id, name, datetime.datetime(year, 6, 1), 2, 2)
+                for name, year in rows
+            ]
+        return [
+            (number, str(base_id), name, f'{year}-06-01T00:00:00Z', '2', '2')
+            for number, (name, year) in enumerate(rows, 1)
+        ]
+
+    async def upsert(rows, on_conflict):
+        written, _ = await db_service.create_rows(
+            HiredEmployees, rows, method=method, on_conflict=on_conflict
+        )
+        return written
+
+    query = 'SELECT name, datetime FROM hiredemployees WHERE id = :id'
+    first, last = employees(('First', 2021), ('Last', 2022))
+    assert await upsert([first, last], 'ignore') == 1
+    assert await db_service.execute_select(query, {'id': base_id}) == [
+        {'name': 'First', 'datetime': datetime.datetime(2021, 6, 1)}
+    ]
+
+    assert await upsert([first, last], 'update') == 1
+    assert await upsert([first, last], 'update') == 0
+    assert await upsert([first], 'ignore') == 0
+    assert await db_service.execute_select(query, {'id': base_id}) == [
+        {'name': 'Last', 'datetime': datetime.datetime(2022, 6, 1)}
+    ]
+
+    written, _ = await db_service.create_rows(
+        Jobs,
+        [(base_id, 'First'), (base_id, 'Last')],
+        on_conflict='update',
+    )
+    assert written == 1
+    assert await db_service.execute_select(
+        'SELECT name FROM jobs WHERE id = :id', {'id': base_id}
+    ) == [{'name': 'Last'}]
+
+
+@pytest.mark.asyncio
+async def test_upsert_only_touches_changed_rows(async_session):
+    db_service = DBService(async_session)
+    rows = [(720, 'Unchanged'), (721, 'Unchanged')]
+    await db_service.create_rows(Jobs, rows)
+    before = await db_service.execute_select(
+        'SELECT id, xmin::text AS version FROM jobs WHERE id IN (720, 721) '
+        'ORDER BY id'
+    )
+
+    await db_service.create_rows(
+        Jobs, [(720, 'Unchanged'), (721, 'Changed')], on_conflict='update'
+    )
+
+    after = await db_service.execute_select(
+        'SELECT id, xmin::text AS version FROM jobs WHERE id IN (720, 721) '
+        'ORDER BY id'
+    )
+    assert after[0] == before[0]
+    assert after[1] != before[1]
+
+
+@pytest.mark.asyncio
+async def test_quarterly_stats_follow_upserts(async_session):
+    db_service = DBService(async_session)
+    await db_service.create_rows(
+        HiredEmployees,
+        [
+            (110, 'Upserted', datetime.datetime(2021, 1, 10), 3, 3),
+            (111, 'Upserted', datetime.datetime(2021, 5, 10), 3, 3),
+        ],
+    )
+
+    await db_service.create_rows(
+        HiredEmployees,
+        [
+            (110, 'Upserted', datetime.datetime(2021, 9, 10), 3, 3),
+            (111, 'Upserted', datetime.datetime(2021, 5, 10), 3, 3),
+            (112, 'Upserted', datetime.datetime(2021, 12, 10), 3, 3),
+        ],
+        method='copy',
+        on_conflict='update',
+    )
+
+    expected = await db_service.execute_select(STATS_FROM_EMPLOYEES)
+    assert await db_service.execute_select(STATS_FROM_AGGREGATE) == expected
+
+
+@pytest.mark.asyncio
+async def test_load_staged_rejects_invalid_rows(async_session):
+    db_service = DBService(async_session)
+    await db_service.create_rows(Departments, [(800, 'Staged')])
+    await db_service.create_rows(Jobs, [(800, 'Staged')])
+
+    inserted, rejected = await db_service.create_rows(
+        HiredEmployees,
+        [
+            (1, '800', 'Valid', '2021-03-01T10:00:00Z', '800', '800'),
+            (2, '801', 'Unknown department', '2021-03-01', '999', '800'),
+            (3, 'x', 'Bad id and date', 'yesterday', '800', 'y'),
+            (4, '802', 'Also valid', '2021-04-01 08:00:00', '800', '800'),
+            (5, '8_03', 'Lenient', '2021-04-01T08:00:00+02:00', '800', ' 1'),
+        ],
+        batch_size=3,
+        method='staging',
+    )
+
+    assert inserted == 2  # noqa: PLR2004
+    assert rejected == [
+        (
+            2,
+            "datetime: got '2021-03-01' - Invalid datetime format. "
+            'Expected: YYYY-MM-DDThh:mm:ssZ; '
+            "department_id: got '999' - No departments with this id",
+        ),
+        (
+            3,
+            "id: got 'x' - Input should be a valid integer; "
+            "datetime: got 'yesterday' - Invalid datetime format. "
+            'Expected: YYYY-MM-DDThh:mm:ssZ; '
+            "job_id: got 'y' - Input should be a valid integer",
+        ),
+        (
+            5,
+            "id: got '8_03' - Input should be a valid integer; "
+            "datetime: got '2021-04-01T08:00:00+02:00' - Invalid datetime "
+            'format. Expected: YYYY-MM-DDThh:mm:ssZ; '
+            "job_id: got ' 1' - Input should be a valid integer",
+        ),
+    ]
+    results = await db_service.execute_select(
+        'SELECT id, datetime FROM hiredemployees WHERE department_id = 800 '
+        'ORDER BY id'
+    )
+    assert results == [
+        {'id': 800, 'datetime': datetime.datetime(2021, 3, 1, 10)},
+        {'id': 802, 'datetime': datetime.datetime(2021, 4, 1, 8)},
+    ]
+    expected = await db_service.execute_select(STATS_FROM_EMPLOYEES)
+    assert await db_service.execute_select(STATS_FROM_AGGREGATE) == expected
+
+
+@pytest.mark.asyncio
+async def test_partitions_created_on_ingest_are_pruned(async_session):
+    db_service = DBService(async_session)
+    # Partitions are only created before the transaction reads or writes
+    await async_session.commit()
+    await db_service.create_rows(
+        HiredEmployees,
+        [
+            (130, 'Partitioned', datetime.datetime(2031, 2, 1), 2, 2),
+            (131, 'Partitioned', datetime.datetime(2032, 6, 1), 2, 2),
+        ],
+        method='copy',
+    )
+
+    results = await db_service.execute_select(
+        'SELECT id, tableoid::regclass::text AS partition '
+        'FROM hiredemployees WHERE id IN (130, 131) ORDER BY id'
+    )
+    assert results == [
+        {'id': 130, 'partition': 'hiredemployees_y2031'},
+        {'id': 131, 'partition': 'hiredemployees_y2032'},
+    ]
+    plan = await db_service.execute_select(
+        'EXPLAIN SELECT COUNT(*) FROM hiredemployees '
+        "WHERE datetime >= '2031-01-01' AND datetime < '2032-01-01'"
+    )
+    plan = '\n'.join(row['QUERY PLAN'] for row in plan)
+    assert 'hiredemployees_y2031' in plan
+    assert 'hiredemployees_y2032' not in plan
+    assert 'hiredemployees_default' not in plan
+
+
+@pytest.mark.asyncio
+async def test_new_partition_takes_rows_from_default(async_session):
+    db_service = DBService(async_session)
+    # Written without DBService, so no partition is created for 2035
+    async_session.add(
+        HiredEmployees(
+            id=133,
+            name='Defaulted',
+            datetime=datetime.datetime(2035, 1, 1),
+            department_id=2,
+            job_id=2,
+        )
+    )
+    await async_session.commit()
+
+    await db_service.create_rows(
+        HiredEmployees,
+        [(1, '134', 'Partitioned', '2035-12-31T00:00:00Z', '2', '2')],
+        method='staging',
+    )
+
+    results = await db_service.execute_select(
+        'SELECT id, tableoid::regclass::text AS partition '
+        'FROM hiredemployees WHERE id IN (133, 134) ORDER BY id'
+    )
+    assert results == [
+        {'id': 133, 'partition': 'hiredemployees_y2035'},
+        {'id': 134, 'partition': 'hiredemployees_y2035'},
+    ]
+    expected = await db_service.execute_select(STATS_FROM_EMPLOYEES)
+    assert await db_service.execute_select(STATS_FROM_AGGREGATE) == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('method', ['orm', 'copy'])
+async def test_ids_stay_unique_across_partitions(async_session, method):
+    db_service = DBService(async_session)
+    employee_id = 140 if method == 'orm' else 141
+    await db_service.create_rows(
+        HiredEmployees,
+        [(employee_id, 'Original', datetime.datetime(2021, 3, 1), 2, 2)],
+        method=method,
+    )
+
+    # COPY goes straight to asyncpg, which raises its own error
+    with pytest.raises((IntegrityError, UniqueViolationError)):
+        await db_service.create_rows(
+            HiredEmployees,
+            [(employee_id, 'Moved', datetime.datetime(2022, 3, 1), 2, 2)],
+            method=method,
+        )
+    await db_service.create_rows(
+        HiredEmployees,
+        [(employee_id, 'Ignored', datetime.datetime(2022, 3, 1), 2, 2)],
+        method=method,
+        on_conflict='ignore',
+    )
+    query = (
+        'SELECT name, datetime FROM hiredemployees WHERE id = :id '
+        'ORDER BY datetime'
+    )
+    assert await db_service.execute_select(query, {'id': employee_id}) == [
+        {'name': 'Original', 'datetime': datetime.datetime(2021, 3, 1)}
+    ]
+
+    await db_service.create_rows(
+        HiredEmployees,
+        [(employee_id, 'Moved', datetime.datetime(2022, 3, 1), 2, 2)],
+        method=method,
+        on_conflict='update',
+    )
+    assert await db_service.execute_select(query, {'id': employee_id}) == [
+        {'name': 'Moved', 'datetime': datetime.datetime(2022, 3, 1)}
+    ]
+    expected = await db_service.execute_select(STATS_FROM_EMPLOYEES)
+    assert await db_service.execute_select(STATS_FROM_AGGREGATE) == expected
+
+
+@pytest.mark.asyncio
+async def test_partitions_are_created_before_writing(async_session):
+    db_service = DBService(async_session)
+    await async_session.commit()
+    query = (
+        'SELECT id, tableoid::regclass::text AS partition '
+        'FROM hiredemployees WHERE id BETWEEN 135 AND 137 ORDER BY id'
+    )
+
+    await db_service.insert_rows(
+        HiredEmployees,
+        [(135, 'Partitioned', datetime.datetime(2036, 1, 1), 2, 2)],
+    )
+    # Attaching 2037 would wait for this transaction to end
+    await db_service.insert_rows(
+        HiredEmployees,
+        [(136, 'Defaulted', datetime.datetime(2037, 1, 1), 2, 2)],
+    )
+    await async_session.commit()
+    assert await db_service.execute_select(query) == [
+        {'id': 135, 'partition': 'hiredemployees_y2036'},
+        {'id': 136, 'partition': 'hiredemployees_default'},
+    ]
+    await async_session.commit()
+
+    await db_service.create_rows(
+        HiredEmployees,
+        [(137, 'Partitioned', datetime.datetime(2037, 6, 1), 2, 2)],
+    )
+    assert await db_service.execute_select(query) == [
+        {'id': 135, 'partition': 'hiredemployees_y2036'},
+        {'id': 136, 'partition': 'hiredemployees_y2037'},
+        {'id': 137, 'partition': 'hiredemployees_y2037'},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_partitions_are_resolved_once_per_load(
+    async_session, monkeypatch
+):
+    db_service = DBService(async_session)
+    await async_session.commit()
+    resolved = []
+    ensure_partitions = db_service.ensure_partitions
+
+    async def record(model, values):
+        resolved.append(list(values))
+        await ensure_partitions(model, resolved[-1])
+
+    monkeypatch.setattr(db_service, 'ensure_partitions', record)
+    await db_service.create_rows(
+        HiredEmployees,
+        [
+            (146, 'Spanned', datetime.datetime(2043, 1, 1), 2, 2),
+            (147, 'Spanned', datetime.datetime(2041, 1, 1), 2, 2),
+            (148, 'Spanned', datetime.datetime(2043, 6, 1), 2, 2),
+        ],
+        batch_size=1,
+    )
+
+    assert resolved == [[2041, 2042, 2043]]
+    partitions = await db_service.execute_select(
+        'SELECT inhrelid::regclass::text AS partition FROM pg_inherits '
+        "WHERE inhparent = 'hiredemployees'::regclass "
+        "AND inhrelid::regclass::text LIKE 'hiredemployees_y204%' "
+        'ORDER BY 1'
+    )
+    assert [row['partition'] for row in partitions] == [
+        'hiredemployees_y2041',
+        'hiredemployees_y2042',
+        'hiredemployees_y2043',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writers_of_an_id(async_session, async_engine):
+    session_maker = async_sessionmaker(async_engine, expire_on_commit=False)
+    async with session_maker() as first, session_maker() as second:
+        await DBService(first).insert_rows(
+            HiredEmployees,
+            [(145, 'First', datetime.datetime(2021, 3, 1), 2, 2)],
+        )
+        # Another partition, so only the id check can stop it
+        written = asyncio.create_task(
+            DBService(second).create_rows(
+                HiredEmployees,
+                [(145, 'Second', datetime.datetime(2022, 3, 1), 2, 2)],
+            )
+        )
+        await asyncio.sleep(0.2)
+        assert not written.done()
+
+        await first.commit()
+        with pytest.raises(IntegrityError):
+            await written
+
+    assert await DBService(async_session).execute_select(
+        'SELECT name FROM hiredemployees WHERE id = 145'
+    ) == [{'name': 'First'}]
+
+
+@pytest.mark.asyncio
+async def test_one_transaction_writes_many_ids(async_session):
+    db_service = DBService(async_session)
+    # More ids than the shared lock table holds, as one file transaction
+    rows = [
+        (employee_id, 'Many', datetime.datetime(2021, 7, 1), 2, 2)
+        for employee_id in range(100_000, 112_000)
+    ]
+    written, _ = await db_service.create_rows(
+        HiredEmployees, rows, batch_size=4000, method='copy'
+    )
+
+    assert written == len(rows)
+    assert await db_service.execute_select(
+        'SELECT COUNT(*) AS ids FROM hiredemployees_ids '
+        'WHERE id BETWEEN 100000 AND 111999'
+    ) == [{'ids': len(rows)}]
@@ -0,0 +1,105 @@
+import bz2
+import gzip
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from app.services.decompression import (
+    ZSTD_INPUT_SLICE,
+    DecompressingFile,
+    DecompressionError,
+    detect_codec,
+    strip_codec_suffix,
+)
+
+CONTENT = b''.join(
+    f'{i},Employee {i},2021-01-01T00:00:00Z,1,1\n'.encode()
+    for i in range(2000)
+)
+
+
+def upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename='upload')
+
+
+async def read_all(file: DecompressingFile, size: int) -> bytes:
+    chunks = []
+    while chunk := await file.read(size):
+        assert len(chunk) <= size
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+@pytest.mark.parametrize(
+    ('filename', 'content_encoding', 'codec'),
+    [
+        ('employees.csv', None, None),
+        ('employees.csv.gz', None, 'gzip'),
+        ('employees.CSV.BZ2', None, 'bz2'),
+        ('employees.csv.zst', None, 'zstd'),
+        ('employees.csv', 'gzip', 'gzip'),
+        ('employees.csv', ' X-BZIP2 ', 'bz2'),
+        ('employees.csv.gz', 'identity', None),
+    ],
+)
+def test_detect_codec(filename, content_encoding, codec):
+    assert detect_codec(filename, content_encoding) == codec
+
+
+def test_detect_codec_rejects_unknown_content_encoding():
+    with pytest.raises(DecompressionError, match='br'):
+        detect_codec('employees.csv', 'br')
+
+
+def test_strip_codec_suffix():
+    assert strip_codec_suffix('data/jobs.csv.gz') == 'data/jobs.csv'
+    assert strip_codec_suffix('jobs.csv') == 'jobs.csv'
+
+
+@pytest.mark.parametrize(
+    ('codec', 'compress'), [('gzip', gzip.compress), ('bz2', bz2.compress)]
+)
+async def test_decompresses_in_small_chunks(codec, compress):
+    file = DecompressingFile(upload(compress(CONTENT)), codec, chunk_size=97)
+    assert await read_all(file, 1000) == CONTENT
+
+
+async def test_reads_concatenated_gzip_members():
+    half = len(CONTENT) // 2
+    content = gzip.compress(CONTENT[:half]) + gzip.compress(CONTENT[half:])
+    file = DecompressingFile(upload(content), 'gzip', chunk_size=512)
+    assert await file.read() == CONTENT
+
+
+async def test_zstd_frames():
+    zstandard = pytest.importorskip('zstandard')
+    compressor = zstandard.ZstdCompressor()
+    content = compressor.compress(CONTENT) + compressor.compress(b'1,a\n')
+    file = DecompressingFile(upload(content), 'zstd', chunk_size=256)
+    assert await read_all(file, 4096) == CONTENT + b'1,a\n'
+
+
+@pytest.mark.parametrize(
+    'content',
+    [gzip.compress(CONTENT)[:-10], b'\x1f\x8b not really gzip'],
+    ids=['truncated', 'corrupt'],
+)
+async def test_invalid_data_raises(content):
+    file = DecompressingFile(upload(content), 'gzip')
+    with pytest.raises(DecompressionError):
+        await file.read()
+
+
+@pytest.mark.parametrize('codec', ['gzip', 'bz2', 'zstd'])
+async def test_reads_only_expand_what_they_ask_for(codec):
+    if codec == 'zstd':
+        compress = pytest.importorskip('zstandard').ZstdCompressor().compress
+    else:
+        compress = {'gzip': gzip.compress, 'bz2': bz2.compress}[codec]
+    # A decompression bomb, a few KiB expanding to 64 MiB
+    file = DecompressingFile(upload(compress(bytes(64 << 20))), codec)
+
+    assert await file.read(1000) == bytes(1000)
+    # zstd may go past the size by one slice of input
+    assert len(file._buffer) <= ZSTD_INPUT_SLICE << 15
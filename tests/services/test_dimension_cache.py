@@ -0,0 +1,46 @@
+import pytest
+
+from app.models.base import Departments, HiredEmployees, Jobs
+from app.services.db_service import DBService
+from app.services.dimension_cache import DimensionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_dimension_cache_loads_referenced_ids(async_session):
+    db_service = DBService(async_session)
+    await db_service.create_rows(Departments, [(1, 'Engineering')])
+    await db_service.create_rows(Jobs, [(1, 'Engineer'), (2, 'Manager')])
+    cache = DimensionCache([Departments, Jobs])
+
+    assert await cache.known_ids(db_service, HiredEmployees) == {
+        'departments': {1},
+        'jobs': {1, 2},
+    }
+    assert await cache.known_ids(db_service, Departments) == {}
+
+
+@pytest.mark.asyncio
+async def test_dimension_cache_reloads_after_invalidate_or_ttl(async_session):
+    db_service = DBService(async_session)
+    clock = FakeClock()
+    cache = DimensionCache([Departments], ttl=10, clock=clock)
+    await db_service.create_rows(Departments, [(20, 'Cached')])
+    before = await cache.get(db_service, 'departments')
+
+    await db_service.create_rows(Departments, [(21, 'Added')])
+    assert await cache.get(db_service, 'departments') == before
+
+    cache.invalidate(Departments)
+    assert 21 in await cache.get(db_service, 'departments')  # noqa: PLR2004
+
+    await db_service.create_rows(Departments, [(22, 'Added later')])
+    clock.now = 10
+    assert 22 in await cache.get(db_service, 'departments')  # noqa: PLR2004
@@ -0,0 +1,53 @@
+import pytest
+
+from app.services.metrics import AppMetrics, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        'work_seconds', 'Time spent working', ('kind',), buckets=(0.1, 1)
+    )
+    histogram.observe(0.05, kind='a')
+    histogram.observe(0.5, kind='a')
+    histogram.observe(5, kind='a')
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == [
+        '# HELP work_seconds Time spent working',
+        '# TYPE work_seconds histogram',
+    ]
+    assert lines[2:] == [
+        'work_seconds_bucket{kind="a",le="0.1"} 1',
+        'work_seconds_bucket{kind="a",le="1"} 2',
+        'work_seconds_bucket{kind="a",le="+Inf"} 3',
+        'work_seconds_sum{kind="a"} 5.55',
+        'work_seconds_count{kind="a"} 3',
+    ]
+    assert histogram.count(kind='a') == 3  # noqa: PLR2004
+
+
+def test_counter_escapes_labels_and_checks_names():
+    registry = MetricsRegistry()
+    counter = registry.counter('events_total', 'Events', ('name',))
+    counter.inc(name='say "hi"\n')
+    counter.inc(2, name='say "hi"\n')
+
+    assert 'events_total{name="say \\"hi\\"\\n"} 3' in registry.render()
+    with pytest.raises(ValueError, match='takes labels'):
+        counter.inc(other='x')
+    with pytest.raises(ValueError, match='only go up'):
+        counter.inc(-1, name='x')
+    with pytest.raises(ValueError, match='already registered'):
+        registry.counter('events_total', 'Events again')
+
+
+def test_app_metrics_count_upload_rows():
+    metrics = AppMetrics()
+    metrics.record_upload('jobs', parsed=12, inserted=8, rejected=2)
+
+    def rows(outcome):
+        return metrics.upload_rows.value(table='jobs', outcome=outcome)
+
+    assert (rows('parsed'), rows('inserted'), rows('rejected')) == (12, 8, 2)
+    assert rows('skipped') == 2
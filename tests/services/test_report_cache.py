@@ -0,0 +1,89 @@
+import pytest
+
+from app.services.report_cache import CachedReport, ReportCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_report(body: bytes = b'[]') -> CachedReport:
+    return CachedReport(body=body, media_type='application/json')
+
+
+def test_cached_report_etag_depends_on_body():
+    assert make_report(b'[1]').etag == make_report(b'[1]').etag
+    assert make_report(b'[1]').etag != make_report(b'[2]').etag
+    assert make_report().etag.startswith('"')
+
+
+def test_report_cache_evicts_least_recently_used():
+    cache = ReportCache(maxsize=2)
+    cache.put('a', make_report(), cache.version)
+    cache.put('b', make_report(), cache.version)
+    cache.get('a')
+    cache.put('c', make_report(), cache.version)
+
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+
+
+def test_report_cache_expires_entries():
+    clock = FakeClock()
+    cache = ReportCache(ttl=10, clock=clock)
+    cache.put('a', make_report(), cache.version)
+
+    clock.now = 9.9
+    assert cache.get('a') is not None
+    clock.now = 10
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_report_cache_invalidate_drops_entries():
+    cache = ReportCache()
+    cache.put('a', make_report(), cache.version)
+    cache.invalidate()
+
+    assert cache.version == 1
+    assert cache.get('a') is None
+
+
+def test_report_cache_disabled_with_zero_size():
+    cache = ReportCache(maxsize=0)
+    cache.put('a', make_report(), cache.version)
+    assert cache.get('a') is None
+
+
+@pytest.mark.asyncio
+async def test_report_cache_builds_once():
+    cache = ReportCache()
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return make_report()
+
+    first = await cache.get_or_create('a', build)
+    second = await cache.get_or_create('a', build)
+
+    assert first is second
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_report_cache_skips_reports_built_during_upload():
+    cache = ReportCache()
+
+    async def build():
+        # An upload commits while the report is being read
+        cache.invalidate()
+        return make_report()
+
+    await cache.get_or_create('a', build)
+    assert cache.get('a') is None
@@ -0,0 +1,27 @@
+import pytest
+
+from app.services.resumable_service import complete_records, restore_spool
+
+
+@pytest.mark.parametrize(
+    ('data', 'expected'),
+    [
+        (b'1,a\n2,b\n3,c', 8),
+        (b'1,a\n2,b\n', 8),
+        (b'1,a', 0),
+        (b'1,"a\nb"\n2,"c\n', 8),
+        (b'1,"a\n\nb', 0),
+        (b'1,"say ""hi""\n"\n2', 16),
+        (b'', 0),
+    ],
+)
+def test_complete_records(data, expected):
+    assert complete_records(data) == expected
+
+
+def test_restore_spool_recreates_missing_file(tmp_path):
+    path = tmp_path / 'sessions' / 'upload.csv'
+    assert restore_spool(path, 1024) == 1024  # noqa: PLR2004
+
+    path.write_bytes(b'1,a\n')
+    assert restore_spool(path, 0) == 4  # noqa: PLR2004
@@ -0,0 +1,93 @@
+import datetime
+
+from app.models.base import Departments, HiredEmployees
+from app.services.row_validator import get_row_validator
+
+
+def test_validator_converts_columns():
+    validator = get_row_validator(HiredEmployees)
+    rows, errors = validator.validate([
+        ['1', 'John Doe', '2021-01-15T10:30:00Z', '1', '2'],
+        ['2', 'Jane Smith', '2021-02-01 00:00:00', '3', '4'],
+    ])
+    assert errors == []
+    assert rows == [
+        (1, 'John Doe', datetime.datetime(2021, 1, 15, 10, 30), 1, 2),
+        (2, 'Jane Smith', datetime.datetime(2021, 2, 1), 3, 4),
+    ]
+
+
+def test_validator_reports_every_invalid_column():
+    validator = get_row_validator(HiredEmployees)
+    rows, errors = validator.validate(
+        [
+            ['1', 'John Doe', '2021-01-15T10:30:00Z', '1', '2'],
+            ['x', 'Jane Smith', 'yesterday', '3', '4'],
+            ['3', 'Too short'],
+        ],
+        start=10,
+    )
+    assert len(rows) == 1
+    assert [row for row, _ in errors] == [11, 12]
+    assert 'id' in errors[0][1]
+    assert 'datetime' in errors[0][1]
+    assert errors[1][1].startswith('Expected 5 columns')
+
+
+def test_validator_is_cached_per_model():
+    assert get_row_validator(Departments) is get_row_validator(Departments)
+
+
+def test_validate_raw_only_checks_width():
+    validator = get_row_validator(Departments)
+    rows, errors = validator.validate_raw(
+        [['x', 'Engineering'], ['2'], ['3', 'Sales']], start=5
+    )
+    assert rows == [(5, 'x', 'Engineering'), (7, '3', 'Sales')]
+    assert errors == [(6, 'Expected 2 columns (id, name), got 1')]
+
+
+def test_validator_rejects_unknown_references():
+    validator = get_row_validator(HiredEmployees)
+    rows, errors = validator.validate(
+        [
+            ['1', 'Known', '2021-01-15T10:30:00Z', '1', '2'],
+            ['2', 'Unknown department', '2021-01-15T10:30:00Z', '9', '2'],
+            ['3', 'Bad job', '2021-01-15T10:30:00Z', '9', 'x'],
+        ],
+        known_ids={'departments': {1}, 'jobs': frozenset({2})},
+    )
+    assert [row[0] for row in rows] == [1]
+    assert errors == [
+        (2, "department_id: got '9' - No departments with this id"),
+        (
+            3,
+            "department_id: got '9' - No departments with this id; "
+            "job_id: got 'x' - Input should be a valid integer",
+        ),
+    ]
+
+    rows, errors = validator.validate(
+        [['2', 'Unchecked', '2021-01-15T10:30:00Z', '9', '2']],
+        known_ids={'jobs': {2}},
+    )
+    assert len(rows) == 1
+    assert errors == []
+
+
+def test_validator_rejects_lenient_values():
+    validator = get_row_validator(HiredEmployees)
+    rows, errors = validator.validate([
+        ['1', 'Date only', '2021-07-27', '1', '2'],
+        ['2', 'No seconds', '2021-07-27 10:00', '1', '2'],
+        ['3', 'Offset', '2021-07-27T16:02:08+03:00', '1', '2'],
+        ['1_0', 'Underscore', '2021-07-27T16:02:08Z', '1', '2'],
+        ['+5', 'Sign', '2021-07-27T16:02:08Z', ' 1', '2'],
+        ['-6', 'Negative', '2021-07-27T16:02:08Z', '1', '2'],
+    ])
+    assert rows == [
+        (-6, 'Negative', datetime.datetime(2021, 7, 27, 16, 2, 8), 1, 2)
+    ]
+    assert [row for row, _ in errors] == [1, 2, 3, 4, 5]
+    assert all('datetime' in message for _, message in errors[:3])
+    assert errors[4][1].count('valid integer') == 2  # noqa: PLR2004
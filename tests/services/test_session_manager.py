@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import text
+
+from app.database.postgres import PostgresSessionManager
+
+
+@pytest.fixture
+def manager_env(monkeypatch, async_engine):
+    url = async_engine.url.render_as_string(hide_password=False)
+    monkeypatch.setenv('POSTGRES_READ_URI', url)
+    monkeypatch.setenv('POSTGRES_MAX_OVERFLOW', '3')
+    monkeypatch.setenv('POSTGRES_POOL_PRE_PING', 'false')
+    monkeypatch.setenv('POSTGRES_READ_POOL_SIZE', '2')
+    return monkeypatch
+
+
+@pytest.mark.asyncio
+async def test_session_manager_reads_from_separate_pool(manager_env):
+    manager = PostgresSessionManager()
+    try:
+        write_pool = manager.engine.sync_engine.pool
+        read_pool = manager.read_engine.sync_engine.pool
+        assert write_pool is not read_pool
+        assert write_pool._max_overflow == 3  # noqa: PLR2004
+        assert write_pool._pre_ping is False
+        assert read_pool.size() == 2  # noqa: PLR2004
+
+        async with manager.read_session_maker() as session:
+            read_only = await session.scalar(
+                text('SHOW transaction_read_only')
+            )
+            stats = manager.pool_stats()
+        assert read_only == 'on'
+        assert stats['read'] == {
+            'size': 2,
+            'checked_out': 1,
+            'idle': 0,
+            'overflow': 0,
+        }
+        assert stats['write']['checked_out'] == 0
+        assert manager.pool_stats()['read']['idle'] == 1
+    finally:
+        await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_session_manager_can_share_the_write_pool(manager_env):
+    manager_env.setenv('POSTGRES_READ_POOL_SIZE', '0')
+    manager = PostgresSessionManager()
+    try:
+        assert manager.read_engine is manager.engine
+        assert list(manager.pool_stats()) == ['write']
+    finally:
+        await manager.close()